@@ -1,39 +1,230 @@
-from flask import Flask, render_template, request, redirect, url_for, make_response, jsonify
+from flask import Flask, render_template, request, redirect, url_for, make_response, jsonify, has_request_context, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.read_preferences import ReadPreference, SecondaryPreferred
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson import ObjectId
 import jwt
 import datetime
 import os
 import uuid
 import re
+import hashlib
+import hmac
+import json
+import shutil
+import tempfile
+import threading
+import time
+from storage import create_storage, iter_local_files
+from jobs import JobQueue
+from search import SearchIndex, AutocompleteIndex, post_search_key
+from leaderboard import Leaderboard
+from invalidation import create_invalidation_bus
+from cache import create_cache
+from profiler import QueryProfiler, render_toolbar
+from metrics import Registry, MongoCommandMetrics
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow가 없으면 반응형 이미지 변환 없이 원본만 사용
+    Image = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = "supersecretkey"  # ⚠️ change in production
 
 # --- MongoDB setup ---
-client = MongoClient("mongodb://localhost:27017/")  # or your MongoDB Atlas URI
+# replica set 예: mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0 (setup_replica_set.py 참고)
+app.config["MONGO_URI"] = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")  # or your MongoDB Atlas URI
+# 목록/통계 읽기를 secondary로 보낼 때 허용하는 최대 복제 지연 (MongoDB 최소값 90초)
+app.config["MONGO_MAX_STALENESS_SECONDS"] = int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", 90))
+# 쓰기 요청 후 이 시간 동안은 해당 사용자의 목록 읽기도 primary에서 (secondary 지연 + heartbeat 여유)
+app.config["READ_YOUR_WRITES_SECONDS"] = int(os.environ.get(
+    "READ_YOUR_WRITES_SECONDS", app.config["MONGO_MAX_STALENESS_SECONDS"] + 30))
+# 요청별 MongoDB 쿼리 프로파일러 (profiler.py)
+# 쿼리 수가 예산을 넘거나 같은 모양의 쿼리가 반복되면(N+1 의심) 서버 로그에 경고를 출력
+app.config["QUERY_BUDGET"] = int(os.environ.get("QUERY_BUDGET", 20))
+app.config["N_PLUS_ONE_THRESHOLD"] = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 5))
+# HTML 응답 아래에 쿼리 목록 패널 표시하고 응답 헤더(X-Query-Count, Server-Timing)에 쿼리 수/시간을 붙임 (개발용)
+# 백엔드 처리 시간이 클라이언트에 노출되므로 운영에서는 켜지 않음
+app.config["QUERY_PROFILER_TOOLBAR"] = os.environ.get("QUERY_PROFILER_TOOLBAR", "0") == "1"
+query_profiler = QueryProfiler()
+
+# Prometheus 메트릭 (metrics.py, /metrics에서 수집)
+# /metrics 요청에는 Authorization: Bearer <토큰>이 필요함 (설정하지 않으면 /metrics는 항상 거부)
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+metrics = Registry()
+request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("route", "method"))
+request_count = metrics.counter(
+    "http_requests_total", "HTTP requests by route and status", ("route", "method", "status"))
+upload_bytes = metrics.counter("upload_bytes_total", "Uploaded bytes by storage folder", ("kind",))
+
+client = MongoClient(app.config["MONGO_URI"], event_listeners=[query_profiler, MongoCommandMetrics(metrics)])
 db = client["flask_jwt_auth"]
 users_collection = db["users"]
 
-PROFILE_FOLDER = "static/profile_imgs"
-os.makedirs(PROFILE_FOLDER, exist_ok=True)
-app.config["PROFILE_FOLDER"] = PROFILE_FOLDER
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        # 경로 변수(팀 id 등)가 라벨 값을 늘리지 않도록 URL 규칙 단위로 집계
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        request_duration.observe(time.perf_counter() - started, route=route, method=request.method)
+        request_count.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.before_request
+def begin_query_profile():
+    query_profiler.begin(f"{request.method} {request.path}")
+
+@app.after_request
+def report_query_profile(response):
+    """예산 초과나 반복 쿼리가 있으면 서버 로그에 경고 출력 (개발용 설정이면 쿼리 수/시간 헤더와 패널도 추가)"""
+    profile = query_profiler.end()
+    if profile is None:
+        return response
+    
+    query_ms = profile.query_seconds * 1000
+    if app.config["QUERY_PROFILER_TOOLBAR"]:
+        response.headers["X-Query-Count"] = str(profile.query_count)
+        response.headers["Server-Timing"] = f'mongo;dur={query_ms:.1f};desc="{profile.query_count} queries"'
+    
+    repeated = profile.repeated_shapes(app.config["N_PLUS_ONE_THRESHOLD"])
+    if profile.query_count > app.config["QUERY_BUDGET"]:
+        print(f"⚠️ 쿼리 예산 초과: {profile.label} - {profile.query_count}개 쿼리 ({query_ms:.1f}ms), 예산 {app.config['QUERY_BUDGET']}개")
+    for shape, count in repeated:
+        print(f"⚠️ 반복 쿼리 (N+1 의심): {profile.label} - {count}회 {shape}")
+    
+    if (app.config["QUERY_PROFILER_TOOLBAR"] and response.mimetype == "text/html"
+            and not response.direct_passthrough and response.status_code == 200):
+        body = response.get_data(as_text=True)
+        if "</body>" in body:
+            toolbar = render_toolbar(profile, app.config["QUERY_BUDGET"], app.config["N_PLUS_ONE_THRESHOLD"])
+            response.set_data(body.replace("</body>", toolbar + "</body>", 1))
+    return response
+
+# 읽기 라우팅
+# 메인 페이지/팀 목록/프로필/검색/순위 같은 목록·통계 읽기는 지연이 제한된 secondary에서 읽고,
+# 그 외 읽기와 모든 쓰기는 primary에서 처리. 방금 추천/댓글/가입 등을 한 사용자는 자기 변경이 바로 보여야 하므로
+# 쓰기 요청이 성공하면 쿠키를 남겨서 그 시간 동안은 목록 읽기도 primary에서 함
+# (secondary가 없는 단일 서버에서는 secondaryPreferred가 primary를 사용하므로 그대로 동작)
+LISTING_READ_PREFERENCE = SecondaryPreferred(max_staleness=app.config["MONGO_MAX_STALENESS_SECONDS"])
+READ_YOUR_WRITES_COOKIE = "primary_reads_until"
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+def read_your_writes_active():
+    """현재 요청의 사용자가 방금 쓰기를 했는지 (쿠키 기준)"""
+    if not has_request_context():
+        return False
+    try:
+        primary_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    return primary_until > time.time()
+
+def listing_read_preference():
+    """목록/통계 읽기에 쓸 read preference (최근에 쓰기를 한 사용자는 primary)"""
+    if read_your_writes_active():
+        return ReadPreference.PRIMARY
+    return LISTING_READ_PREFERENCE
+
+def listing_collection(collection):
+    """목록/통계 읽기용 컬렉션 (같은 컬렉션에 read preference만 바꿈)"""
+    return collection.with_options(read_preference=listing_read_preference())
+
+@app.after_request
+def mark_read_your_writes(response):
+    """쓰기 요청이 성공하면 잠시 동안 목록 읽기를 primary로 보내도록 표시"""
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        window = app.config["READ_YOUR_WRITES_SECONDS"]
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, str(int(time.time()) + window),
+                            max_age=window, httponly=True, samesite="Lax")
+    return response
+
+# 캐시 무효화 버스 (여러 프로세스/서버의 인프로세스 캐시를 함께 비움, invalidation.py 참고)
+# change stream은 DB 변경을 직접 받고, local/redis는 아래 컬렉션을 바꾸는 곳에서 invalidation_bus.publish를 호출
+# local은 프로세스 하나(개발 서버)에서만 쓸 수 있음 - 웹 프로세스가 여러 개이거나 작업 워커(worker.py)를 따로 띄우면
+# 다른 프로세스의 변경이 캐시에 반영되지 않으므로 changestream(replica set) 또는 redis를 사용해야 함
+app.config["INVALIDATION_BACKEND"] = os.environ.get("INVALIDATION_BACKEND", "local")  # local / changestream / redis
+app.config["REDIS_URL"] = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+CACHED_COLLECTIONS = ("users", "teams", "teams_archive", "week_summaries")
+invalidation_bus = create_invalidation_bus(app.config, db, CACHED_COLLECTIONS)
+
+# 캐시 (cache.py) - 메인 페이지 팀 목록, 프로필 팀 목록, 알림 목록이 사용하고 무효화 버스로 받은 변경에 맞춰 지움
+app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "local")  # local / redis
+app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+# 유효 기간이 지난 뒤 STALE 기간 동안은 이전 값을 주면서 백그라운드에서 갱신
+app.config["CACHE_TTL_SECONDS"] = int(os.environ.get("CACHE_TTL_SECONDS", 60))
+app.config["CACHE_STALE_SECONDS"] = int(os.environ.get("CACHE_STALE_SECONDS", 300))
+cache = create_cache(app.config)
+cache.subscribe_to(invalidation_bus, CACHED_COLLECTIONS)
+
+def cached(namespace, key, loader, tags=(), ttl=None, stale_ttl=None):
+    """목록 화면용 캐시 조회 (방금 쓰기를 한 사용자는 캐시를 거치지 않고 primary에서 읽음)"""
+    return cache.get_or_set(
+        namespace, key, loader,
+        ttl=app.config["CACHE_TTL_SECONDS"] if ttl is None else ttl,
+        stale_ttl=app.config["CACHE_STALE_SECONDS"] if stale_ttl is None else stale_ttl,
+        tags=tags,
+        bypass=read_your_writes_active()
+    )
+
+@app.before_request
+def start_invalidation_listener():
+    """요청을 처리하는 프로세스마다 무효화 메시지 수신 시작 (fork된 웹 서버 워커 포함)"""
+    invalidation_bus.start()
 
 PROFILE_FOLDER = "static/profile_imgs"
 os.makedirs(PROFILE_FOLDER, exist_ok=True)
 app.config["PROFILE_FOLDER"] = PROFILE_FOLDER
 
+# 프로필 썸네일 크기 (2배 해상도 기준: 48px 카드 -> 96, 72px 팀 페이지 -> 160)
+app.config["AVATAR_SIZES"] = {"small": 96, "medium": 160}
+DEFAULT_AVATAR_URL = "/static/images/default-avatar.jpg"
+# 내용 해시 기반 프로필 파일명 (예: 3f2a9c0d1b4e5f67.jpg, 3f2a9c0d1b4e5f67__s96.jpg)
+HASHED_AVATAR_PATTERN = re.compile(r'^[0-9a-f]{16}(?:__s\d+)?\.[a-z]+$')
+# 내용 해시 기반 업로드 파일명 (예: <sha256 앞 32자>.png, <sha256 앞 32자>__w640.png)
+HASHED_UPLOAD_PATTERN = re.compile(r'^[0-9a-f]{32}(?:__w\d+)?\.[a-z]+$')
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 # 업로드된 이미지 폴더 설정
 UPLOAD_FOLDER = "static/uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB 제한
 
+# --- 이미지 저장소 설정 ("local" 또는 "s3", S3 호환 저장소는 MinIO로도 확인 가능) ---
+app.config["STORAGE_BACKEND"] = os.environ.get("STORAGE_BACKEND", "local")
+app.config["S3_ENDPOINT_URL"] = os.environ.get("S3_ENDPOINT_URL")  # MinIO: http://localhost:9000
+app.config["S3_BUCKET"] = os.environ.get("S3_BUCKET", "jungle-media")
+app.config["S3_ACCESS_KEY"] = os.environ.get("S3_ACCESS_KEY")
+app.config["S3_SECRET_KEY"] = os.environ.get("S3_SECRET_KEY")
+app.config["S3_REGION"] = os.environ.get("S3_REGION")
+
+upload_storage = create_storage(app.config, UPLOAD_FOLDER, "uploads")
+profile_storage = create_storage(app.config, PROFILE_FOLDER, "profile_imgs")
+
 # 허용되는 파일 확장자
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+# 반응형 이미지 축소본 폭 (srcset 후보)
+app.config["IMAGE_VARIANT_WIDTHS"] = (320, 640, 1280)
+IMAGE_VARIANT_PATTERN = re.compile(r'__w\d+$')
+IMG_TAG_PATTERN = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+# 업로드 문서마다 기억해 둘 최근 참조 해제 id 수 (작업 재실행 시 참조 카운트 중복 감소 방지용)
+IMAGE_RELEASE_HISTORY = 50
+
+# 알림 보관 정책: 읽은 알림은 N일 뒤 TTL 인덱스로 자동 삭제, 사용자별 최대 개수 초과분은 오래된 것부터 삭제
+# (삭제 전에 남겨야 하면 archive_notifications.py로 파일로 내보냄)
+app.config["NOTIFICATION_READ_TTL_DAYS"] = int(os.environ.get("NOTIFICATION_READ_TTL_DAYS", 30))
+app.config["NOTIFICATION_MAX_PER_USER"] = int(os.environ.get("NOTIFICATION_MAX_PER_USER", 200))
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -62,6 +253,250 @@ def get_current_user(request):
             return data["user"]
     return None
 
+# 프로필 이미지 관련 헬퍼 함수들
+def profile_image_extension(file):
+    """업로드된 프로필 이미지의 확장자를 결정 (확장자가 없으면 MIME 타입으로 추정)"""
+    original_filename = secure_filename(file.filename)
+    if '.' in original_filename:
+        return '.' + original_filename.rsplit('.', 1)[1].lower()
+    
+    mime_extensions = {
+        'image/jpeg': '.jpg',
+        'image/png': '.png',
+        'image/gif': '.gif',
+        'image/webp': '.webp'
+    }
+    return mime_extensions.get(file.content_type, '.jpg')  # 기본값 .jpg
+
+def avatar_thumbnail_filename(filename, size):
+    """프로필 파일명에 대한 썸네일 파일명을 반환 (abc.jpg -> abc__s96.jpg)"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}__s{size}{ext}"
+
+def create_avatar_thumbnails(file_path):
+    """프로필 원본으로부터 정사각형 썸네일들을 생성"""
+    for size in app.config["AVATAR_SIZES"].values():
+        thumb_path = avatar_thumbnail_filename(file_path, size)
+        if os.path.exists(thumb_path):
+            continue
+        try:
+            if Image is None:
+                # Pillow가 없으면 URL이 깨지지 않도록 원본을 그대로 복사
+                shutil.copyfile(file_path, thumb_path)
+                continue
+            with Image.open(file_path) as img:
+                thumb = ImageOps.fit(ImageOps.exif_transpose(img), (size, size))
+                # JPEG는 투명도/팔레트 모드를 저장할 수 없으므로 (확장자만 jpg인 PNG 등) RGB로 변환
+                if thumb_path.lower().endswith((".jpg", ".jpeg")) and thumb.mode not in ("RGB", "L"):
+                    thumb = thumb.convert("RGB")
+                thumb.save(thumb_path)
+        except Exception as e:
+            print(f"프로필 썸네일 생성 실패: {thumb_path}, 오류: {e}")
+            shutil.copyfile(file_path, thumb_path)
+
+def upload_shard(digest):
+    """해시값에 대한 샤드 하위 폴더 이름 (앞 두 글자, 256개 폴더로 분산)"""
+    return digest[:2]
+
+def save_file_by_content_hash(file, folder, ext, digest_length, shard=False):
+    """업로드 스트림을 받으면서 SHA-256을 계산해 <해시><확장자> 키로 스테이징 폴더(folder/.staging)에 저장
+
+    (키, 스테이징 파일 경로, 바이트 수)를 반환. 축소본/썸네일 생성 후 publish_staged_files로 저장소에 올린다.
+    shard=True이면 해시 앞 두 글자 하위 폴더를 사용하고 키도 "ab/abcd...png" 형태가 된다.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    staging_folder = os.path.join(folder, ".staging")
+    os.makedirs(staging_folder, exist_ok=True)
+    
+    # 받는 동안 해시를 계산하며 임시 파일에 기록
+    fd, temp_path = tempfile.mkstemp(dir=staging_folder)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+                hasher.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+        upload_bytes.inc(size, kind=os.path.basename(os.path.normpath(folder)))
+        
+        digest = hasher.hexdigest()[:digest_length]
+        key = f"{digest}{ext}"
+        if shard:
+            key = f"{upload_shard(digest)}/{key}"
+        staged_path = os.path.join(staging_folder, key)
+        os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+        os.replace(temp_path, staged_path)
+        return key, staged_path, size
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def publish_staged_files(storage, staged_path, keys, derived_paths, content_type=None):
+    """스테이징된 원본(keys[0])과 파생 파일들(keys[1:])을 저장소에 올림"""
+    for key, path in zip(keys, [staged_path] + derived_paths):
+        storage.put_file(key, path, content_type)
+
+def save_profile_image(file):
+    """프로필 이미지를 내용 해시 파일명으로 저장하고 썸네일을 만든 뒤 파일명을 반환"""
+    filename, staged_path, _ = save_file_by_content_hash(
+        file, app.config["PROFILE_FOLDER"], profile_image_extension(file), 16)
+    
+    if profile_storage.exists(filename):
+        # 같은 내용의 프로필 이미지가 이미 있으면 재사용
+        os.remove(staged_path)
+        return filename
+    
+    sizes = list(app.config["AVATAR_SIZES"].values())
+    create_avatar_thumbnails(staged_path)
+    publish_staged_files(
+        profile_storage, staged_path,
+        [filename] + [avatar_thumbnail_filename(filename, size) for size in sizes],
+        [avatar_thumbnail_filename(staged_path, size) for size in sizes],
+        file.mimetype
+    )
+    return filename
+
+def unreferenced_profile_keys(keys):
+    """삭제 직전 확인: 그 사이 다른 사용자가 같은 이미지를 프로필로 쓰게 된 키는 제외"""
+    originals = {key: re.sub(r'__s\d+(?=\.[^.]+$)', '', key) for key in keys}
+    in_use = set(users_collection.distinct("profile_img", {"profile_img": {"$in": list(set(originals.values()))}}))
+    return [key for key in keys if originals[key] not in in_use]
+
+def delete_profile_image_files(filename):
+    """다른 사용자가 쓰지 않는 프로필 이미지 원본과 썸네일들의 삭제를 예약"""
+    if not filename or users_collection.count_documents({"profile_img": filename}, limit=1):
+        return []
+    
+    keys = [filename] + [avatar_thumbnail_filename(filename, size)
+                         for size in app.config["AVATAR_SIZES"].values()]
+    return enqueue_file_deletion("profile_imgs", keys)
+
+@app.template_global()
+def avatar_url(profile_img, size=None):
+    """템플릿용 프로필 이미지 URL (size: "small"/"medium", None이면 원본)"""
+    if not profile_img:
+        return DEFAULT_AVATAR_URL
+    
+    # 해시 파일명이 아닌 기존 프로필(username_profile.jpg)은 썸네일이 없으므로 원본 사용
+    if size and HASHED_AVATAR_PATTERN.match(profile_img):
+        profile_img = avatar_thumbnail_filename(profile_img, app.config["AVATAR_SIZES"][size])
+    return f"/static/profile_imgs/{profile_img}"
+
+@app.after_request
+def add_immutable_cache_headers(response):
+    """내용 해시 파일명의 정적 파일은 내용이 바뀌지 않으므로 장기 캐시 허용"""
+    if response.status_code not in (200, 304):
+        return response
+    
+    filename = request.path.rsplit("/", 1)[-1]
+    if request.path.startswith("/static/profile_imgs/"):
+        is_hashed = HASHED_AVATAR_PATTERN.match(filename)
+    elif request.path.startswith("/static/uploads/"):
+        is_hashed = HASHED_UPLOAD_PATTERN.match(filename)
+    else:
+        is_hashed = False
+    
+    if is_hashed:
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+# 반응형 이미지 관련 헬퍼 함수들
+def image_variant_filename(filename, width):
+    """원본 파일명(또는 경로)에 대한 폭별 축소본 파일명을 반환 (photo.jpg -> photo__w640.jpg)"""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}__w{width}{ext}"
+
+def is_image_variant(filename):
+    """파일명이 반응형 축소본인지 확인"""
+    return bool(IMAGE_VARIANT_PATTERN.search(os.path.splitext(filename)[0]))
+
+def create_image_variants(file_path):
+    """원본 이미지의 (폭, 높이)와 생성된 축소본 폭 목록을 반환 (이미 있는 축소본은 재사용)"""
+    if Image is None:
+        return None, []
+    
+    try:
+        with Image.open(file_path) as img:
+            width, height = img.size
+            
+            # 애니메이션 GIF/WebP는 축소하면 프레임이 사라지므로 원본만 사용
+            if getattr(img, "is_animated", False):
+                return (width, height), []
+            
+            variant_widths = []
+            for target_width in app.config["IMAGE_VARIANT_WIDTHS"]:
+                if target_width >= width:
+                    break
+                variant_path = image_variant_filename(file_path, target_width)
+                if not os.path.exists(variant_path):
+                    resized = img.copy()
+                    resized.thumbnail((target_width, height))
+                    resized.save(variant_path)
+                variant_widths.append(target_width)
+            
+            return (width, height), variant_widths
+    except Exception as e:
+        print(f"반응형 이미지 생성 실패: {file_path}, 오류: {e}")
+        return None, []
+
+def lookup_image_variants(src, uploads):
+    """업로드 이미지의 (폭, 높이)와 축소본 폭 목록을 조회 (업로드 시 기록한 정보 우선)"""
+    upload = uploads.get(upload_key(src))
+    if upload and upload.get("width"):
+        return (upload["width"], upload["height"]), upload.get("variantWidths", [])
+    
+    # 정보가 없는 기존 로컬 파일은 직접 열어서 확인
+    file_path = local_upload_path(src)
+    if file_path and os.path.isfile(file_path):
+        return create_image_variants(file_path)
+    return None, None
+
+def local_upload_path(src):
+    """업로드 URL에 해당하는 로컬 파일 경로 (글 HTML에서 온 값이므로 업로드 폴더 밖을 가리키면 None)"""
+    upload_root = os.path.realpath(app.config["UPLOAD_FOLDER"])
+    file_path = os.path.realpath(os.path.join(upload_root, upload_key(src)))
+    if os.path.commonpath([upload_root, file_path]) != upload_root or file_path == upload_root:
+        return None
+    return file_path
+
+def rewrite_post_images(content):
+    """글 저장 시 업로드 이미지 태그에 lazy 로딩, 고유 크기(width/height), srcset 속성을 추가"""
+    if not content:
+        return content
+    
+    # 글에 포함된 업로드 이미지 정보를 한 번에 조회
+    keys = [upload_key(url) for url in extract_image_urls_from_content(content) if url.startswith('/static/uploads/')]
+    uploads = {upload["_id"]: upload for upload in db["uploads"].find({"_id": {"$in": keys}})} if keys else {}
+    
+    def rewrite_tag(match):
+        tag = match.group(0)
+        src_match = re.search(r'src="(/static/uploads/[^"]+)"', tag)
+        if not src_match:
+            return tag
+        
+        src = src_match.group(1)
+        size, variant_widths = lookup_image_variants(src, uploads)
+        if variant_widths is None:
+            return tag
+        
+        # 이전 저장 시 추가한 속성은 제거 후 다시 계산 (수정 시 여러 번 거쳐도 동일한 결과)
+        tag = re.sub(r'\s(?:loading|decoding|width|height|srcset|sizes)="[^"]*"', '', tag)
+        
+        attrs = ' loading="lazy" decoding="async"'
+        if size:
+            attrs += f' width="{size[0]}" height="{size[1]}"'
+            if variant_widths:
+                candidates = [f"{image_variant_filename(src, w)} {w}w" for w in variant_widths]
+                candidates.append(f"{src} {size[0]}w")
+                attrs += f' srcset="{", ".join(candidates)}" sizes="(max-width: {size[0]}px) 100vw, {size[0]}px"'
+        
+        if tag.endswith('/>'):
+            return tag[:-2].rstrip() + attrs + ' />'
+        return tag[:-1] + attrs + '>'
+    
+    return IMG_TAG_PATTERN.sub(rewrite_tag, content)
+
 # 이미지 삭제 관련 헬퍼 함수들
 def extract_image_urls_from_content(content):
     """HTML 콘텐츠에서 이미지 URL들을 추출"""
@@ -74,28 +509,112 @@ def extract_image_urls_from_content(content):
     return urls
 
 def delete_image_files(image_urls):
-    """이미지 URL들에 해당하는 실제 파일들을 삭제"""
-    deleted_files = []
+    """이미지 URL들에 해당하는 실제 파일들의 삭제를 예약하고 예약된 키 목록을 반환
+
+    파일 삭제는 작업 큐(delete_stored_files)가 처리하므로 요청은 저장소 I/O를 기다리지 않는다.
+    """
+    keys = []
     for url in image_urls:
         try:
-            # URL에서 파일 경로 추출 (/static/uploads/filename.jpg -> static/uploads/filename.jpg)
+            # URL에서 저장소 키 추출 (/static/uploads/ab/filename.jpg -> ab/filename.jpg)
             if url.startswith('/static/uploads/'):
-                file_path = url[1:]  # 앞의 '/' 제거
-                full_path = os.path.join(os.getcwd(), file_path)
+                key = upload_key(url)
+                
+                # 원본과 함께 생성된 반응형 축소본들도 삭제
+                keys.append(key)
+                keys.extend(image_variant_filename(key, width) for width in app.config["IMAGE_VARIANT_WIDTHS"])
                 
-                if os.path.exists(full_path):
-                    os.remove(full_path)
-                    deleted_files.append(full_path)
-                    print(f"삭제된 이미지: {full_path}")
+                # 참조 카운트 문서도 함께 정리
+                db["uploads"].delete_one({"_id": key})
+                print(f"삭제 예약된 이미지: {url}")
         except Exception as e:
             print(f"이미지 삭제 실패: {url}, 오류: {e}")
     
-    return deleted_files
-
-def delete_post_images(post_content):
-    """포스트 콘텐츠에서 이미지들을 찾아서 삭제"""
+    return enqueue_file_deletion("uploads", keys)
+
+def enqueue_file_deletion(storage_name, keys):
+    """저장소("uploads"/"profile_imgs")의 파일 삭제 작업을 예약하고 예약된 키 목록을 반환
+
+    작업은 DB에 남으므로 삭제하기 전에 프로세스가 종료되어도 워커가 이어서 처리한다.
+    """
+    keys = [key for key in keys if key]
+    if keys:
+        job_queue.enqueue("delete_stored_files", {"storage": storage_name, "keys": keys})
+    return keys
+
+def unregistered_upload_keys(keys):
+    """삭제 직전 확인: 작업이 기다리는 동안 같은 이미지가 다시 업로드(등록)된 키는 제외"""
+    originals = {key: re.sub(r'__w\d+(?=\.[^.]+$)', '', key) for key in keys}
+    registered = {upload["_id"] for upload in db["uploads"].find(
+        {"_id": {"$in": list(set(originals.values()))}}, {"_id": 1})}
+    return [key for key in keys if originals[key] not in registered]
+
+def upload_key(url):
+    """업로드 URL에서 참조 카운트 문서의 키(업로드 폴더 기준 상대 경로)를 추출"""
+    return url[len('/static/uploads/'):]
+
+def ensure_upload_indexes():
+    # 최근 미사용 업로드 정리(find_recent_uploaded_images)가 등록 시각으로 찾음
+    db["uploads"].create_index([("createdAt", 1), ("refCount", 1)])
+
+def register_upload(filename, size, image_size=None, variant_widths=None):
+    """업로드 파일의 참조 카운트 문서를 생성하고 이미지 크기/축소본 정보를 기록 (참조 카운트는 유지)"""
+    update = {"$setOnInsert": {
+        "refCount": 0,
+        "createdAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+    }, "$set": {"size": size}}
+    if image_size:
+        update["$set"].update({
+            "width": image_size[0],
+            "height": image_size[1],
+            "variantWidths": variant_widths or []
+        })
+    db["uploads"].update_one({"_id": filename}, update, upsert=True)
+
+def add_image_references(image_urls):
+    """글에서 사용하게 된 업로드 이미지들의 참조 카운트를 1씩 증가"""
+    for url in set(image_urls):
+        if url.startswith('/static/uploads/'):
+            db["uploads"].update_one({"_id": upload_key(url)}, {"$inc": {"refCount": 1}})
+
+def release_image_references(image_urls, release_id=None):
+    """글에서 빠진 업로드 이미지들의 참조 카운트를 줄이고, 더 이상 참조되지 않는 파일은 삭제
+
+    release_id가 주어지면 업로드 문서의 releasedBy에 기록해서, 같은 release_id로 다시 실행되어도
+    (작업 재실행) 참조 카운트를 한 번만 줄임
+    """
+    unreferenced = []
+    for url in set(image_urls):
+        if not url.startswith('/static/uploads/'):
+            continue
+        key = upload_key(url)
+        if release_id is None:
+            upload = db["uploads"].find_one_and_update(
+                {"_id": key},
+                {"$inc": {"refCount": -1}},
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            upload = db["uploads"].find_one_and_update(
+                {"_id": key, "releasedBy": {"$ne": release_id}},
+                {
+                    "$inc": {"refCount": -1},
+                    "$push": {"releasedBy": {"$each": [release_id], "$slice": -IMAGE_RELEASE_HISTORY}}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if upload is None:
+                # 이미 이 release_id로 해제된 문서면 카운트는 그대로 두고 삭제 여부만 다시 확인
+                upload = db["uploads"].find_one({"_id": key}, {"refCount": 1})
+        # 참조 카운트 문서가 없는 기존 파일(타임스탬프 파일명)은 이전처럼 바로 삭제
+        if upload is None or upload.get("refCount", 0) <= 0:
+            unreferenced.append(url)
+    return delete_image_files(unreferenced)
+
+def delete_post_images(post_content, release_id=None):
+    """포스트 콘텐츠에서 이미지들의 참조를 해제하고 더 이상 쓰이지 않는 파일을 삭제"""
     image_urls = extract_image_urls_from_content(post_content)
-    return delete_image_files(image_urls)
+    return release_image_references(image_urls, release_id)
 
 def delete_team_images(team_data):
     """팀의 모든 포스트에서 이미지들을 찾아서 삭제"""
@@ -120,44 +639,59 @@ def find_unused_images_in_edit(old_content, new_content):
     return unused_images
 
 def delete_unused_images_on_edit(old_content, new_content):
-    """글 수정 시 사용하지 않는 이미지들을 삭제"""
+    """글 수정 시 새로 추가된 이미지는 참조를 늘리고, 빠진 이미지는 참조를 해제"""
+    old_images = set(extract_image_urls_from_content(old_content))
+    added_images = [img for img in extract_image_urls_from_content(new_content) if img not in old_images]
+    add_image_references(added_images)
+    
     unused_images = find_unused_images_in_edit(old_content, new_content)
     if unused_images:
-        deleted_files = delete_image_files(unused_images)
+        deleted_files = release_image_references(unused_images)
         return deleted_files
     return []
 
+def is_original_upload(key):
+    """축소본은 원본과 함께 삭제되므로 원본 이미지 파일만 대상으로 함"""
+    filename = key.rsplit('/', 1)[-1]
+    return not is_image_variant(filename) and allowed_file(filename)
+
+def iter_upload_files(upload_folder=None):
+    """로컬 업로드 폴더(샤드 하위 폴더 포함)의 원본 이미지들을 (URL, os.DirEntry)로 순회
+
+    os.scandir의 DirEntry는 파일 종류를 디렉터리 목록에서 바로 알 수 있고 stat 결과도 캐시하므로
+    파일마다 isfile/getctime 시스템 콜을 따로 부르지 않는다.
+    """
+    upload_folder = upload_folder or os.path.join(os.getcwd(), app.config["UPLOAD_FOLDER"])
+    for key, entry in iter_local_files(upload_folder):
+        if is_original_upload(key):
+            yield f"/static/uploads/{key}", entry
+
+def iter_stored_uploads():
+    """업로드 저장소(로컬/S3)의 원본 이미지들을 (URL, 생성 시각 timestamp)로 순회"""
+    for key, created_at in upload_storage.list_files():
+        if is_original_upload(key):
+            yield f"/static/uploads/{key}", created_at
+
+def collect_used_images():
+    """모든 팀의 모든 포스트에서 사용 중인 이미지 URL 집합"""
+    used_images = set()
+    for team in find_teams({}, {"posts.content": 1}):
+        for post in team.get("posts", []):
+            used_images.update(extract_image_urls_from_content(post.get("content", "")))
+    return used_images
+
 def find_recent_uploaded_images():
     """최근 업로드된 이미지들 중 어떤 글에서도 사용되지 않는 이미지들을 찾음"""
     try:
-        # 최근 1시간 내에 업로드된 이미지들 찾기
-        upload_folder = os.path.join(os.getcwd(), 'static/uploads')
-        if not os.path.exists(upload_folder):
+        # 최근 1시간 내에 등록된 업로드 중 참조되지 않는 것만 후보로 (저장소 전체를 나열하지 않음)
+        threshold = datetime.datetime.utcnow() + datetime.timedelta(hours=9) - datetime.timedelta(hours=1)
+        recent_images = [f"/static/uploads/{upload['_id']}" for upload in db["uploads"].find(
+            {"createdAt": {"$gte": threshold}, "refCount": {"$lte": 0}}, {"_id": 1})]
+        if not recent_images:
             return []
         
-        recent_images = []
-        current_time = datetime.datetime.now()
-        
-        for filename in os.listdir(upload_folder):
-            file_path = os.path.join(upload_folder, filename)
-            if os.path.isfile(file_path):
-                # 파일 생성 시간 확인 (1시간 이내)
-                file_time = datetime.datetime.fromtimestamp(os.path.getctime(file_path))
-                if (current_time - file_time).total_seconds() < 3600:  # 1시간
-                    recent_images.append(f"/static/uploads/{filename}")
-        
-        # 모든 팀의 모든 포스트에서 사용 중인 이미지들 수집
-        used_images = set()
-        teams = list(db["teams"].find({}))
-        
-        for team in teams:
-            posts = team.get("posts", [])
-            for post in posts:
-                content = post.get("content", "")
-                post_images = extract_image_urls_from_content(content)
-                used_images.update(post_images)
-        
         # 사용되지 않는 최근 이미지들 반환
+        used_images = collect_used_images()
         unused_recent_images = [img for img in recent_images if img not in used_images]
         return unused_recent_images
         
@@ -176,29 +710,11 @@ def cleanup_unused_recent_images():
 def cleanup_all_unused_images():
     """전체 업로드 폴더에서 사용되지 않는 모든 이미지들을 정리"""
     try:
-        upload_folder = os.path.join(os.getcwd(), 'static/uploads')
-        if not os.path.exists(upload_folder):
-            return []
-        
         # 업로드 폴더의 모든 이미지 파일들
-        all_images = []
-        for filename in os.listdir(upload_folder):
-            file_path = os.path.join(upload_folder, filename)
-            if os.path.isfile(file_path) and any(filename.lower().endswith(ext) for ext in ['jpg', 'jpeg', 'png', 'gif', 'webp']):
-                all_images.append(f"/static/uploads/{filename}")
-        
-        # 모든 팀의 모든 포스트에서 사용 중인 이미지들 수집
-        used_images = set()
-        teams = list(db["teams"].find({}))
-        
-        for team in teams:
-            posts = team.get("posts", [])
-            for post in posts:
-                content = post.get("content", "")
-                post_images = extract_image_urls_from_content(content)
-                used_images.update(post_images)
+        all_images = [url for url, _ in iter_stored_uploads()]
         
         # 사용되지 않는 이미지들 찾기
+        used_images = collect_used_images()
         unused_images = [img for img in all_images if img not in used_images]
         
         # 사용되지 않는 이미지들 삭제
@@ -213,6 +729,743 @@ def cleanup_all_unused_images():
         print(f"전체 이미지 정리 중 오류: {e}")
         return []
 
+# 알림 버전 관련 헬퍼 함수들
+def bump_notification_version(user_ids):
+    """사용자들의 알림 버전을 올림 (알림이 생기거나 읽음/삭제될 때마다 호출, 폴링 ETag에 사용)"""
+    user_ids = list(set(user_ids))
+    if user_ids:
+        users_collection.update_many({"_id": {"$in": user_ids}}, {"$inc": {"notificationVersion": 1}})
+        for user_id in user_ids:
+            invalidation_bus.publish("users", user_id)
+
+def notification_etag(user):
+    """사용자의 알림 상태를 나타내는 ETag 값 (버전이 같으면 알림 목록도 같음)"""
+    return f"notifications-{user['_id']}-{user.get('notificationVersion', 0)}"
+
+def client_notification_version(user):
+    """If-None-Match로 받은 ETag에서 클라이언트가 가진 알림 버전을 꺼냄 (없으면 None)"""
+    prefix = f"notifications-{user['_id']}-"
+    for tag in request.if_none_match.as_set(include_weak=True):
+        if tag.startswith(prefix) and tag[len(prefix):].isdigit():
+            return int(tag[len(prefix):])
+    return None
+
+# --- 백그라운드 작업 (worker.py로 실행, 요청은 큐에 넣기만 함) ---
+job_queue = JobQueue(db["jobs"])
+
+# 알림 묶음 하나에 기억해 둘 최근 이벤트 _id 수 (작업 재실행 시 중복 집계 방지용)
+NOTIFICATION_EVENT_HISTORY = 50
+
+def ensure_notification_indexes():
+    """알림 컬렉션 인덱스 생성"""
+    # 읽지 않은 알림 묶음은 (받는 사람, 묶음 키)마다 하나만 존재
+    db["notifications"].create_index(
+        [("userId", 1), ("groupKey", 1)], unique=True,
+        partialFilterExpression={"isRead": False, "groupKey": {"$exists": True}}
+    )
+    # 알림 목록 정렬, 읽지 않은 개수, 사용자별 개수 제한에 사용
+    db["notifications"].create_index([("userId", 1), ("isRead", 1), ("createdAt", -1)])
+    # since 커서 이후에 새로 생기거나 묶인 알림 조회 (delta 폴링)
+    db["notifications"].create_index([("userId", 1), ("changeId", -1)])
+
+    # 읽은 알림은 readAt 기준으로 자동 삭제 (읽지 않은 알림에는 readAt이 없어서 지워지지 않음)
+    ttl_seconds = app.config["NOTIFICATION_READ_TTL_DAYS"] * 24 * 3600
+    try:
+        db["notifications"].create_index("readAt", expireAfterSeconds=ttl_seconds)
+    except OperationFailure:
+        # 보관 기간 설정이 바뀐 경우 기존 TTL 인덱스의 기간만 변경
+        db.command("collMod", "notifications",
+                   index={"keyPattern": {"readAt": 1}, "expireAfterSeconds": ttl_seconds})
+
+# 알림 인덱스를 확인한 프로세스는 다시 확인하지 않음
+notification_indexes_ready = False
+
+def require_notification_indexes():
+    """알림 묶음은 (받는 사람, 묶음 키) 유니크 인덱스가 있어야 하나로 합쳐지므로 작업 전에 프로세스마다 한 번 확인
+
+    인덱스를 만들 수 없으면 예외가 나서 작업이 실패하고 재시도됨 (묶음이 여러 개로 쪼개지지 않음)
+    """
+    global notification_indexes_ready
+    if not notification_indexes_ready:
+        ensure_notification_indexes()
+        notification_indexes_ready = True
+
+def trim_user_notifications(user_id):
+    """사용자별 최대 알림 수를 넘는 오래된 알림 삭제 (읽지 않은 최신 알림을 우선 남김)"""
+    limit = app.config["NOTIFICATION_MAX_PER_USER"]
+    if not limit:
+        return 0
+
+    overflow_ids = [n["_id"] for n in db["notifications"].find(
+        {"userId": user_id}, {"_id": 1}
+    ).sort([("isRead", 1), ("createdAt", -1)]).skip(limit)]
+    if overflow_ids:
+        db["notifications"].delete_many({"_id": {"$in": overflow_ids}})
+    return len(overflow_ids)
+
+def notification_group_key(notification):
+    """같은 글에 달린 같은 종류의 알림을 하나로 묶는 키"""
+    return f"{notification['type']}:{notification['teamId']}:{notification['postTitle']}"
+
+def notification_title(notification):
+    """묶인 알림 수와 참여한 사람 수에 맞춘 알림 제목"""
+    count = notification.get("count", 1)
+    if count <= 1:
+        return notification.get("title", "")
+
+    noun = "답댓글" if notification.get("type") == "reply" else "댓글"
+    others = len(notification.get("actorIds", [])) - 1
+    if others > 0:
+        return f"{notification['latestActor']}님 외 {others}명이 {noun} {count}개를 달았습니다"
+    return f"{notification['latestActor']}님이 {noun} {count}개를 달았습니다"
+
+@job_queue.handler("create_notification")
+def create_notification_job(notification):
+    """알림 저장 - 같은 글의 읽지 않은 같은 종류 알림이 있으면 새 문서 대신 개수와 마지막 작성자만 갱신
+
+    notification["_id"]는 이벤트 id로 쓰여 eventIds에 기록되므로 작업이 재실행되어도 한 번만 집계됨
+    묶음의 _id는 처음 이벤트 id로 유지되므로, 새로 묶일 때마다 changeId를 새로 매겨서 delta 폴링이 바뀐 묶음을 받게 함
+    """
+    require_notification_indexes()
+    event_id = notification.pop("_id")
+    actor_prefix = "replyAuthor" if notification["type"] == "reply" else "commentAuthor"
+    group_key = notification_group_key(notification)
+
+    query = {
+        "userId": notification["userId"],
+        "groupKey": group_key,
+        "isRead": False,
+        "eventIds": {"$ne": event_id}
+    }
+    update = {
+        "$setOnInsert": {
+            "_id": event_id,
+            "type": notification["type"],
+            "postTitle": notification["postTitle"],
+            "teamId": notification["teamId"],
+            "firstCreatedAt": notification["createdAt"]
+        },
+        # 목록에는 가장 최근 이벤트 내용이 보이도록 덮어씀
+        "$set": {
+            **{key: value for key, value in notification.items()
+               if key not in ("userId", "type", "postTitle", "teamId", "isRead")},
+            "latestActor": notification.get(actor_prefix),
+            "latestActorId": notification.get(f"{actor_prefix}Id"),
+            "changeId": ObjectId()
+        },
+        "$inc": {"count": 1},
+        "$addToSet": {"actorIds": notification.get(f"{actor_prefix}Id")},
+        "$push": {"eventIds": {"$each": [event_id], "$slice": -NOTIFICATION_EVENT_HISTORY}}
+    }
+
+    try:
+        result = db["notifications"].update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # 동시에 같은 묶음을 만들었거나 이미 반영된 이벤트 -> 기존 묶음에만 반영 시도
+        result = db["notifications"].update_one(query, update)
+
+    if result.upserted_id:
+        # 새 묶음이 생겼을 때만 문서 수가 늘어나므로 이때만 개수 제한 확인
+        trim_user_notifications(notification["userId"])
+    if result.modified_count or result.upserted_id:
+        bump_notification_version([notification["userId"]])
+
+@job_queue.handler("release_post_images")
+def release_post_images_job(contents, release_id=None):
+    """삭제된 글(들)의 이미지 참조를 해제하고 더 이상 쓰이지 않는 파일 삭제
+
+    release_id는 작업을 넣을 때 정해지므로 작업이 재실행되어도 같은 이미지의 참조를 두 번 해제하지 않음
+    """
+    deleted_files = []
+    for index, content in enumerate(contents):
+        deleted_files.extend(delete_post_images(content, f"{release_id}:{index}" if release_id else None))
+    if deleted_files:
+        print(f"삭제된 글에서 {len(deleted_files)}개의 이미지 파일을 정리했습니다.")
+
+@job_queue.handler("delete_stored_files")
+def delete_stored_files_job(storage, keys):
+    """삭제 직전 확인을 통과한 파일만 삭제 (이미 없는 파일은 건너뛰므로 재실행되어도 안전)"""
+    if storage == "profile_imgs":
+        target, keys = profile_storage, unreferenced_profile_keys(keys)
+    else:
+        target, keys = upload_storage, unregistered_upload_keys(keys)
+    deleted = target.delete_many(keys) if keys else []
+    print(f"백그라운드 삭제: {len(deleted)}개 파일")
+
+@job_queue.handler("cleanup_unused_recent_images")
+def cleanup_unused_recent_images_job():
+    """사용되지 않는 최근 업로드 이미지 정리"""
+    recent_deleted = cleanup_unused_recent_images()
+    if recent_deleted:
+        print(f"미사용 최근 업로드 이미지 {len(recent_deleted)}개를 정리했습니다.")
+
+# 팀 삭제 정리 작업의 배치 크기 (한 번의 작업이 visibility timeout 안에 끝나도록 작게 유지)
+TEAM_SWEEP_POST_BATCH = 20
+TEAM_SWEEP_NOTIFICATION_BATCH = 500
+
+def mark_team_deleted(team):
+    """팀을 삭제 상태(tombstone)로 표시하고 정리 진행 상황을 기록할 필드를 초기화"""
+    now = datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+    return team_collection(team).update_one(
+        {"_id": team["_id"], "deletedAt": None},
+        {"$set": {
+            "deletedAt": now,
+            "deletion": {
+                "phase": "images",
+                "totalPosts": len(team.get("posts", [])),
+                "postsProcessed": 0,
+                "notificationsDeleted": 0,
+                "startedAt": now,
+                "updatedAt": now
+            }
+        }}
+    )
+
+@job_queue.handler("sweep_deleted_team")
+def sweep_deleted_team_job(team_id):
+    """삭제 표시된 팀을 한 배치씩 정리 (이미지 -> 알림 -> 팀 문서 순서, 배치마다 다음 작업을 다시 예약)
+
+    추천/좋아요 기록은 팀 문서 안에 있으므로 마지막 단계에서 문서와 함께 삭제된다.
+    """
+    team = find_team(
+        {"_id": team_id, "deletedAt": {"$ne": None}},
+        {"deletion": 1, "teamName": 1, "archivedAt": 1}
+    )
+    if not team:
+        return
+    
+    teams = team_collection(team)
+    deletion = team.get("deletion", {})
+    phase = deletion.get("phase", "images")
+    now = datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+    
+    if phase == "images":
+        start = deletion.get("postsProcessed", 0)
+        batch = teams.find_one({"_id": team_id}, {"posts": {"$slice": [start, TEAM_SWEEP_POST_BATCH]}, "_id": 1})
+        posts = batch.get("posts", []) if batch else []
+        done = len(posts) < TEAM_SWEEP_POST_BATCH
+        
+        # 참조를 먼저 해제한 뒤 진행 상황을 기록 (그 사이 중단되면 같은 배치를 다시 처리)
+        # 해제 id가 (팀, 글 위치)로 정해지므로 다시 처리해도 같은 이미지의 참조를 두 번 줄이지 않음
+        for index, post in enumerate(posts, start=start):
+            if post.get("content"):
+                delete_post_images(post["content"], f"sweep:{team_id}:{index}")
+        teams.update_one(
+            {"_id": team_id, "deletion.postsProcessed": start},
+            {"$set": {
+                "deletion.postsProcessed": start + len(posts),
+                "deletion.phase": "notifications" if done else "images",
+                "deletion.updatedAt": now
+            }}
+        )
+    
+    elif phase == "notifications":
+        notifications = list(db["notifications"].find(
+            {"teamId": team_id}, {"_id": 1, "userId": 1}).limit(TEAM_SWEEP_NOTIFICATION_BATCH))
+        notification_ids = [n["_id"] for n in notifications]
+        if notification_ids:
+            db["notifications"].delete_many({"_id": {"$in": notification_ids}})
+            bump_notification_version([n["userId"] for n in notifications])
+        
+        update = {"$inc": {"deletion.notificationsDeleted": len(notification_ids)},
+                  "$set": {"deletion.updatedAt": now}}
+        if len(notification_ids) < TEAM_SWEEP_NOTIFICATION_BATCH:
+            update["$set"]["deletion.phase"] = "finalize"
+        teams.update_one({"_id": team_id}, update)
+    
+    else:
+        teams.delete_one({"_id": team_id})
+        print(f"팀 '{team.get('teamName')}' 삭제 정리 완료: 글 {deletion.get('postsProcessed', 0)}개, 알림 {deletion.get('notificationsDeleted', 0)}개")
+        return
+    
+    enqueue_team_sweep(team_id)
+
+def enqueue_team_sweep(team_id):
+    """삭제된 팀 정리 작업 예약 (이미 대기 중인 정리 작업이 있으면 하나로 합쳐짐)"""
+    job_queue.enqueue("sweep_deleted_team", {"team_id": team_id}, dedupe_key=f"sweep_deleted_team:{team_id}")
+
+def enqueue_recent_images_cleanup():
+    """최근 업로드 이미지 정리 작업 예약 (이미 대기 중인 정리 작업이 있으면 하나로 합쳐짐)"""
+    job_queue.enqueue("cleanup_unused_recent_images", dedupe_key="cleanup_unused_recent_images")
+
+# 글/댓글 검색 인덱스 (글이나 댓글이 바뀔 때마다 그 글만 백그라운드에서 다시 색인, 팀 삭제는 팀 단위)
+search_index = SearchIndex(db["post_search"])
+SEARCH_PAGE_SIZE = 20
+
+@job_queue.handler("reindex_team_search")
+def reindex_team_search_job(team_id):
+    """팀의 글 검색 문서 갱신 (삭제된 팀이면 검색 문서 삭제)"""
+    team = find_team(
+        {"_id": team_id, "deletedAt": None},
+        {"teamName": 1, "week": 1, "posts": 1}
+    )
+    if team:
+        search_index.index_team(team)
+    else:
+        search_index.remove_team(team_id)
+
+@job_queue.handler("reindex_post_search")
+def reindex_post_search_job(team_id, post_id=None, title=None):
+    """글 하나의 검색 문서 갱신 (글이 삭제되었거나 예전 글의 제목이 바뀌었으면 검색 문서 삭제)"""
+    # 예전 글은 _id가 없어서 제목으로 찾음
+    post_filter = {"_id": post_id} if post_id else {"title": title, "_id": {"$exists": False}}
+    team = find_team(
+        {"_id": team_id, "deletedAt": None},
+        {"teamName": 1, "week": 1, "posts": {"$elemMatch": post_filter}}
+    )
+    posts = team.get("posts", []) if team else []
+    if posts:
+        search_index.index_post(team, posts[0])
+    else:
+        search_index.remove_post(team_id, {"_id": post_id, "title": title})
+
+# 사용자/팀 이름 자동완성 인덱스 (가입, 팀 생성/삭제 시 바로 갱신)
+autocomplete_index = AutocompleteIndex(db["autocomplete"])
+AUTOCOMPLETE_LIMIT = 10
+
+# 전체 기간/인기 급상승 순위 (추천, 좋아요, 댓글이 생길 때마다 점수만 더함)
+leaderboard = Leaderboard(db["leaderboard"])
+LEADERBOARD_LIMIT = 50
+
+# 사용자별 활동 통계 (users.stats: 참여한 팀, 작성한 글, 받은 좋아요) - 각 라우트에서 바로 증감
+def increment_user_stats(user_id, **deltas):
+    """사용자 통계 증감 (예: increment_user_stats(user_id, postsWritten=1))"""
+    if user_id and deltas:
+        users_collection.update_one({"_id": user_id}, {"$inc": {f"stats.{key}": value for key, value in deltas.items()}})
+        invalidation_bus.publish("users", user_id)
+
+def release_team_user_stats(team):
+    """삭제된 팀의 멤버/글 작성자 통계에서 팀 몫을 뺌"""
+    member_ids = [member["userId"] for member in team.get("members", [])]
+    if member_ids:
+        users_collection.update_many({"_id": {"$in": member_ids}}, {"$inc": {"stats.teamsJoined": -1}})
+        for member_id in member_ids:
+            invalidation_bus.publish("users", member_id)
+    
+    authored = {}
+    for post in team.get("posts", []):
+        if post.get("authorId"):
+            posts, likes = authored.get(post["authorId"], (0, 0))
+            authored[post["authorId"]] = (posts + 1, likes + post.get("likes", 0))
+    for author_id, (posts, likes) in authored.items():
+        increment_user_stats(author_id, postsWritten=-posts, likesReceived=-likes)
+
+def find_post_by_title(team, post_title):
+    """팀 문서에서 제목으로 글 찾기"""
+    return next((post for post in team.get("posts", []) if post.get("title") == post_title), None)
+
+@job_queue.handler("propagate_member_snapshot")
+def propagate_member_snapshot_job(user_id, old_profile_img=None):
+    """프로필 변경을 팀 멤버 스냅샷과 주차 요약에 반영한 뒤, 더 이상 쓰이지 않는 이전 프로필 이미지 삭제"""
+    propagate_member_snapshot(user_id)
+    update_user_week_summaries(user_id)
+    # 스냅샷/요약이 모두 새 이미지를 가리킨 뒤에 지워야 팀 카드에 깨진 이미지가 보이지 않음
+    # (위 단계가 실패하면 작업이 재시도되므로 이전 이미지도 그때까지 남아 있음)
+    if old_profile_img:
+        delete_profile_image_files(old_profile_img)
+
+def enqueue_search_reindex(team_id, post=None):
+    """검색 문서 갱신 예약 - post가 있으면 그 글만, 없으면 팀 전체 (댓글이 연달아 달려도 대기 중인 작업 하나로 합쳐짐)"""
+    team_id = ObjectId(team_id)
+    if post is None:
+        job_queue.enqueue("reindex_team_search", {"team_id": team_id}, dedupe_key=f"reindex_team_search:{team_id}")
+        return
+    post_id, title = post.get("_id"), post.get("title", "")
+    job_queue.enqueue("reindex_post_search", {"team_id": team_id, "post_id": post_id, "title": title},
+                      dedupe_key=f"reindex_post_search:{post_search_key(team_id, post)}")
+
+# 사용자 아이디/닉네임 중복은 유니크 인덱스로 막음 (기존 중복 데이터는 migrate_user_indexes.py로 먼저 확인)
+# 인덱스가 아직 없는 DB(중복 정리 전, 인덱스 생성 전)에서는 가입 시 조회로 중복을 확인
+USER_UNIQUE_FIELDS = {"username": "username_unique", "nickname": "nickname_unique"}
+USER_DUPLICATE_MESSAGES = {"username": "User already exists!", "nickname": "Nickname already exists!"}
+
+def ensure_user_indexes():
+    for field, index_name in USER_UNIQUE_FIELDS.items():
+        users_collection.create_index(field, unique=True, name=index_name)
+
+# 유니크 인덱스가 있는 것을 확인한 프로세스는 다시 확인하지 않음
+user_indexes_ready = False
+
+def user_unique_indexes_ready():
+    """username/nickname 유니크 인덱스가 모두 있는지 (없으면 가입 시 조회로 중복 확인)"""
+    global user_indexes_ready
+    if not user_indexes_ready:
+        indexes = users_collection.index_information()
+        user_indexes_ready = all(indexes.get(index_name, {}).get("unique")
+                                 for index_name in USER_UNIQUE_FIELDS.values())
+    return user_indexes_ready
+
+def duplicate_user_field(error):
+    """DuplicateKeyError가 어느 필드(username/nickname) 때문인지 반환"""
+    details = error.details or {}
+    key_pattern = details.get("keyPattern") or details.get("keyValue") or {}
+    for field, index_name in USER_UNIQUE_FIELDS.items():
+        if field in key_pattern or index_name in details.get("errmsg", str(error)):
+            return field
+    return "username"
+
+# 팀 멤버십 (memberships)
+# 팀 문서의 members 배열과 함께 (사용자, 주차)마다 문서 하나를 둬서
+# 유니크 인덱스로 "한 주차에는 한 팀" 규칙을 보장하고, 사용자가 속한 팀 조회에 사용
+def ensure_membership_indexes():
+    db["memberships"].create_index([("userId", 1), ("week", 1)], unique=True)
+    db["memberships"].create_index("teamId")
+
+def find_membership(user_id, week):
+    return db["memberships"].find_one({"userId": user_id, "week": week})
+
+def add_membership(user_id, team, role):
+    """멤버십 추가 - 같은 주차에 이미 다른 팀 멤버십이 있으면 추가하지 않고 그 멤버십을 반환
+
+    동시에 들어온 가입 요청도 유니크 인덱스 때문에 하나만 성공함
+    """
+    try:
+        db["memberships"].insert_one({
+            "userId": user_id,
+            "week": team["week"],
+            "teamId": team["_id"],
+            "teamName": team["teamName"],
+            "role": role,
+            "joinedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+        })
+        return None
+    except DuplicateKeyError:
+        return find_membership(user_id, team["week"])
+
+def membership_conflict_message(week, membership):
+    return f'{week}주차에 이미 "{membership["teamName"]}" 팀에 소속되어 있습니다. 한 주차에는 하나의 팀에만 소속될 수 있습니다.'
+
+def user_team_ids(user_id, listing=False):
+    """사용자가 속한 팀 id 목록 (listing: 목록 화면용 secondary 읽기)"""
+    memberships = listing_collection(db["memberships"]) if listing else db["memberships"]
+    return [membership["teamId"] for membership in memberships.find({"userId": user_id}, {"teamId": 1})]
+
+# 주차별 메인 페이지 요약 (week_summaries)
+# 메인 페이지/팀 목록은 주차마다 미리 만들어 둔 요약 문서 하나만 읽어서 그림
+# - 팀 생성/가입/삭제, 프로필 이미지 변경, 추천: 요약 안의 해당 팀/멤버 항목만 부분 갱신 (정렬은 읽을 때 함)
+# - 요약이 없는 주차는 처음 읽을 때 실제 데이터로 만듦
+# 부분 갱신마다 version이 올라가고, 전체를 다시 만들 때는 만드는 동안 version이 바뀌지 않았을 때만 덮어씀
+# (다시 만드는 사이에 들어온 추천/가입이 덮어써져 사라지지 않음)
+# 요약과 실제 데이터가 어긋났는지는 check_week_summaries.py로 확인
+TEAM_ROLE_ORDER = {"master": 0, "admin": 1, "member": 2}
+
+# 팀 멤버 스냅샷: teams.members 항목에 카드 표시용 사용자 정보(아이디, 닉네임, 프로필 이미지)를 같이 저장해서
+# 목록 화면에서 사용자 문서를 다시 조회하지 않음. 사용자 정보가 바뀌면 propagate_member_snapshot 작업이 갱신
+def member_snapshot(user):
+    return {
+        "username": user["username"],
+        "nickname": user["nickname"],
+        "profile_img": user.get("profile_img")
+    }
+
+def hydrate_member_snapshots(teams):
+    """스냅샷이 없는 예전 멤버 항목만 사용자 문서에서 한 번에 채움 (backfill_member_snapshots.py 실행 전 데이터용)"""
+    missing_ids = list({member["userId"] for team in teams for member in team.get("members", [])
+                        if "nickname" not in member})
+    if not missing_ids:
+        return
+    users_by_id = {user["_id"]: user for user in users_collection.find(
+        {"_id": {"$in": missing_ids}}, {"username": 1, "nickname": 1, "profile_img": 1})}
+    for team in teams:
+        for member in team.get("members", []):
+            if "nickname" not in member and member["userId"] in users_by_id:
+                member.update(member_snapshot(users_by_id[member["userId"]]))
+
+def member_card(member):
+    return {
+        "username": member["username"],
+        "nickname": member["nickname"],
+        "profile_img": member.get("profile_img"),
+        "role": member["role"]
+    }
+
+def team_member_cards(team):
+    """팀 카드/팀 페이지에 표시할 멤버 목록 (팀장 -> 관리자 -> 멤버 순)"""
+    team_members = [member_card(member) for member in team.get("members", []) if "nickname" in member]
+    team_members.sort(key=lambda x: TEAM_ROLE_ORDER.get(x["role"], 999))
+    return team_members
+
+def propagate_member_snapshot(user_id):
+    """사용자 정보가 바뀌면 그 사용자가 속한 모든 팀의 멤버 스냅샷을 한 번의 업데이트로 갱신"""
+    user = users_collection.find_one({"_id": user_id}, {"username": 1, "nickname": 1, "profile_img": 1})
+    if not user:
+        return 0
+    modified = 0
+    for collection_name in TEAM_COLLECTIONS:
+        modified += db[collection_name].update_many(
+            {"members.userId": user_id},
+            {"$set": {f"members.$[member].{field}": value for field, value in member_snapshot(user).items()}},
+            array_filters=[{"member.userId": user_id}]
+        ).modified_count
+    for team_id in user_team_ids(user_id):
+        invalidation_bus.publish("teams", team_id)
+    return modified
+
+def build_week_summary(week):
+    """주차의 팀 목록(멤버 정보 포함)을 실제 데이터로 계산"""
+    teams = find_teams(
+        {"week": week, "deletedAt": None},
+        {"teamName": 1, "description": 1, "week": 1, "upvote": 1, "members": 1}
+    )
+    
+    hydrate_member_snapshots(teams)
+    
+    summary_teams = [week_summary_team(team) for team in teams]
+    summary_teams.sort(key=lambda x: x["upvote"], reverse=True)
+    return {"_id": week, "teams": summary_teams}
+
+def week_summary_team(team):
+    """요약에 들어가는 팀 항목"""
+    team_members = team_member_cards(team)
+    return {
+        "id": str(team["_id"]),
+        "teamName": team["teamName"],
+        "description": team.get("description", ""),
+        "week": team["week"],
+        "upvote": team.get("upvote", 0),
+        "members": team_members,
+        "member_count": len(team_members)
+    }
+
+# 다시 만드는 동안 계속 요약이 바뀌면 이 횟수만큼만 다시 시도
+WEEK_SUMMARY_REFRESH_ATTEMPTS = 5
+
+def refresh_week_summary(week):
+    """주차 요약을 실제 데이터로 다시 만들어 저장 (만드는 동안 요약이 바뀌었으면 다시 만듦)"""
+    for _ in range(WEEK_SUMMARY_REFRESH_ATTEMPTS):
+        current = db["week_summaries"].find_one({"_id": week}, {"version": 1})
+        summary = build_week_summary(week)
+        summary["updatedAt"] = datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+        if current is None:
+            summary["version"] = 1
+            try:
+                db["week_summaries"].insert_one(summary)
+                break
+            except DuplicateKeyError:
+                continue  # 다른 요청이 먼저 만듦
+        summary["version"] = (current.get("version") or 0) + 1
+        # version이 그대로일 때만 교체 (예전 요약 문서에는 version이 없어서 None으로 비교)
+        if db["week_summaries"].replace_one({"_id": week, "version": current.get("version")}, summary).matched_count:
+            break
+    else:
+        print(f"⚠️ {week}주차 요약을 다시 만드는 동안 계속 변경되어 저장하지 못했습니다.")
+    invalidation_bus.publish("week_summaries", week)
+    enqueue_week_snapshot_export(week)
+    return summary
+
+def update_week_summary(week, query, update, team_id=None):
+    """요약 문서 부분 갱신 (요약이 아직 없으면 처음 읽을 때 실제 데이터로 만들어지므로 그대로 둠)"""
+    update.setdefault("$inc", {})["version"] = 1
+    update.setdefault("$set", {})["updatedAt"] = datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+    result = db["week_summaries"].update_one({"_id": week, **query}, update)
+    if result.modified_count:
+        invalidation_bus.publish("week_summaries", week)
+        enqueue_week_snapshot_export(week)
+    if team_id is not None:
+        invalidation_bus.publish("teams", team_id)
+    return result
+
+def add_week_summary_team(team):
+    """새 팀을 요약에 추가 (이미 다시 만들어진 요약에 들어 있으면 그대로)"""
+    update_week_summary(team["week"], {"teams.id": {"$ne": str(team["_id"])}},
+                        {"$push": {"teams": week_summary_team(team)}})
+
+def add_week_summary_member(team, member):
+    """팀 항목에 새 멤버 추가 (멤버는 팀장 -> 관리자 -> 멤버 순이므로 새 멤버는 끝에 붙임)"""
+    update_week_summary(
+        team["week"],
+        {"teams": {"$elemMatch": {"id": str(team["_id"]), "members.username": {"$ne": member["username"]}}}},
+        {"$push": {"teams.$.members": member_card(member)}, "$inc": {"teams.$.member_count": 1}},
+        team_id=team["_id"]
+    )
+
+def remove_week_summary_team(week, team_id):
+    update_week_summary(week, {"teams.id": str(team_id)}, {"$pull": {"teams": {"id": str(team_id)}}}, team_id=team_id)
+
+def set_week_summary_upvote(week, team_id, upvote):
+    """요약 안의 팀 추천수를 팀 문서의 추천수로 맞춤
+
+    추천수는 줄지 않으므로 $max를 쓰면 순서가 뒤바뀐 갱신이나 다시 만든 요약과 겹쳐도 큰 값(최신 값)이 남음
+    """
+    update_week_summary(week, {"teams.id": str(team_id)}, {"$max": {"teams.$.upvote": upvote}}, team_id=team_id)
+
+def update_user_week_summaries(user_id):
+    """사용자가 들어 있는 모든 주차 요약의 멤버 정보(닉네임, 프로필 이미지) 갱신 (프로필 변경 등)"""
+    user = users_collection.find_one({"_id": user_id}, {"username": 1, "nickname": 1, "profile_img": 1})
+    if not user:
+        return
+    weeks = db["week_summaries"].distinct("_id", {"teams.members.username": user["username"]})
+    if not weeks:
+        return
+    db["week_summaries"].update_many(
+        {"_id": {"$in": weeks}},
+        {
+            "$set": {
+                "teams.$[].members.$[member].nickname": user["nickname"],
+                "teams.$[].members.$[member].profile_img": user.get("profile_img"),
+                "updatedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
+            },
+            "$inc": {"version": 1}
+        },
+        array_filters=[{"member.username": user["username"]}]
+    )
+    for week in weeks:
+        invalidation_bus.publish("week_summaries", week)
+        enqueue_week_snapshot_export(week)
+
+def get_week_teams(week, listing=False):
+    """주차의 팀 목록 (추천수 내림차순, listing: 목록 화면용 secondary 읽기)"""
+    week_summaries = listing_collection(db["week_summaries"]) if listing else db["week_summaries"]
+    summary = week_summaries.find_one({"_id": week})
+    if summary is None and listing:
+        # secondary에 아직 복제되지 않았을 수 있으므로 다시 만들기 전에 primary에서 확인
+        summary = db["week_summaries"].find_one({"_id": week})
+    if summary is None:
+        summary = refresh_week_summary(week)
+    return sorted(summary["teams"], key=lambda x: x["upvote"], reverse=True)
+
+# 지난 주차 팀 보관 (teams_archive)
+# 끝난 주차의 팀은 거의 읽기만 하므로 archive_weeks.py가 teams_archive 컬렉션으로 옮겨서
+# teams 컬렉션과 인덱스에는 진행 중인 주차의 팀만 남김. _id는 그대로이므로 memberships/검색/순위 문서는 바뀌지 않음
+# 읽기는 teams -> teams_archive 순서로 찾고, 보관된 팀에 쓰기(글, 댓글, 추천 등)가 들어오면 teams_archive 문서를 그대로 수정
+TEAM_COLLECTIONS = ("teams", "teams_archive")
+ARCHIVE_AFTER_WEEKS = int(os.environ.get("ARCHIVE_AFTER_WEEKS", 1))
+
+def current_week_number():
+    """오늘이 몇 주차인지 (2025-08-01이 0주차)"""
+    return (datetime.date.today() - datetime.date(2025, 8, 1)).days // 7
+
+def ensure_archive_indexes():
+    db["teams_archive"].create_index("week")
+    db["teams_archive"].create_index("members.userId")
+
+def find_team(query, projection=None):
+    """읽기용 팀 조회 (teams에 없으면 보관된 팀에서)"""
+    team = db["teams"].find_one(query, projection)
+    if team is None:
+        team = db["teams_archive"].find_one(query, projection)
+    return team
+
+def find_teams(query, projection=None, listing=False):
+    """읽기용 팀 목록 조회 (teams와 보관된 팀 모두, listing: 목록 화면용 secondary 읽기)"""
+    teams = {}
+    for collection_name in TEAM_COLLECTIONS:
+        collection = listing_collection(db[collection_name]) if listing else db[collection_name]
+        # 옮기는 도중이라 양쪽에 있는 팀은 teams 쪽 문서 사용
+        for team in collection.find(query, projection):
+            teams.setdefault(team["_id"], team)
+    return list(teams.values())
+
+def team_collection(team):
+    """팀 문서가 들어 있는 컬렉션 (find_team으로 읽은 문서의 archivedAt으로 구분, 보관된 팀도 제자리에서 수정)"""
+    return db["teams_archive"] if "archivedAt" in team else db["teams"]
+
+def archive_week(week):
+    """주차의 팀들을 teams_archive로 옮기고 옮긴 팀 수를 반환 (여러 번 실행해도 안전)"""
+    archived = 0
+    for team in db["teams"].find({"week": week, "deletedAt": None}):
+        db["teams_archive"].replace_one(
+            {"_id": team["_id"]},
+            {**team, "archivedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)},
+            upsert=True
+        )
+        # 복사하는 동안 글/댓글/추천이 바뀐 팀은 teams에 그대로 두고 다음 실행에서 다시 옮김
+        if db["teams"].delete_one(team).deleted_count:
+            archived += 1
+        else:
+            db["teams_archive"].delete_one({"_id": team["_id"]})
+    return archived
+
+# 지난 주차 팀 목록 정적 스냅샷 (static/snapshots)
+# 끝난 주차의 팀 목록(teams_partial)은 거의 바뀌지 않으므로 HTML로 미리 만들어 두고,
+# 메인 페이지 캐러셀은 manifest.json에 적힌 파일을 정적 파일로 바로 받아 감 (Python/Mongo 작업 없음)
+# 파일명에 내용 해시를 붙여서 내용이 바뀌면 새 파일명이 되므로 브라우저/프록시 캐시를 비울 필요가 없음
+# 처음에는 export_week_snapshots.py로 만들고, 이후 지난 주차의 요약이 바뀌면 export_week_snapshot 작업이 다시 만듦
+SNAPSHOT_FOLDER = "static/snapshots"
+SNAPSHOT_MANIFEST = os.path.join(SNAPSHOT_FOLDER, "manifest.json")
+# 추천 등이 연달아 들어와도 한 번만 다시 만들도록 잠시 기다렸다가 실행
+SNAPSHOT_EXPORT_DELAY = 10
+
+def write_file_atomically(path, content):
+    """임시 파일에 쓴 뒤 교체해서 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+def write_snapshot_manifest():
+    """week_snapshots 컬렉션 기준으로 manifest.json 다시 작성"""
+    manifest = {
+        "generatedAt": datetime.datetime.utcnow().isoformat() + "Z",
+        "weeks": {str(snapshot["_id"]): snapshot["url"] for snapshot in db["week_snapshots"].find().sort("_id", 1)}
+    }
+    write_file_atomically(SNAPSHOT_MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+def export_week_snapshot(week, write_manifest=True):
+    """끝난 주차의 팀 목록을 정적 HTML로 저장하고 URL을 반환 (진행 중인 주차면 None)"""
+    current_week = current_week_number()
+    if week >= current_week:
+        return None
+    
+    with app.app_context():
+        html = render_template("teams_partial.html",
+                               selected_week=week,
+                               current_week=current_week,
+                               selected_teams=get_week_teams(week))
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()[:12]
+    filename = f"teams-week-{week}.{digest}.html"
+    os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+    
+    previous = db["week_snapshots"].find_one({"_id": week})
+    if previous and previous["filename"] == filename:
+        return previous["url"]
+    
+    write_file_atomically(os.path.join(SNAPSHOT_FOLDER, filename), html)
+    url = f"/{SNAPSHOT_FOLDER}/{filename}"
+    db["week_snapshots"].replace_one(
+        {"_id": week},
+        {"filename": filename, "url": url, "exportedAt": datetime.datetime.utcnow()},
+        upsert=True
+    )
+    if write_manifest:
+        write_snapshot_manifest()
+    # 이전 파일은 예전 manifest를 받은 브라우저가 아직 요청할 수 있으므로 export_week_snapshots.py --prune에서 정리
+    return url
+
+@job_queue.handler("export_week_snapshot")
+def export_week_snapshot_job(week):
+    export_week_snapshot(week)
+
+def enqueue_week_snapshot_export(week):
+    """지난 주차의 팀 목록이 바뀌었으면 정적 스냅샷 다시 만들기 예약"""
+    if week is not None and week < current_week_number():
+        job_queue.enqueue("export_week_snapshot", {"week": week},
+                          delay=SNAPSHOT_EXPORT_DELAY, dedupe_key=f"export_week_snapshot:{week}")
+
+def cached_week_teams(week):
+    """메인 페이지/팀 목록용 주차 팀 목록 (캐시, 주차 요약이 바뀌면 무효화)"""
+    return cached("week_teams", week, lambda: get_week_teams(week, listing=True),
+                  tags=[f"week_summaries:{week}"])
+
+def ensure_all_indexes():
+    """앱이 사용하는 컬렉션 인덱스 생성 (worker.py, 개발 서버 시작 시 호출)"""
+    job_queue.ensure_indexes()
+    try:
+        ensure_user_indexes()
+    except OperationFailure as e:
+        # 기존 데이터에 중복이 있으면 만들 수 없음 -> 가입은 조회로 중복을 확인하면서 계속 동작
+        print(f"⚠️ 사용자 아이디/닉네임 유니크 인덱스를 만들지 못했습니다: {e}")
+        print("   python migrate_user_indexes.py --check 로 중복을 확인하고 정리한 뒤 migrate_user_indexes.py를 실행하세요.")
+    ensure_notification_indexes()
+    ensure_upload_indexes()
+    ensure_membership_indexes()
+    ensure_archive_indexes()
+    search_index.ensure_indexes()
+    autocomplete_index.ensure_indexes()
+    leaderboard.ensure_indexes()
+
 # --- Routes ---
 @app.route("/")
 def home():
@@ -228,29 +1481,34 @@ def signup():
         password = request.form["password"]
         nickname = request.form["nickname"]
 
-        existing_user = users_collection.find_one({"username": username})
-        if existing_user:
-            return "User already exists!"
-        
-        existing_nickname = users_collection.find_one({"nickname": nickname})
-        if existing_nickname:
-            return "Nickname already exists!"
+        # 유니크 인덱스가 아직 없으면 (migrate_user_indexes.py 실행 전) 이전처럼 먼저 조회해서 중복 확인
+        if not user_unique_indexes_ready():
+            if users_collection.find_one({"username": username}, {"_id": 1}):
+                return USER_DUPLICATE_MESSAGES["username"]
+            if users_collection.find_one({"nickname": nickname}, {"_id": 1}):
+                return USER_DUPLICATE_MESSAGES["nickname"]
 
         profile_img = request.files.get("profile_img")
         profile_filename = None
-        if profile_img:
-            ext = os.path.splitext(profile_img.filename)[1]
-            profile_filename = f"{username}_profile{ext}"
-            save_path = os.path.join(app.config["PROFILE_FOLDER"], profile_filename)
-            profile_img.save(save_path)
-        
+        if profile_img and profile_img.filename:
+            if not allowed_file(profile_img.filename):
+                return "허용되지 않는 파일 형식입니다.", 400
+            profile_filename = save_profile_image(profile_img)
+
         password_hash = generate_password_hash(password)
-        users_collection.insert_one({
+        new_user = {
             "username": username,
             "password": password_hash,
             "nickname": nickname,
             "profile_img": profile_filename
-        })
+        }
+        # 아이디/닉네임 중복은 유니크 인덱스가 확인 (동시에 같은 이름으로 가입해도 하나만 성공)
+        try:
+            users_collection.insert_one(new_user)
+        except DuplicateKeyError as e:
+            delete_profile_image_files(profile_filename)
+            return USER_DUPLICATE_MESSAGES[duplicate_user_field(e)]
+        autocomplete_index.put_user(new_user)
         return redirect(url_for("login"))
 
     return render_template("signup.html")
@@ -302,17 +1560,14 @@ def team_signup():
         if not current_user:
             return redirect(url_for("login"))
 
-        # 해당 주차에 이미 팀에 소속되어 있는지 확인
-        existing_membership = db["teams"].find_one({
-            "week": week,
-            "members.userId": current_user["_id"]
-        })
-        
+        # 해당 주차에 이미 팀에 소속되어 있는지 확인 (비밀번호 비교 전에 빠르게 거절)
+        existing_membership = find_membership(current_user["_id"], week)
         if existing_membership:
-            return f'{week}주차에 이미 "{existing_membership["teamName"]}" 팀에 소속되어 있습니다. 한 주차에는 하나의 팀에만 소속될 수 있습니다.'
+            return membership_conflict_message(week, existing_membership)
 
         # 1. 같은 주차에 같은 이름의 팀이 있는지 확인
-        existing_team_by_name = db["teams"].find_one({
+        existing_team_by_name = find_team({
+            "deletedAt": None,  # 삭제 처리 중인 팀 제외
             "teamName": team_name,
             "week": week
         })
@@ -320,7 +1575,7 @@ def team_signup():
             return f"{week}주차에 '{team_name}' 팀 이름이 이미 존재합니다!"
 
         # 2. 같은 주차에 같은 비밀번호를 가진 팀이 있는지 확인
-        teams_in_week = list(db["teams"].find({"week": week}))
+        teams_in_week = find_teams({"week": week, "deletedAt": None})
         for team in teams_in_week:
             if check_password_hash(team["roomPasswordHash"], team_password):
                 return f"{week}주차에 동일한 비밀번호를 사용하는 팀이 이미 존재합니다!"
@@ -335,6 +1590,7 @@ def team_signup():
 
         # 새로운 팀 생성
         new_team = {
+            "_id": ObjectId(),
             "teamName": team_name,
             "description": f"{week}주차 스터디 팀",  
             "week": week,
@@ -345,6 +1601,7 @@ def team_signup():
             "members": [
                 {
                     "userId": current_user["_id"],
+                    **member_snapshot(current_user),
                     "role": "master",
                     "joinedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
                 }
@@ -352,8 +1609,20 @@ def team_signup():
             "posts": []  
         }
 
+        # 팀장 멤버십을 먼저 추가 (동시에 다른 팀을 만들거나 가입한 경우 여기서 거절됨)
+        conflicting_membership = add_membership(current_user["_id"], new_team, "master")
+        if conflicting_membership:
+            return membership_conflict_message(week, conflicting_membership)
+
         # 팀을 데이터베이스에 삽입
-        db["teams"].insert_one(new_team)
+        try:
+            db["teams"].insert_one(new_team)
+        except Exception:
+            db["memberships"].delete_one({"userId": current_user["_id"], "week": week})
+            raise
+        autocomplete_index.put_team(new_team)
+        add_week_summary_team(new_team)
+        increment_user_stats(current_user["_id"], teamsJoined=1)
 
         return redirect(url_for("main_page"))
 
@@ -397,39 +1666,8 @@ def main_page(week=None):
                 'blue' if week_num == current_week else 'gray'
     } for week_num in range(21)]
     
-    # 선택된 주차의 팀들을 가져오기 (upvote 기준 내림차순 정렬)
-    selected_week_teams = list(db["teams"].find(
-        {"week": selected_week}
-    ).sort("upvote", -1))
-    
-    # 팀 멤버들의 상세 정보를 가져오기
-    teams_with_members = []
-    for team in selected_week_teams:
-        # 각 멤버의 상세 정보 조회
-        team_members = []
-        for member in team.get("members", []):
-            user_info = users_collection.find_one({"_id": member["userId"]})
-            if user_info:
-                team_members.append({
-                    "username": user_info["username"],
-                    "nickname": user_info["nickname"],
-                    "profile_img": user_info.get("profile_img"),
-                    "role": member["role"]
-                })
-        
-        # 역할별로 정렬 (팀장 -> 관리자 -> 멤버 순)
-        role_order = {"master": 0, "admin": 1, "member": 2}
-        team_members.sort(key=lambda x: role_order.get(x["role"], 999))
-        
-        teams_with_members.append({
-            "id": str(team["_id"]),  
-            "teamName": team["teamName"],
-            "description": team.get("description", ""),
-            "week": team["week"],
-            "upvote": team.get("upvote", 0),
-            "members": team_members,
-            "member_count": len(team_members)
-        })
+    # 선택된 주차의 팀들을 가져오기 (upvote 기준 내림차순 정렬, 멤버 정보 포함)
+    teams_with_members = cached_week_teams(selected_week)
     
     return render_template("main_page.html", 
                          current_week=current_week,
@@ -441,34 +1679,7 @@ def main_page(week=None):
 @app.route("/teams_partial/<int:week>")
 def teams_partial(week):
     """특정 주차의 팀 목록 HTML 부분만 반환"""
-    teams = list(db["teams"].find({"week": week}).sort("upvote", -1))
-    
-    teams_with_members = []
-    for team in teams:
-        team_members = []
-        for member in team.get("members", []):
-            user_info = users_collection.find_one({"_id": member["userId"]})
-            if user_info:
-                team_members.append({
-                    "username": user_info["username"],
-                    "nickname": user_info["nickname"],
-                    "profile_img": user_info.get("profile_img"),
-                    "role": member["role"]
-                })
-                
-        # 역할별로 정렬 (팀장 -> 관리자 -> 멤버 순)
-        role_order = {"master": 0, "admin": 1, "member": 2}
-        team_members.sort(key=lambda x: role_order.get(x["role"], 999))
-        
-        teams_with_members.append({
-            "id": str(team["_id"]),  
-            "teamName": team["teamName"],
-            "description": team.get("description", ""),
-            "week": team["week"],
-            "upvote": team.get("upvote", 0),
-            "members": team_members,
-            "member_count": len(team_members)
-        })
+    teams_with_members = cached_week_teams(week)
     
     # 주차 계산 및 색상 결정 로직
     start_date = datetime.date(2025, 8, 1) # 배포시 2025, 8, 29 확인
@@ -497,16 +1708,12 @@ def team_join(default_week=None):
             return redirect(url_for("login"))
         
         # 해당 주차에 이미 팀에 소속되어 있는지 확인
-        existing_membership = db["teams"].find_one({
-            "week": week,
-            "members.userId": current_user["_id"]
-        })
-        
+        existing_membership = find_membership(current_user["_id"], week)
         if existing_membership:
-            return f'{week}주차에 이미 "{existing_membership["teamName"]}" 팀에 소속되어 있습니다. 한 주차에는 하나의 팀에만 소속될 수 있습니다.'
+            return membership_conflict_message(week, existing_membership)
         
         # 해당 주차의 모든 팀 조회
-        teams_in_week = list(db["teams"].find({"week": week}))
+        teams_in_week = find_teams({"week": week, "deletedAt": None})
         
         if not teams_in_week:
             return f"{week}주차에 생성된 팀이 없습니다!"
@@ -533,14 +1740,25 @@ def team_join(default_week=None):
         # 새 멤버를 팀에 추가
         new_member = {
             "userId": current_user["_id"],
+            **member_snapshot(current_user),
             "role": "member",
             "joinedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
         }
         
-        db["teams"].update_one(
-            {"_id": target_team["_id"]},
+        conflicting_membership = add_membership(current_user["_id"], target_team, "member")
+        if conflicting_membership:
+            return membership_conflict_message(week, conflicting_membership)
+        
+        result = team_collection(target_team).update_one(
+            {"_id": target_team["_id"], "deletedAt": None},
             {"$push": {"members": new_member}}
         )
+        if result.matched_count == 0:
+            # 가입하는 사이에 팀이 삭제됨
+            db["memberships"].delete_one({"userId": current_user["_id"], "week": week})
+            return "팀을 찾을 수 없습니다."
+        add_week_summary_member(target_team, new_member)
+        increment_user_stats(current_user["_id"], teamsJoined=1)
         
         success_message = f"'{target_team['teamName']}' 팀에 성공적으로 가입되었습니다!"
         return f'<script>alert("{success_message}"); window.location.href="{url_for("dashboard")}";</script>'
@@ -563,7 +1781,7 @@ def team_join_specific(team_id):
         return redirect(url_for("main_page"))
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     if not team:
         return redirect(url_for("main_page"))
     
@@ -576,15 +1794,11 @@ def team_join_specific(team_id):
             return redirect(url_for("login"))
         
         # 해당 주차에 이미 팀에 소속되어 있는지 확인
-        existing_membership = db["teams"].find_one({
-            "week": team["week"],
-            "members.userId": current_user["_id"]
-        })
-        
+        existing_membership = find_membership(current_user["_id"], team["week"])
         if existing_membership:
             return render_template("team_join_specific.html", 
                                  team=team, 
-                                 error=f'{team["week"]}주차에 이미 "{existing_membership["teamName"]}" 팀에 소속되어 있습니다. 한 주차에는 하나의 팀에만 소속될 수 있습니다.')
+                                 error=membership_conflict_message(team["week"], existing_membership))
         
         # 비밀번호 확인
         if not check_password_hash(team["roomPasswordHash"], team_password):
@@ -606,14 +1820,27 @@ def team_join_specific(team_id):
         # 새 멤버를 팀에 추가
         new_member = {
             "userId": current_user["_id"],
+            **member_snapshot(current_user),
             "role": "member",
             "joinedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
         }
         
-        db["teams"].update_one(
-            {"_id": team["_id"]},
+        conflicting_membership = add_membership(current_user["_id"], team, "member")
+        if conflicting_membership:
+            return render_template("team_join_specific.html", 
+                                 team=team, 
+                                 error=membership_conflict_message(team["week"], conflicting_membership))
+        
+        result = team_collection(team).update_one(
+            {"_id": team["_id"], "deletedAt": None},
             {"$push": {"members": new_member}}
         )
+        if result.matched_count == 0:
+            # 가입하는 사이에 팀이 삭제됨
+            db["memberships"].delete_one({"userId": current_user["_id"], "week": team["week"]})
+            return render_template("team_join_specific.html", team=team, error="팀을 찾을 수 없습니다.")
+        add_week_summary_member(team, new_member)
+        increment_user_stats(current_user["_id"], teamsJoined=1)
         
         # 성공 시 팀 페이지로 리다이렉트
         return redirect(url_for("team_page", team_id=team_id))
@@ -688,26 +1915,14 @@ def team_page(team_id):
         return redirect(url_for("main_page"))
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     if not team:
         # 팀을 찾을 수 없는 경우 main_page로 리다이렉트
         return redirect(url_for("main_page"))
     
-    # 팀 멤버들의 상세 정보 조회
-    team_members = []
-    for member in team.get("members", []):
-        user_info = users_collection.find_one({"_id": member["userId"]})
-        if user_info:
-            team_members.append({
-                "username": user_info["username"],
-                "nickname": user_info["nickname"],
-                "profile_img": user_info.get("profile_img"),
-                "role": member["role"]
-            })
-    
-    # 역할별로 정렬 (팀장 -> 관리자 -> 멤버 순)
-    role_order = {"master": 0, "admin": 1, "member": 2}
-    team_members.sort(key=lambda x: role_order.get(x["role"], 999))
+    # 팀 멤버 정보 (팀 문서의 멤버 스냅샷 사용)
+    hydrate_member_snapshots([team])
+    team_members = team_member_cards(team)
     
     # 현재 사용자가 팀 멤버인지 확인
     current_user = users_collection.find_one({"username": username})
@@ -791,7 +2006,7 @@ def team_upvote():
         return jsonify({"error": "잘못된 팀 ID 형식입니다."}), 400
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     
     if not team:
         return jsonify({"error": "팀을 찾을 수 없습니다."}), 404
@@ -802,8 +2017,8 @@ def team_upvote():
         return jsonify({"error": "이미 추천하신 팀입니다."}), 400
     
     # 추천수 1 증가 및 추천한 사용자 목록에 추가
-    result = db["teams"].update_one(
-        {"_id": team_object_id},
+    result = team_collection(team).update_one(
+        {"_id": team_object_id, "deletedAt": None},
         {
             "$inc": {"upvote": 1},
             "$addToSet": {"upvotedUsers": current_user["_id"]}
@@ -812,9 +2027,12 @@ def team_upvote():
     
     if result.modified_count > 0:
         # 업데이트된 추천수 조회
-        updated_team = db["teams"].find_one({"_id": team_object_id})
+        updated_team = team_collection(team).find_one({"_id": team_object_id})
         new_upvote_count = updated_team.get("upvote", 0)
         
+        set_week_summary_upvote(team["week"], team_object_id, new_upvote_count)
+        leaderboard.record("upvote", team)
+        
         return jsonify({
             "success": True,
             "new_upvote_count": new_upvote_count
@@ -847,7 +2065,7 @@ def post_like():
         return jsonify({"error": "잘못된 ID 형식입니다."}), 400
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     if not team:
         return jsonify({"error": "팀을 찾을 수 없습니다."}), 404
     
@@ -866,8 +2084,8 @@ def post_like():
         return jsonify({"error": "포스트를 찾을 수 없습니다."}), 404
     
     # 좋아요 수 1 증가 및 좋아요한 사용자 목록에 추가
-    result = db["teams"].update_one(
-        {"_id": team_object_id, "posts._id": post_object_id},
+    result = team_collection(team).update_one(
+        {"_id": team_object_id, "deletedAt": None, "posts._id": post_object_id},
         {
             "$inc": {"posts.$.likes": 1},
             "$addToSet": {"posts.$.likedUsers": current_user["_id"]}
@@ -875,8 +2093,12 @@ def post_like():
     )
     
     if result.modified_count > 0:
+        liked_post = next(post for post in team["posts"] if post.get("_id") == post_object_id)
+        leaderboard.record("like", team, liked_post)
+        increment_user_stats(liked_post.get("authorId"), likesReceived=1)
+        
         # 업데이트된 좋아요 수 조회
-        updated_team = db["teams"].find_one({"_id": team_object_id})
+        updated_team = team_collection(team).find_one({"_id": team_object_id})
         new_like_count = 0
         for post in updated_team.get("posts", []):
             if post.get("_id") == post_object_id:
@@ -906,7 +2128,7 @@ def team_post_write(team_id):
         return redirect(url_for("main_page"))
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     if not team:
         return redirect(url_for("main_page"))
     
@@ -940,6 +2162,9 @@ def team_post_write(team_id):
         if not author:
             return '<script>alert("작성자명을 입력해주세요."); history.back();</script>'
         
+        # 이미지 태그에 lazy 로딩/크기/srcset 속성 추가 (저장 시 한 번만 처리)
+        content = rewrite_post_images(content)
+        
         # 새 포스트 생성 (고유한 post_id 추가)
         new_post = {
             "_id": ObjectId(),  # 각 포스트에 고유한 ID 생성
@@ -953,16 +2178,19 @@ def team_post_write(team_id):
         
         try:
             # 팀에 포스트 추가
-            result = db["teams"].update_one(
-                {"_id": team["_id"]},
+            result = team_collection(team).update_one(
+                {"_id": team["_id"], "deletedAt": None},
                 {"$push": {"posts": new_post}}
             )
             
             if result.modified_count > 0:
-                # 글 작성 완료 후 사용되지 않는 최근 업로드 이미지들 정리
-                recent_deleted = cleanup_unused_recent_images()
-                if recent_deleted:
-                    print(f"글 작성 완료 후 미사용 이미지 {len(recent_deleted)}개를 정리했습니다.")
+                # 글에서 사용한 업로드 이미지들의 참조 카운트 증가
+                add_image_references(extract_image_urls_from_content(content))
+                
+                # 글 작성 완료 후 사용되지 않는 최근 업로드 이미지들 정리 (백그라운드)
+                enqueue_recent_images_cleanup()
+                enqueue_search_reindex(team["_id"], new_post)
+                increment_user_stats(current_user["_id"], postsWritten=1)
                 
                 success_message = "글이 성공적으로 작성되었습니다!"
                 return f'<script>alert("{success_message}"); window.location.href="/team_page/{team_id}";</script>'
@@ -974,21 +2202,9 @@ def team_post_write(team_id):
             return '<script>alert("글 작성 중 오류가 발생했습니다. 다시 시도해주세요."); history.back();</script>'
     
     # GET 요청 처리 - 글 작성 폼 표시
-    # 팀 멤버들의 상세 정보 조회
-    team_members = []
-    for member in team.get("members", []):
-        user_info = users_collection.find_one({"_id": member["userId"]})
-        if user_info:
-            team_members.append({
-                "username": user_info["username"],
-                "nickname": user_info["nickname"],
-                "profile_img": user_info.get("profile_img"),
-                "role": member["role"]
-            })
-    
-    # 역할별로 정렬 (팀장 -> 관리자 -> 멤버 순)
-    role_order = {"master": 0, "admin": 1, "member": 2}
-    team_members.sort(key=lambda x: role_order.get(x["role"], 999))
+    # 팀 멤버 정보 (팀 문서의 멤버 스냅샷 사용)
+    hydrate_member_snapshots([team])
+    team_members = team_member_cards(team)
     
     # 템플릿에 전달할 팀 데이터 구성
     team_data = {
@@ -1018,15 +2234,28 @@ def upload_image():
         return jsonify({"error": "파일이 선택되지 않았습니다."}), 400
     
     if file and allowed_file(file.filename):
-        # 안전한 파일명 생성
-        filename = secure_filename(file.filename)
-        # 중복 방지를 위해 타임스탬프 추가
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_")
-        filename = timestamp + filename
-        
-        # 파일 저장
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # 내용 해시로 파일명 결정 (같은 이미지는 한 번만 저장)
+        ext = '.' + file.filename.rsplit('.', 1)[1].lower()  # allowed_file로 검증된 확장자
+        try:
+            filename, staged_path, size = save_file_by_content_hash(
+                file, app.config['UPLOAD_FOLDER'], ext, 32, shard=True)
+            
+            if db["uploads"].find_one({"_id": filename}, {"_id": 1}) and upload_storage.exists(filename):
+                # 같은 내용의 이미지가 이미 저장되어 있으면 재사용
+                os.remove(staged_path)
+            else:
+                # 글 저장 전에 미리 반응형 축소본 생성 후 원본과 함께 저장소에 올림
+                image_size, variant_widths = create_image_variants(staged_path)
+                publish_staged_files(
+                    upload_storage, staged_path,
+                    [filename] + [image_variant_filename(filename, w) for w in variant_widths],
+                    [image_variant_filename(staged_path, w) for w in variant_widths],
+                    file.mimetype
+                )
+                register_upload(filename, size, image_size, variant_widths)
+        except Exception as e:
+            print(f"이미지 저장 실패: {e}")
+            return jsonify({"error": "파일 저장에 실패했습니다."}), 500
         
         # 웹에서 접근 가능한 URL 반환
         image_url = f"/static/uploads/{filename}"
@@ -1058,7 +2287,7 @@ def edit_post():
         return redirect(url_for("login"))
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     if not team:
         return redirect(url_for("main_page"))
     
@@ -1091,13 +2320,16 @@ def edit_post():
         if len(new_title) > 100:
             return '<script>alert("제목은 100글자를 초과할 수 없습니다."); history.back();</script>'
         
+        # 이미지 태그에 lazy 로딩/크기/srcset 속성 추가
+        new_content = rewrite_post_images(new_content)
+        
         # 수정 전 내용 저장 (이미지 정리용)
         old_content = post_to_edit.get("content", "")
         
         try:
             # 게시글 업데이트 (post_id 기준)
-            result = db["teams"].update_one(
-                {"_id": team_object_id, "posts._id": post_object_id},
+            result = team_collection(team).update_one(
+                {"_id": team_object_id, "deletedAt": None, "posts._id": post_object_id},
                 {
                     "$set": {
                         "posts.$.title": new_title,
@@ -1109,9 +2341,10 @@ def edit_post():
             
             # post_id가 없는 기존 포스트의 경우 title과 authorId로 업데이트 시도 (fallback)
             if result.modified_count == 0:
-                result = db["teams"].update_one(
+                result = team_collection(team).update_one(
                     {
                         "_id": team_object_id,
+                        "deletedAt": None,
                         "posts.title": request.form.get("original_title") or post_to_edit.get("title"),
                         "posts.authorId": current_user["_id"]
                     },
@@ -1125,16 +2358,20 @@ def edit_post():
                 )
             
             if result.modified_count > 0:
-                # 수정으로 인해 사용되지 않는 이미지들 삭제
+                # 새로 추가된 이미지는 참조를 늘리고, 수정으로 인해 사용되지 않는 이미지들은 삭제
+                deleted_images = delete_unused_images_on_edit(old_content, new_content)
+                if deleted_images:
+                    print(f"포스트 수정으로 {len(deleted_images)}개의 이미지를 삭제했습니다.")
+                
                 if old_content:
-                    deleted_images = delete_unused_images_on_edit(old_content, new_content)
-                    if deleted_images:
-                        print(f"포스트 수정으로 {len(deleted_images)}개의 이미지를 삭제했습니다.")
-                    
-                    # 추가로 최근 업로드된 사용되지 않는 이미지들도 정리
-                    recent_deleted = cleanup_unused_recent_images()
-                    if recent_deleted:
-                        print(f"최근 업로드된 미사용 이미지 {len(recent_deleted)}개를 추가로 삭제했습니다.")
+                    # 추가로 최근 업로드된 사용되지 않는 이미지들도 정리 (백그라운드)
+                    enqueue_recent_images_cleanup()
+                enqueue_search_reindex(team_id, {**post_to_edit, "title": new_title})
+                if new_title != post_to_edit.get("title"):
+                    if not post_to_edit.get("_id"):
+                        # 예전 글은 제목이 검색 문서 _id이므로 이전 제목의 문서도 정리
+                        enqueue_search_reindex(team_id, post_to_edit)
+                    leaderboard.rename_post(team, post_to_edit, new_title)
                 
                 return f'<script>alert("게시글이 수정되었습니다."); window.location.href="/team_page/{team_id}";</script>'
             else:
@@ -1145,17 +2382,9 @@ def edit_post():
             return '<script>alert("게시글 수정 중 오류가 발생했습니다."); history.back();</script>'
     
     # GET 요청 - 수정 폼 표시
-    # 팀 멤버들 정보 조회
-    team_members = []
-    for member in team.get("members", []):
-        user_info = users_collection.find_one({"_id": member["userId"]})
-        if user_info:
-            team_members.append({
-                "username": user_info["username"],
-                "nickname": user_info["nickname"],
-                "profile_img": user_info.get("profile_img"),
-                "role": member["role"]
-            })
+    # 팀 멤버 정보 (팀 문서의 멤버 스냅샷 사용)
+    hydrate_member_snapshots([team])
+    team_members = team_member_cards(team)
     
     team_data = {
         "id": str(team["_id"]),
@@ -1204,7 +2433,7 @@ def delete_post():
         return redirect(url_for("login"))
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     if not team:
         return f'<script>alert("팀을 찾을 수 없습니다."); window.location.href="/main_page";</script>'
     
@@ -1233,28 +2462,18 @@ def delete_post():
     if not (is_author or is_master):
         return f'<script>alert("게시글 삭제 권한이 없습니다."); window.location.href="/team_page/{team_id}";</script>'
     
-    # 포스트에서 사용된 이미지들 삭제
-    try:
-        post_content = post_to_delete.get("content", "")
-        if post_content:
-            deleted_images = delete_post_images(post_content)
-            if deleted_images:
-                print(f"포스트 ID '{post_id}'에서 {len(deleted_images)}개의 이미지를 삭제했습니다.")
-    except Exception as e:
-        print(f"포스트 이미지 삭제 중 오류: {e}")
-    
     # 게시글 삭제
     try:
         # post_id로 삭제
-        result = db["teams"].update_one(
-            {"_id": team_object_id},
+        result = team_collection(team).update_one(
+            {"_id": team_object_id, "deletedAt": None},
             {"$pull": {"posts": {"_id": post_object_id}}}
         )
         
         # post_id가 없는 기존 포스트의 경우 title로 삭제 시도 (fallback)
         if result.modified_count == 0 and request.form.get("post_title"):
-            result = db["teams"].update_one(
-                {"_id": team_object_id},
+            result = team_collection(team).update_one(
+                {"_id": team_object_id, "deletedAt": None},
                 {"$pull": {"posts": {
                     "title": request.form.get("post_title"),
                     "authorId": current_user["_id"]
@@ -1262,6 +2481,14 @@ def delete_post():
             )
         
         if result.modified_count > 0:
+            # 포스트에서 사용된 이미지들 삭제 (백그라운드)
+            post_content = post_to_delete.get("content", "")
+            if post_content:
+                job_queue.enqueue("release_post_images", {"contents": [post_content], "release_id": str(ObjectId())})
+            enqueue_search_reindex(team_id, post_to_delete)
+            leaderboard.remove_post(team["_id"], post_to_delete)
+            increment_user_stats(post_to_delete.get("authorId"), postsWritten=-1,
+                                 likesReceived=-post_to_delete.get("likes", 0))
             return f'<script>alert("게시글이 삭제되었습니다."); window.location.href="/team_page/{team_id}";</script>'
         else:
             return f'<script>alert("게시글 삭제에 실패했습니다."); window.location.href="/team_page/{team_id}";</script>'
@@ -1292,10 +2519,10 @@ def delete_team():
         return redirect(url_for("login"))
     
     # 팀 정보 조회
-    team = db["teams"].find_one({"_id": team_object_id})
+    team = find_team({"_id": team_object_id, "deletedAt": None})
     
     if not team:
-        return '<script>alert("해당 팀을 찾을 수 없습니다."); history.back();</script>'
+        return '<script>alert("팀을 찾을 수 없습니다."); history.back();</script>'
     
     # 현재 사용자가 팀장인지 확인
     is_master = any(
@@ -1307,15 +2534,20 @@ def delete_team():
         return '<script>alert("팀장만 팀을 삭제할 수 있습니다."); history.back();</script>'
     
     try:
-        # 팀의 모든 이미지 삭제
-        deleted_images = delete_team_images(team)
-        if deleted_images:
-            print(f"팀 '{team['teamName']}'에서 {len(deleted_images)}개의 이미지를 삭제했습니다.")
-        
-        # 팀 삭제
-        result = db["teams"].delete_one({"_id": team_object_id})
+        # 팀을 삭제 상태로 표시 (이후 조회에서 바로 제외됨)
+        result = mark_team_deleted(team)
         
-        if result.deleted_count > 0:
+        if result.modified_count > 0:
+            # 이미지, 알림 정리와 실제 문서 삭제는 백그라운드에서 단계별로 진행
+            enqueue_team_sweep(team_object_id)
+            enqueue_search_reindex(team_object_id)
+            autocomplete_index.remove(team_object_id)
+            leaderboard.remove_team(team_object_id)
+            remove_week_summary_team(team["week"], team_object_id)
+            release_team_user_stats(team)
+            # 팀원들이 같은 주차의 다른 팀에 다시 가입할 수 있도록 멤버십 삭제
+            db["memberships"].delete_many({"teamId": team_object_id})
+            
             # 성공 시 메인 페이지로 리다이렉트
             return '<script>alert("팀이 성공적으로 삭제되었습니다."); window.location.href="/main_page";</script>'
         else:
@@ -1325,6 +2557,31 @@ def delete_team():
         print(f"팀 삭제 중 오류 발생: {e}")
         return '<script>alert("팀 삭제 중 오류가 발생했습니다."); history.back();</script>'
     
+def load_user_teams(user_id):
+    """사용자 프로필의 팀 목록 (보관된 지난 주차 팀 포함, 팀 id는 memberships에서, 멤버 정보는 스냅샷 사용)"""
+    teams = find_teams(
+        {"_id": {"$in": user_team_ids(user_id, listing=True)}, "deletedAt": None},
+        {"teamName": 1, "description": 1, "week": 1, "upvote": 1, "members": 1},
+        listing=True
+    )
+    teams.sort(key=lambda team: team["week"])
+    hydrate_member_snapshots(teams)
+    
+    user_teams = []
+    for team in teams:
+        team_members = team_member_cards(team)
+        
+        user_teams.append({
+            "id": str(team["_id"]),
+            "teamName": team["teamName"],
+            "description": team.get("description", ""),
+            "week": team["week"],
+            "upvote": team.get("upvote", 0),
+            "members": team_members,
+            "member_count": len(team_members)
+        })
+    return user_teams
+
 @app.route("/user/<username>")
 def user_profile(username):
     current_username = get_current_user(request)
@@ -1341,39 +2598,19 @@ def user_profile(username):
     if not target_user:
         return '<script>alert("사용자를 찾을 수 없습니다."); history.back();</script>'
     
-    # 해당 사용자가 속한 팀들 조회
-    user_teams = []
-    teams = list(db["teams"].find({"members.userId": target_user["_id"]}))
-    
-    for team in teams:
-        # 팀 멤버들의 상세 정보 조회
-        team_members = []
-        for member in team.get("members", []):
-            member_info = users_collection.find_one({"_id": member["userId"]})
-            if member_info:
-                team_members.append({
-                    "username": member_info["username"],
-                    "nickname": member_info["nickname"],
-                    "profile_img": member_info.get("profile_img"),
-                    "role": member["role"]
-                })
-        
-        # 역할별로 정렬 (팀장 -> 관리자 -> 멤버 순)
-        role_order = {"master": 0, "admin": 1, "member": 2}
-        team_members.sort(key=lambda x: role_order.get(x["role"], 999))
-        
-        user_teams.append({
-            "id": str(team["_id"]),
-            "teamName": team["teamName"],
-            "description": team.get("description", ""),
-            "week": team["week"],
-            "upvote": team.get("upvote", 0),
-            "members": team_members,
-            "member_count": len(team_members)
-        })
+    # 사용자나 속한 팀이 바뀌면 무효화됨
+    user_teams = cached(
+        "user_teams", target_user["_id"], lambda: load_user_teams(target_user["_id"]),
+        tags=lambda teams: [f"users:{target_user['_id']}"] + [f"teams:{team['id']}" for team in teams]
+    )
     
-    # 주차별로 정렬 (최신 주차부터)
-    user_teams.sort(key=lambda x: x["week"])
+    # 활동 통계 (미리 계산된 값)
+    stats = target_user.get("stats", {})
+    user_stats = {
+        "teams_joined": stats.get("teamsJoined", 0),
+        "posts_written": stats.get("postsWritten", 0),
+        "likes_received": stats.get("likesReceived", 0)
+    }
     
     # 자신의 프로필인지 확인
     is_own_profile = (current_username == username)
@@ -1381,6 +2618,7 @@ def user_profile(username):
     return render_template("user_profile.html", 
                          target_user=target_user,
                          user_teams=user_teams,
+                         user_stats=user_stats,
                          current_user=current_user,
                          is_own_profile=is_own_profile)
 
@@ -1413,57 +2651,13 @@ def update_profile_image():
         return jsonify({"error": "파일이 선택되지 않았습니다."}), 400
     
     if file and allowed_file(file.filename):
-        # 안전한 파일명 생성 및 확장자 처리 개선
-        original_filename = secure_filename(file.filename)
-        
-        # 확장자 추출 (소문자로 변환)
-        if '.' in original_filename:
-            ext = '.' + original_filename.rsplit('.', 1)[1].lower()
-        else:
-            # 확장자가 없는 경우 MIME 타입으로부터 추정
-            mime_type = file.content_type
-            if mime_type == 'image/jpeg':
-                ext = '.jpg'
-            elif mime_type == 'image/png':
-                ext = '.png'
-            elif mime_type == 'image/gif':
-                ext = '.gif'
-            elif mime_type == 'image/webp':
-                ext = '.webp'
-            else:
-                ext = '.jpg'  # 기본값
-        
-        # 새 파일명 생성
-        new_filename = f"{username}_profile{ext}"
-        
-        # 기존 프로필 이미지 삭제 (모든 가능한 확장자 확인)
         current_user = users_collection.find_one({"username": username})
-        if current_user and current_user.get("profile_img"):
-            old_file_path = os.path.join(app.config["PROFILE_FOLDER"], current_user["profile_img"])
-            if os.path.exists(old_file_path):
-                try:
-                    os.remove(old_file_path)
-                    print(f"기존 프로필 이미지 삭제: {old_file_path}")
-                except Exception as e:
-                    print(f"기존 파일 삭제 실패: {e}")
-        
-        # 추가로 같은 사용자명의 다른 확장자 파일들도 정리
-        possible_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-        for possible_ext in possible_extensions:
-            possible_file = f"{username}_profile{possible_ext}"
-            possible_path = os.path.join(app.config["PROFILE_FOLDER"], possible_file)
-            if os.path.exists(possible_path) and possible_file != new_filename:
-                try:
-                    os.remove(possible_path)
-                    print(f"중복 프로필 이미지 정리: {possible_path}")
-                except Exception as e:
-                    print(f"중복 파일 정리 실패: {e}")
-        
-        # 새 파일 저장
+        old_filename = current_user.get("profile_img") if current_user else None
+        
+        # 새 파일 저장 (내용 해시 파일명 + 썸네일)
         try:
-            filepath = os.path.join(app.config["PROFILE_FOLDER"], new_filename)
-            file.save(filepath)
-            print(f"새 프로필 이미지 저장: {filepath}")
+            new_filename = save_profile_image(file)
+            print(f"새 프로필 이미지 저장: {new_filename}")
         except Exception as e:
             print(f"파일 저장 실패: {e}")
             return jsonify({"error": "파일 저장에 실패했습니다."}), 500
@@ -1477,9 +2671,20 @@ def update_profile_image():
             
             if result.matched_count > 0:
                 print(f"데이터베이스 업데이트 성공: {username} -> {new_filename}")
+                invalidation_bus.publish("users", current_user["_id"])
+
+                # 팀 멤버 스냅샷과 메인 페이지 요약의 프로필 이미지 갱신 (백그라운드)
+                # 기존 프로필 이미지는 스냅샷이 새 이미지로 바뀐 뒤에 작업에서 삭제
+                # (변경마다 지울 파일이 다르므로 대기 중인 작업과 합치지 않음)
+                job_queue.enqueue("propagate_member_snapshot", {
+                    "user_id": current_user["_id"],
+                    "old_profile_img": old_filename if old_filename != new_filename else None
+                })
+                
                 return jsonify({
                     "success": True,
-                    "new_profile_img": new_filename
+                    "new_profile_img": new_filename,
+                    "avatar_url": avatar_url(new_filename, "medium")
                 })
             else:
                 return jsonify({"error": "데이터베이스 업데이트에 실패했습니다."}), 500
@@ -1510,7 +2715,7 @@ def add_comment():
     
     # 팀 정보 조회 (team_id 기반)
     try:
-        team = db["teams"].find_one({"_id": ObjectId(team_id)})
+        team = find_team({"_id": ObjectId(team_id), "deletedAt": None})
     except:
         return jsonify({"error": "잘못된 team_id 형식입니다."}), 400
     
@@ -1535,14 +2740,15 @@ def add_comment():
     }
     
     # 포스트에 댓글 추가
-    result = db["teams"].update_one(
-        {"_id": ObjectId(team_id), "posts.title": post_title},
+    result = team_collection(team).update_one(
+        {"_id": ObjectId(team_id), "deletedAt": None, "posts.title": post_title},
         {"$push": {"posts.$.comments": new_comment}}
     )
     
     # 댓글 추가 성공시 알림 생성 (자신의 글이 아닌 경우만)
     if result.modified_count > 0 and post_author and post_author["_id"] != current_user["_id"]:
         notification = {
+            "_id": ObjectId(),
             "userId": post_author["_id"],
             "type": "comment",
             "title": f"{current_user['nickname']}님이 댓글을 달았습니다",
@@ -1556,9 +2762,12 @@ def add_comment():
             "isRead": False,
             "createdAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
         }
-        db["notifications"].insert_one(notification)
+        job_queue.enqueue("create_notification", {"notification": notification})
     
     if result.modified_count > 0:
+        commented_post = find_post_by_title(team, post_title)
+        enqueue_search_reindex(team_id, commented_post)
+        leaderboard.record("comment", team, commented_post)
         return jsonify({
             "success": True,
             "comment": {
@@ -1592,7 +2801,7 @@ def edit_comment():
     if not all([team_id, post_title, comment_id, new_content]):
         return jsonify({"error": "필수 정보가 누락되었습니다."}), 400
     
-    team = db["teams"].find_one({"_id": ObjectId(team_id)})
+    team = find_team({"_id": ObjectId(team_id), "deletedAt": None})
     if not team:
         return jsonify({"error": "팀을 찾을 수 없습니다."}), 404
     
@@ -1609,8 +2818,8 @@ def edit_comment():
     if post_index is None or comment_index is None:
         return jsonify({"error": "댓글을 찾을 수 없거나 수정 권한이 없습니다."}), 404
     
-    result = db["teams"].update_one(
-        {"_id": ObjectId(team_id), "posts.title": post_title},
+    result = team_collection(team).update_one(
+        {"_id": ObjectId(team_id), "deletedAt": None, "posts.title": post_title},
         {"$set": {
             f"posts.{post_index}.comments.{comment_index}.content": new_content,
             f"posts.{post_index}.comments.{comment_index}.updatedAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
@@ -1618,6 +2827,7 @@ def edit_comment():
     )
     
     if result.modified_count > 0:
+        enqueue_search_reindex(team_id, team["posts"][post_index])
         return jsonify({"success": True})
     else:
         return jsonify({"error": "댓글 수정에 실패했습니다."}), 500
@@ -1641,7 +2851,7 @@ def delete_comment():
     if not all([team_id, post_title, comment_id]):
         return jsonify({"error": "필수 정보가 누락되었습니다."}), 400
     
-    team = db["teams"].find_one({"_id": ObjectId(team_id)})
+    team = find_team({"_id": ObjectId(team_id), "deletedAt": None})
     if not team:
         return jsonify({"error": "팀을 찾을 수 없습니다."}), 404
     
@@ -1677,12 +2887,14 @@ def delete_comment():
                     continue
                 new_comments.append(comment)
             
-            result = db["teams"].update_one(
-                {"_id": ObjectId(team_id), "posts.title": post_title},
+            result = team_collection(team).update_one(
+                {"_id": ObjectId(team_id), "deletedAt": None, "posts.title": post_title},
                 {"$set": {"posts.$.comments": new_comments}}
             )
             
             if result.modified_count > 0:
+                enqueue_search_reindex(team_id, post)
+                leaderboard.record("comment", team, post, count=len(new_comments) - len(comments))
                 return jsonify({"success": True, "message": "댓글이 삭제되었습니다."})
             else:
                 return jsonify({"error": "댓글 삭제에 실패했습니다."}), 500
@@ -1708,7 +2920,7 @@ def add_reply():
     if not all([team_id, post_title, parent_comment_id, reply_content]):
         return jsonify({"error": "필수 정보가 누락되었습니다."}), 400
 
-    team = db["teams"].find_one({"_id": ObjectId(team_id)})
+    team = find_team({"_id": ObjectId(team_id), "deletedAt": None})
     if not team:
         return jsonify({"error": "팀을 찾을 수 없습니다."}), 404
 
@@ -1732,14 +2944,15 @@ def add_reply():
         "createdAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
     }
 
-    result = db["teams"].update_one(
-        {"_id": ObjectId(team_id), "posts.title": post_title},
+    result = team_collection(team).update_one(
+        {"_id": ObjectId(team_id), "deletedAt": None, "posts.title": post_title},
         {"$push": {"posts.$.comments": new_reply}}
     )
 
     # 답댓글 추가 성공시 알림 생성 (자신의 댓글이 아닌 경우만)
     if result.modified_count > 0 and parent_comment_author and parent_comment_author["_id"] != current_user["_id"]:
         notification = {
+            "_id": ObjectId(),
             "userId": parent_comment_author["_id"],
             "type": "reply",
             "title": f"{current_user['nickname']}님이 답댓글을 달았습니다",
@@ -1754,9 +2967,12 @@ def add_reply():
             "isRead": False,
             "createdAt": datetime.datetime.utcnow() + datetime.timedelta(hours=9)
         }
-        db["notifications"].insert_one(notification)
+        job_queue.enqueue("create_notification", {"notification": notification})
 
     if result.modified_count > 0:
+        commented_post = find_post_by_title(team, post_title)
+        enqueue_search_reindex(team_id, commented_post)
+        leaderboard.record("comment", team, commented_post)
         return jsonify({
             "success": True,
             "reply": {
@@ -1770,9 +2986,116 @@ def add_reply():
     else:
         return jsonify({"error": "답댓글 추가에 실패했습니다."}), 500
 
+@app.route("/api/search")
+def api_search():
+    """글 제목/본문/댓글 검색 (검색어 토큰을 모두 포함한 글을 관련도순으로 페이지 단위 반환)"""
+    username = get_current_user(request)
+    if not username:
+        return jsonify({"error": "로그인이 필요합니다."}), 401
+    
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "검색어를 입력해주세요."}), 400
+    if len(query) > 100:
+        return jsonify({"error": "검색어는 100글자를 초과할 수 없습니다."}), 400
+    
+    page = max(request.args.get("page", 1, type=int), 1)
+    try:
+        results, total = search_index.with_read_preference(listing_read_preference()).search(
+            query, page=page, per_page=SEARCH_PAGE_SIZE)
+    except OperationFailure as e:
+        # 텍스트 인덱스가 아직 없으면 ($text 쿼리 실패) build_search_index.py 실행 전
+        print(f"검색 실패: {e}")
+        return jsonify({"error": "검색을 일시적으로 사용할 수 없습니다. 잠시 후 다시 시도해주세요."}), 503
+    
+    return jsonify({
+        "query": query,
+        "page": page,
+        "total": total,
+        "has_next": page * SEARCH_PAGE_SIZE < total,
+        "results": [{
+            "teamId": str(result["teamId"]),
+            "teamName": result.get("teamName", ""),
+            "week": result.get("week"),
+            "postId": str(result["postId"]) if result.get("postId") else None,
+            "title": result.get("title", ""),
+            "author": result.get("author", ""),
+            "snippet": result.get("snippet", ""),
+            "commentCount": result.get("commentCount", 0),
+            "createdAt": result["createdAt"].strftime("%Y-%m-%d %H:%M") if result.get("createdAt") else "",
+            "url": f"/team_page/{result['teamId']}"
+        } for result in results]
+    })
+
+@app.route("/api/autocomplete")
+def api_autocomplete():
+    """사용자 아이디/닉네임, 팀 이름 자동완성 (입력한 글자로 시작하는 이름)"""
+    username = get_current_user(request)
+    if not username:
+        return jsonify({"error": "로그인이 필요합니다."}), 401
+    
+    prefix = request.args.get("q", "")[:50]
+    limit = min(max(request.args.get("limit", AUTOCOMPLETE_LIMIT, type=int), 1), AUTOCOMPLETE_LIMIT)
+    
+    suggestions = []
+    for entry in autocomplete_index.with_read_preference(listing_read_preference()).suggest(prefix, limit=limit):
+        if entry["kind"] == "user":
+            suggestions.append({
+                "kind": "user",
+                "label": entry["label"],
+                "username": entry["username"],
+                "url": f"/user/{entry['username']}"
+            })
+        else:
+            suggestions.append({
+                "kind": "team",
+                "label": entry["label"],
+                "week": entry.get("week"),
+                "url": f"/team_page/{entry['refId']}"
+            })
+    
+    response = jsonify({"query": prefix, "suggestions": suggestions})
+    # 키 입력마다 호출되므로 같은 검색어는 잠시 브라우저 캐시 사용
+    response.headers["Cache-Control"] = "private, max-age=30"
+    return response
+
+@app.route("/api/leaderboard")
+def api_leaderboard():
+    """팀/글 순위 (kind=team|post, board=all|trending)"""
+    username = get_current_user(request)
+    if not username:
+        return jsonify({"error": "로그인이 필요합니다."}), 401
+    
+    kind = request.args.get("kind", "team")
+    board = request.args.get("board", "all")
+    if kind not in ("team", "post") or board not in ("all", "trending"):
+        return jsonify({"error": "잘못된 순위 종류입니다."}), 400
+    limit = min(max(request.args.get("limit", 10, type=int), 1), LEADERBOARD_LIMIT)
+    
+    ranking = []
+    for rank, entry in enumerate(leaderboard.with_read_preference(listing_read_preference()).top(kind, board, limit), start=1):
+        item = {
+            "rank": rank,
+            "label": entry.get("label", ""),
+            "week": entry.get("week"),
+            "score": round(entry["score"], 2),
+            "metrics": entry.get("metrics", {}),
+            "url": f"/team_page/{entry['teamId']}"
+        }
+        if kind == "post":
+            item["teamName"] = entry.get("teamName", "")
+        ranking.append(item)
+    
+    return jsonify({"kind": kind, "board": board, "ranking": ranking})
+
 @app.route("/api/notifications")
 def api_notifications():
-    """알림 목록과 읽지 않은 개수를 함께 반환 (HTML과 일치)"""
+    """알림 목록과 읽지 않은 개수를 함께 반환 (HTML과 일치)
+
+    - If-None-Match가 현재 알림 버전의 ETag와 같으면 알림 컬렉션을 조회하지 않고 304 반환
+    - since(마지막으로 받은 커서)가 있으면 그 이후에 새로 생기거나 묶인 알림만 반환 (delta: true)
+      새 알림 없이 버전만 바뀐 경우(읽음/삭제 등)에는 전체 목록을 다시 반환 (delta: false)
+    """
     username = get_current_user(request)
     if not username:
         return jsonify({"error": "로그인이 필요합니다."}), 401
@@ -1781,14 +3104,49 @@ def api_notifications():
     if not current_user:
         return jsonify({"error": "사용자 정보를 찾을 수 없습니다."}), 401
     
-    # 알림 목록 조회
-    notifications = list(db["notifications"].find(
-        {"userId": current_user["_id"]}
-    ).sort([("isRead", 1), ("createdAt", -1)]).limit(20))
+    # 마지막 폴링 이후 바뀐 것이 없으면 본문 없이 304
+    etag = notification_etag(current_user)
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag, weak=True)
+        return response
+    
+    # since 이후에 새로 생기거나 묶인 알림만 조회 (묶인 알림은 _id가 그대로이므로 changeId 기준)
+    # 버전 차이가 새 알림 수와 같을 때(그 사이에 읽음/삭제가 없었을 때)만 delta로 응답
+    notifications = None
+    since = request.args.get("since")
+    client_version = client_notification_version(current_user)
+    if since and ObjectId.is_valid(since) and client_version is not None:
+        new_notifications = list(db["notifications"].find(
+            {"userId": current_user["_id"], "changeId": {"$gt": ObjectId(since)}}
+        ).sort("changeId", -1).limit(20))
+        version_gap = current_user.get("notificationVersion", 0) - client_version
+        if new_notifications and version_gap == len(new_notifications):
+            notifications = new_notifications
+    is_delta = notifications is not None
+    
+    if is_delta:
+        payload = notification_payload(current_user["_id"], notifications, ObjectId(since))
+    else:
+        # 전체 목록은 알림 버전마다 한 번만 조회 (버전이 키에 들어가므로 무효화가 필요 없음, 여러 탭/기기 폴링 공유)
+        payload = cache.get_or_set(
+            "notifications", f"{current_user['_id']}:{current_user.get('notificationVersion', 0)}",
+            lambda: notification_payload(current_user["_id"], list(db["notifications"].find(
+                {"userId": current_user["_id"]}
+            ).sort([("isRead", 1), ("createdAt", -1)]).limit(20))),
+            ttl=app.config["CACHE_TTL_SECONDS"]
+        )
     
+    response = jsonify({**payload, "delta": is_delta})
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def notification_payload(user_id, notifications, since_id=None):
+    """알림 목록 응답 본문 (직렬화된 알림, 읽지 않은 개수, 다음 폴링 커서)"""
     # 읽지 않은 알림 개수
     unread_count = db["notifications"].count_documents({
-        "userId": current_user["_id"],
+        "userId": user_id,
         "isRead": False
     })
     
@@ -1799,8 +3157,9 @@ def api_notifications():
             "_id": str(notification["_id"]),
             "userId": str(notification["userId"]),
             "type": notification.get("type", ""),
-            "title": notification.get("title", ""),
+            "title": notification_title(notification),
             "message": notification.get("message", ""),
+            "count": notification.get("count", 1),
             "postTitle": notification.get("postTitle", ""),
             "teamId": str(notification.get("teamId", "")),
             "teamName": notification.get("teamName", ""),
@@ -1808,10 +3167,16 @@ def api_notifications():
             "createdAt": notification["createdAt"].strftime("%Y-%m-%d %H:%M:%S") if notification.get("createdAt") else ""
         })
     
-    return jsonify({
+    # 다음 폴링에서 사용할 커서 (지금까지 받은 알림 중 가장 최근 changeId, changeId가 없는 예전 알림은 _id)
+    cursor_ids = [notification.get("changeId", notification["_id"]) for notification in notifications]
+    if since_id is not None:
+        cursor_ids.append(since_id)
+    
+    return {
         "notifications": serialized_notifications,
-        "unread_count": unread_count
-    })
+        "unread_count": unread_count,
+        "cursor": str(max(cursor_ids)) if cursor_ids else None
+    }
 
 @app.route("/api/notifications/mark_read", methods=["POST"])
 def api_mark_notifications_read():
@@ -1832,14 +3197,16 @@ def api_mark_notifications_read():
         object_ids = [ObjectId(nid) for nid in notification_ids]
         result = db["notifications"].update_many(
             {"_id": {"$in": object_ids}, "userId": current_user["_id"]},
-            {"$set": {"isRead": True}}
+            {"$set": {"isRead": True, "readAt": datetime.datetime.utcnow()}}
         )
     else:
         # 모든 알림 읽음 처리
         result = db["notifications"].update_many(
             {"userId": current_user["_id"], "isRead": False},
-            {"$set": {"isRead": True}}
+            {"$set": {"isRead": True, "readAt": datetime.datetime.utcnow()}}
         )
+    if result.modified_count:
+        bump_notification_version([current_user["_id"]])
     
     return jsonify({"success": True, "marked_count": result.modified_count})
 
@@ -1868,6 +3235,8 @@ def api_delete_notifications():
         result = db["notifications"].delete_many(
             {"userId": current_user["_id"]}
         )
+    if result.deleted_count:
+        bump_notification_version([current_user["_id"]])
     
     return jsonify({"success": True, "deleted_count": result.deleted_count})
 @app.route("/mark_notification_read", methods=["POST"])
@@ -1890,10 +3259,11 @@ def mark_notification_read():
     try:
         result = db["notifications"].update_one(
             {"_id": ObjectId(notification_id), "userId": current_user["_id"]},
-            {"$set": {"isRead": True}}
+            {"$set": {"isRead": True, "readAt": datetime.datetime.utcnow()}}
         )
         
         if result.modified_count > 0:
+            bump_notification_version([current_user["_id"]])
             return jsonify({"success": True})
         else:
             return jsonify({"error": "알림을 찾을 수 없습니다."}), 404
@@ -1931,8 +3301,10 @@ def mark_all_notifications_read():
     
     result = db["notifications"].update_many(
         {"userId": current_user["_id"], "isRead": False},
-        {"$set": {"isRead": True}}
+        {"$set": {"isRead": True, "readAt": datetime.datetime.utcnow()}}
     )
+    if result.modified_count:
+        bump_notification_version([current_user["_id"]])
     
     return jsonify({
         "success": True,
@@ -1962,11 +3334,48 @@ def delete_notification():
         )
         
         if result.deleted_count > 0:
+            bump_notification_version([current_user["_id"]])
             return jsonify({"success": True})
         else:
             return jsonify({"error": "알림을 찾을 수 없습니다."}), 404
     except Exception as e:
         return jsonify({"error": f"잘못된 알림 ID입니다: {str(e)}"}), 400
 
+# --- Metrics ---
+def cache_hit_ratios():
+    return {(namespace,): stats["hit_ratio"] for namespace, stats in cache.stats().items()}
+
+def cache_lookups():
+    lookups = {}
+    for namespace, stats in cache.stats().items():
+        for result in ("hits", "stale_hits", "misses", "bypasses"):
+            lookups[(namespace, result)] = stats.get(result, 0)
+    return lookups
+
+metrics.callback("cache_hit_ratio", "Cache hit ratio (fresh + stale hits) by namespace", cache_hit_ratios, ("namespace",))
+metrics.callback("cache_lookups_total", "Cache lookups by namespace and result", cache_lookups, ("namespace", "result"),
+                 metric_type="counter")
+metrics.callback("job_queue_depth", "Queued background jobs", lambda: job_queue.depth())
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus 수집용 메트릭 (텍스트 형식)"""
+    token = app.config["METRICS_TOKEN"]
+    if not token:
+        return "METRICS_TOKEN을 설정해야 메트릭을 수집할 수 있습니다.", 403
+    # 비교 시간으로 토큰을 알아낼 수 없도록 상수 시간 비교
+    authorization = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+        return "Unauthorized", 401
+    
+    response = make_response(metrics.render())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
 if __name__ == "__main__":
+    ensure_all_indexes()
+    # 개발 서버에서는 worker.py 없이도 작업이 처리되도록 워커 스레드를 함께 실행 (운영에서는 worker.py 사용)
+    if os.environ.get("EMBEDDED_JOB_WORKER", "1") == "1":
+        threading.Thread(target=job_queue.work, name="job-worker", daemon=True).start()
     app.run('0.0.0.0', port=5001, debug=True)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import datetime
+import gzip
+import os
+import sys
+
+from bson import json_util
+
+from app import app, db, ensure_notification_indexes, bump_notification_version
+
+# 오래된 알림을 파일로 내보낸 뒤 컬렉션에서 삭제하는 보관 스크립트
+# 읽은 알림은 TTL 인덱스(NOTIFICATION_READ_TTL_DAYS)가 지우므로, 남겨야 하는 경우 그보다 짧은 주기로 실행
+# 사용법: python archive_notifications.py [며칠 지난 알림 (기본: 읽은 알림 보관 기간 - 1일)]
+ARCHIVE_FOLDER = os.path.join(os.getcwd(), "archives")
+BATCH_SIZE = 1000
+
+def archive_notifications(days):
+    """createdAt이 days일 이전인 알림(읽음 여부 무관)을 jsonl.gz로 내보내고 삭제"""
+    # createdAt은 한국 시간 기준으로 저장되어 있음
+    threshold = datetime.datetime.utcnow() + datetime.timedelta(hours=9) - datetime.timedelta(days=days)
+    os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+    archive_path = os.path.join(
+        ARCHIVE_FOLDER, f"notifications-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+
+    print(f"{threshold.strftime('%Y-%m-%d %H:%M')} 이전 알림 보관 중... ({archive_path})")
+
+    archived = 0
+    with gzip.open(archive_path, "wt", encoding="utf-8") as f:
+        while True:
+            batch = list(db["notifications"].find({"createdAt": {"$lt": threshold}}).sort("_id", 1).limit(BATCH_SIZE))
+            if not batch:
+                break
+            for notification in batch:
+                f.write(json_util.dumps(notification, ensure_ascii=False) + "\n")
+            f.flush()
+            # 파일에 쓴 알림만 삭제
+            db["notifications"].delete_many({"_id": {"$in": [n["_id"] for n in batch]}})
+            bump_notification_version([n["userId"] for n in batch])
+            archived += len(batch)
+
+    if archived == 0:
+        os.remove(archive_path)
+    print(f"✅ {archived}개의 알림을 보관했습니다.")
+    return archived
+
+def backfill_read_at():
+    """readAt 없이 읽음 처리된 이전 알림에 readAt을 채워 TTL 삭제 대상에 포함"""
+    result = db["notifications"].update_many(
+        {"isRead": True, "readAt": {"$exists": False}},
+        {"$set": {"readAt": datetime.datetime.utcnow()}}
+    )
+    print(f"✅ {result.modified_count}개의 읽은 알림에 readAt을 채웠습니다.")
+
+def main():
+    default_days = max(app.config["NOTIFICATION_READ_TTL_DAYS"] - 1, 1)
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else default_days
+
+    print("🗄  알림 보관")
+    print("="*50)
+    ensure_notification_indexes()
+    backfill_read_at()
+    archive_notifications(days)
+
+if __name__ == "__main__":
+    main()
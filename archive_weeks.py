@@ -0,0 +1,34 @@
+import sys
+
+from app import db, archive_week, current_week_number, ensure_archive_indexes, ARCHIVE_AFTER_WEEKS
+
+# 끝난 주차의 팀을 teams_archive 컬렉션으로 옮기는 스크립트 (cron 등으로 주기적으로 실행)
+# 현재 주차보다 ARCHIVE_AFTER_WEEKS주 이상 지난 주차가 대상이며, 보관된 팀도 화면에서는 그대로 보임
+# 사용법: python archive_weeks.py [주차 ...]  (주차를 지정하면 해당 주차만)
+
+def main():
+    print("🧊 지난 주차 팀 보관")
+    print("="*50)
+    ensure_archive_indexes()
+
+    if len(sys.argv) > 1:
+        weeks = [int(week) for week in sys.argv[1:]]
+    else:
+        last_week = current_week_number() - ARCHIVE_AFTER_WEEKS
+        weeks = sorted(week for week in db["teams"].distinct("week", {"deletedAt": None}) if week <= last_week)
+
+    if not weeks:
+        print("보관할 주차가 없습니다.")
+        return
+
+    total = 0
+    for week in weeks:
+        archived = archive_week(week)
+        remaining = db["teams"].count_documents({"week": week, "deletedAt": None})
+        total += archived
+        print(f"{week:2d}주차: {archived}개 팀 보관" + (f" (작업 중이던 팀 {remaining}개는 다음 실행에서 보관)" if remaining else ""))
+
+    print(f"\n✅ {total}개의 팀을 보관했습니다.")
+
+if __name__ == "__main__":
+    main()
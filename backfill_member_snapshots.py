@@ -0,0 +1,28 @@
+from app import db, propagate_member_snapshot, refresh_week_summary, TEAM_COLLECTIONS
+
+# 팀 멤버 항목에 사용자 정보 스냅샷(아이디, 닉네임, 프로필 이미지)을 채우는 스크립트
+# 스냅샷 도입 전에 만들어진 팀도 목록 화면에서 사용자 문서를 다시 조회하지 않도록 한 번 실행
+# 여러 번 실행해도 결과가 같으며, 사용자 정보가 어긋난 스냅샷도 함께 바로잡힘
+
+def main():
+    print("🪪 팀 멤버 스냅샷 채우기")
+    print("="*50)
+
+    user_ids = set()
+    for collection_name in TEAM_COLLECTIONS:
+        user_ids.update(db[collection_name].distinct("members.userId"))
+    print(f"{len(user_ids)}명의 사용자 스냅샷 갱신 중...")
+
+    updated = 0
+    for user_id in user_ids:
+        updated += propagate_member_snapshot(user_id)
+    print(f"✅ {updated}개의 팀 문서를 갱신했습니다.")
+
+    # 메인 페이지 요약도 새 스냅샷으로 다시 계산
+    weeks = db["week_summaries"].distinct("_id")
+    for week in weeks:
+        refresh_week_summary(week)
+    print(f"✅ {len(weeks)}개 주차 요약을 다시 계산했습니다.")
+
+if __name__ == "__main__":
+    main()
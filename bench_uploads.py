@@ -0,0 +1,72 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app import iter_upload_files, upload_shard
+
+# 업로드 폴더 스캔 벤치마크: 기존 방식(평면 폴더 + os.listdir + 파일별 isfile/getctime)과
+# 샤드 폴더 + os.scandir 방식을 같은 파일 수로 비교
+# 사용법: python bench_uploads.py [파일 수 (기본 100000)]
+
+def create_files(folder, count, sharded):
+    """빈 이미지 파일 count개 생성"""
+    for i in range(count):
+        digest = hashlib.sha256(str(i).encode()).hexdigest()[:32]
+        if sharded:
+            path = os.path.join(folder, upload_shard(digest), f"{digest}.png")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        else:
+            path = os.path.join(folder, f"{digest}.png")
+        open(path, "wb").close()
+
+def legacy_scan(folder):
+    """이전 find_recent_uploaded_images의 스캔 방식"""
+    recent_images = []
+    threshold = time.time() - 3600
+    for filename in os.listdir(folder):
+        file_path = os.path.join(folder, filename)
+        if os.path.isfile(file_path):
+            if os.path.getctime(file_path) > threshold:
+                recent_images.append(f"/static/uploads/{filename}")
+    return recent_images
+
+def scandir_scan(folder):
+    """현재 find_recent_uploaded_images의 스캔 방식"""
+    threshold = time.time() - 3600
+    return [url for url, entry in iter_upload_files(folder) if entry.stat().st_ctime > threshold]
+
+def measure(label, func, folder, repeat=3):
+    """가장 빠른 실행 시간을 출력"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = len(func(folder))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {best * 1000:9.1f} ms  ({found}개)")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    work_dir = tempfile.mkdtemp(prefix="bench_uploads_")
+    flat_folder = os.path.join(work_dir, "flat")
+    sharded_folder = os.path.join(work_dir, "sharded")
+    os.makedirs(flat_folder)
+    os.makedirs(sharded_folder)
+
+    try:
+        print(f"📁 파일 {count}개 생성 중... ({work_dir})")
+        create_files(flat_folder, count, sharded=False)
+        create_files(sharded_folder, count, sharded=True)
+
+        print("="*50)
+        measure("평면 + listdir/getctime", legacy_scan, flat_folder)
+        measure("평면 + scandir", scandir_scan, flat_folder)
+        measure("샤드 + scandir", scandir_scan, sharded_folder)
+    finally:
+        shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import datetime
+import time
+
+from app import leaderboard, find_teams
+
+# 기존 추천/좋아요/댓글로 순위를 처음부터 다시 계산하는 스크립트
+# (처음 도입할 때, 가중치/반감기/EPOCH를 바꾼 뒤 한 번 실행. 이후에는 각 라우트가 이벤트마다 점수를 더함)
+# 추천/좋아요는 시각이 저장되어 있지 않아 팀/글 작성 시각을 이벤트 시각으로 사용
+
+def kst_timestamp(value):
+    """한국 시간으로 저장된 createdAt을 timestamp로 (없으면 현재 시각)"""
+    if not value:
+        return time.time()
+    return (value - datetime.timedelta(hours=9)).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def main():
+    print("🏆 순위 다시 계산")
+    print("="*50)
+    leaderboard.ensure_indexes()
+    leaderboard.collection.delete_many({})
+
+    team_count = 0
+    event_count = 0
+    for team in find_teams({"deletedAt": None}):
+        team_count += 1
+        if team.get("upvote", 0) > 0:
+            leaderboard.record("upvote", team, count=team["upvote"], timestamp=kst_timestamp(team.get("createdAt")))
+            event_count += team["upvote"]
+
+        for post in team.get("posts", []):
+            if post.get("likes", 0) > 0:
+                leaderboard.record("like", team, post, count=post["likes"], timestamp=kst_timestamp(post.get("createdAt")))
+                event_count += post["likes"]
+            for comment in post.get("comments", []):
+                leaderboard.record("comment", team, post, timestamp=kst_timestamp(comment.get("createdAt")))
+                event_count += 1
+
+    print(f"✅ 팀 {team_count}개의 이벤트 {event_count}개를 반영했습니다.")
+
+if __name__ == "__main__":
+    main()
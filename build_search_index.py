@@ -0,0 +1,48 @@
+import time
+
+from app import users_collection, search_index, autocomplete_index, find_teams
+
+# 기존 글 전체를 검색 인덱스에, 사용자/팀 이름을 자동완성 인덱스에 넣는 스크립트
+# (처음 도입할 때, 또는 토큰화 규칙을 바꾼 뒤 한 번 실행)
+# 이후에는 글/댓글이 바뀔 때마다 reindex_team_search 작업이, 가입/팀 생성 시 각 라우트가 갱신함
+
+def build_autocomplete_index():
+    """사용자 아이디/닉네임, 팀 이름 자동완성 항목 생성"""
+    autocomplete_index.ensure_indexes()
+    autocomplete_index.collection.delete_many({})
+
+    user_count = 0
+    for user in users_collection.find({}, {"username": 1, "nickname": 1}):
+        autocomplete_index.put_user(user)
+        user_count += 1
+
+    team_count = 0
+    for team in find_teams({"deletedAt": None}, {"teamName": 1, "week": 1}):
+        autocomplete_index.put_team(team)
+        team_count += 1
+
+    print(f"✅ 자동완성: 사용자 {user_count}명, 팀 {team_count}개를 등록했습니다.")
+
+def main():
+    print("🔎 검색 인덱스 생성")
+    print("="*50)
+    search_index.ensure_indexes()
+
+    started = time.perf_counter()
+    team_count = 0
+    post_count = 0
+    for team in find_teams({"deletedAt": None}, {"teamName": 1, "week": 1, "posts": 1}):
+        post_count += search_index.index_team(team)
+        team_count += 1
+
+    # 삭제되었거나 없어진 팀의 검색 문서 정리
+    team_ids = [team["_id"] for team in find_teams({"deletedAt": None}, {"_id": 1})]
+    removed = search_index.collection.delete_many({"teamId": {"$nin": team_ids}}).deleted_count
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ 팀 {team_count}개, 글 {post_count}개를 색인했습니다. (정리된 문서 {removed}개, {elapsed:.1f}초)")
+
+    build_autocomplete_index()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import collections
+import pickle
+import threading
+import time
+import traceback
+
+try:
+    import redis
+except ImportError:  # Redis 캐시를 쓰지 않으면 redis 패키지 없이도 동작
+    redis = None
+
+# 캐시 (라우트가 필요할 때 get_or_set으로 골라서 사용)
+#
+# - 백엔드: 프로세스 안의 LRU(local) 또는 여러 프로세스/서버가 함께 쓰는 Redis(redis)
+# - ttl 동안은 그대로 쓰고, 그 뒤 stale_ttl 동안은 이전 값을 바로 돌려주면서 백그라운드에서 다시 읽음 (stale-while-revalidate)
+# - 같은 키를 동시에 여러 요청이 못 찾으면 한 요청만 loader를 실행하고 나머지는 그 결과를 기다림 (single-flight)
+#   Redis 백엔드는 짧은 잠금 키로 다른 프로세스의 동시 로드도 막음
+# - 항목에 태그("users:<id>" 등)를 붙여 두면 무효화 버스(invalidation.py)로 받은 문서 변경에 해당하는 항목만 지움
+# - namespace별 hit/miss/stale/load 통계 제공
+
+LOAD_WAIT_TIMEOUT = 5
+# 로드 중인 동안 무효화된 태그 기록이 이만큼 쌓이면 더 이상 필요 없는 기록을 정리
+TAG_HISTORY_LIMIT = 1000
+
+class LocalCacheBackend:
+    """프로세스 안의 LRU 캐시"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.tags = collections.defaultdict(set)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["staleUntil"] <= time.time():
+                self._delete(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, tags):
+        with self.lock:
+            self._delete(key)
+            entry["tags"] = list(tags)
+            self.entries[key] = entry
+            for tag in tags:
+                self.tags[tag].add(key)
+            while len(self.entries) > self.max_entries:
+                self._delete(next(iter(self.entries)))
+
+    def _delete(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            for tag in entry["tags"]:
+                self.tags[tag].discard(key)
+                if not self.tags[tag]:
+                    del self.tags[tag]
+
+    def delete(self, key):
+        with self.lock:
+            self._delete(key)
+
+    def invalidate_tag(self, tag):
+        with self.lock:
+            keys = list(self.tags.get(tag, ()))
+            for key in keys:
+                self._delete(key)
+        return keys
+
+    def acquire_load_lock(self, key, timeout):
+        # 프로세스 안의 동시 로드는 Cache가 막으므로 다른 프로세스와 경쟁할 일이 없음
+        return True
+
+    def release_load_lock(self, key):
+        pass
+
+class RedisCacheBackend:
+    """여러 프로세스/서버가 함께 쓰는 Redis 캐시 (값은 pickle, 태그는 Redis set)"""
+
+    def __init__(self, url, prefix="cache:"):
+        if redis is None:
+            raise RuntimeError("Redis 캐시를 사용하려면 redis 패키지가 필요합니다.")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data else None
+
+    def set(self, key, entry, tags):
+        entry["tags"] = list(tags)
+        expire = max(int(entry["staleUntil"] - time.time()) + 1, 1)
+        pipeline = self.client.pipeline()
+        pipeline.set(self.prefix + key, pickle.dumps(entry), ex=expire)
+        for tag in tags:
+            pipeline.sadd(f"{self.prefix}tag:{tag}", key)
+            pipeline.expire(f"{self.prefix}tag:{tag}", expire)
+        pipeline.execute()
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def invalidate_tag(self, tag):
+        tag_key = f"{self.prefix}tag:{tag}"
+        keys = [key.decode() for key in self.client.smembers(tag_key)]
+        pipeline = self.client.pipeline()
+        for key in keys:
+            pipeline.delete(self.prefix + key)
+        pipeline.delete(tag_key)
+        pipeline.execute()
+        return keys
+
+    def acquire_load_lock(self, key, timeout):
+        return bool(self.client.set(f"{self.prefix}lock:{key}", 1, nx=True, ex=timeout))
+
+    def release_load_lock(self, key):
+        self.client.delete(f"{self.prefix}lock:{key}")
+
+class Cache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats_by_namespace = collections.defaultdict(collections.Counter)
+        self.loading = {}
+        self.lock = threading.Lock()
+        # 로드하는 동안 그 항목의 태그가 무효화됐으면 읽은 값이 이미 오래된 것일 수 있으므로 저장하지 않음
+        # (다른 태그의 무효화는 상관없으므로 태그마다 마지막으로 무효화된 순번을 기록해서 비교)
+        self.invalidation_seq = 0
+        self.tag_invalidated_at = {}
+        self.loads_started = collections.Counter()  # 진행 중인 로드의 시작 순번별 개수
+
+    def get_or_set(self, namespace, key, loader, ttl, stale_ttl=0, tags=(), bypass=False):
+        """캐시된 값을 반환하고, 없으면 loader()로 읽어서 저장
+
+        tags는 태그 목록이나 loader 결과를 받아 태그 목록을 돌려주는 함수 (결과를 봐야 태그를 알 수 있을 때)
+        bypass가 참이면 캐시를 거치지 않고 loader() 결과를 그대로 반환
+        """
+        cache_key = f"{namespace}:{key}"
+        stats = self.stats_by_namespace[namespace]
+        if bypass:
+            stats["bypasses"] += 1
+            return loader()
+        entry = self.backend.get(cache_key)
+        now = time.time()
+        if entry is not None:
+            if entry["expiresAt"] > now:
+                stats["hits"] += 1
+                return entry["value"]
+            # 유효 기간은 지났지만 stale 기간 안이면 이전 값을 주고 백그라운드에서 갱신
+            stats["stale_hits"] += 1
+            self._load_in_background(namespace, cache_key, loader, ttl, stale_ttl, tags)
+            return entry["value"]
+
+        stats["misses"] += 1
+        return self._load(namespace, cache_key, loader, ttl, stale_ttl, tags)
+
+    def _load(self, namespace, cache_key, loader, ttl, stale_ttl, tags):
+        """single-flight 로드: 같은 키를 이미 읽는 중이면 그 결과를 기다림"""
+        with self.lock:
+            waiter = self.loading.get(cache_key)
+            if waiter is None:
+                waiter = self.loading[cache_key] = {"done": threading.Event()}
+                is_leader = True
+            else:
+                is_leader = False
+
+        if not is_leader:
+            self.stats_by_namespace[namespace]["coalesced"] += 1
+            if waiter["done"].wait(LOAD_WAIT_TIMEOUT) and "value" in waiter:
+                return waiter["value"]
+            return loader()
+
+        try:
+            value = self._load_shared(namespace, cache_key, loader, ttl, stale_ttl, tags)
+            waiter["value"] = value
+            return value
+        finally:
+            with self.lock:
+                self.loading.pop(cache_key, None)
+            waiter["done"].set()
+
+    def _load_shared(self, namespace, cache_key, loader, ttl, stale_ttl, tags):
+        """다른 프로세스가 같은 키를 읽는 중이면 잠시 기다렸다가 그 결과를 사용 (Redis 백엔드)"""
+        locked = self.backend.acquire_load_lock(cache_key, LOAD_WAIT_TIMEOUT)
+        if not locked:
+            deadline = time.time() + LOAD_WAIT_TIMEOUT
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = self.backend.get(cache_key)
+                if entry is not None:
+                    self.stats_by_namespace[namespace]["coalesced"] += 1
+                    return entry["value"]
+        load_seq = self._begin_load()
+        try:
+            stats = self.stats_by_namespace[namespace]
+            started = time.perf_counter()
+            try:
+                value = loader()
+            except Exception:
+                stats["load_errors"] += 1
+                raise
+            stats["loads"] += 1
+            stats["load_seconds"] += time.perf_counter() - started
+            entry_tags = list(tags(value) if callable(tags) else tags)
+            # "users:<id>" 태그가 있으면 "users" 태그도 붙여서 컬렉션 전체 무효화에도 지워지게 함
+            entry_tags += {tag.split(":", 1)[0] for tag in entry_tags if ":" in tag}
+            entry_tags = [namespace] + entry_tags
+            if self._invalidated_since(entry_tags, load_seq):
+                stats["stale_loads"] += 1
+                return value
+            now = time.time()
+            self.backend.set(cache_key, {
+                "value": value,
+                "expiresAt": now + ttl,
+                "staleUntil": now + ttl + stale_ttl
+            }, entry_tags)
+            return value
+        finally:
+            self._end_load(load_seq)
+            if locked:
+                self.backend.release_load_lock(cache_key)
+
+    def _begin_load(self):
+        with self.lock:
+            load_seq = self.invalidation_seq
+            self.loads_started[load_seq] += 1
+            return load_seq
+
+    def _invalidated_since(self, tags, load_seq):
+        with self.lock:
+            return any(self.tag_invalidated_at.get(tag, 0) > load_seq for tag in tags)
+
+    def _end_load(self, load_seq):
+        with self.lock:
+            self.loads_started[load_seq] -= 1
+            if self.loads_started[load_seq] <= 0:
+                del self.loads_started[load_seq]
+            # 진행 중인 로드보다 먼저 무효화된 태그 기록은 비교에 쓰이지 않으므로 정리
+            if not self.loads_started:
+                self.tag_invalidated_at.clear()
+            elif len(self.tag_invalidated_at) > TAG_HISTORY_LIMIT:
+                oldest = min(self.loads_started)
+                self.tag_invalidated_at = {tag: seq for tag, seq in self.tag_invalidated_at.items() if seq > oldest}
+
+    def _load_in_background(self, namespace, cache_key, loader, ttl, stale_ttl, tags):
+        with self.lock:
+            if cache_key in self.loading:
+                return
+            waiter = self.loading[cache_key] = {"done": threading.Event()}
+
+        def refresh():
+            try:
+                waiter["value"] = self._load_shared(namespace, cache_key, loader, ttl, stale_ttl, tags)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self.lock:
+                    self.loading.pop(cache_key, None)
+                waiter["done"].set()
+
+        threading.Thread(target=refresh, name="cache-refresh", daemon=True).start()
+
+    def invalidate(self, namespace, key):
+        self.backend.delete(f"{namespace}:{key}")
+
+    def invalidate_tag(self, tag):
+        """태그가 붙은 항목을 모두 지우고 지운 개수를 반환"""
+        with self.lock:
+            self.invalidation_seq += 1
+            self.tag_invalidated_at[tag] = self.invalidation_seq
+        removed_keys = self.backend.invalidate_tag(tag)
+        for cache_key in removed_keys:
+            self.stats_by_namespace[cache_key.split(":", 1)[0]]["invalidations"] += 1
+        return len(removed_keys)
+
+    def subscribe_to(self, bus, collection_names):
+        """무효화 버스의 문서 변경을 "컬렉션:문서 id" 태그 무효화로 연결 (id가 없으면 컬렉션 전체)"""
+        for collection_name in collection_names:
+            def invalidate(document_id, collection_name=collection_name):
+                self.invalidate_tag(collection_name if document_id is None else f"{collection_name}:{document_id}")
+            bus.subscribe(collection_name, invalidate)
+
+    def stats(self):
+        """namespace별 통계 (hit_ratio: 유효한 값 + stale 값을 바로 돌려준 비율)"""
+        result = {}
+        for namespace, counter in self.stats_by_namespace.items():
+            lookups = counter["hits"] + counter["stale_hits"] + counter["misses"]
+            result[namespace] = dict(counter, hit_ratio=(counter["hits"] + counter["stale_hits"]) / lookups if lookups else 0.0)
+        return result
+
+def create_cache(config):
+    """설정(CACHE_BACKEND)에 맞는 캐시 생성"""
+    if config.get("CACHE_BACKEND") == "redis":
+        return Cache(RedisCacheBackend(config["REDIS_URL"]))
+    return Cache(LocalCacheBackend(config.get("CACHE_MAX_ENTRIES", 10000)))
@@ -0,0 +1,60 @@
+import sys
+
+from app import db, build_week_summary, refresh_week_summary, TEAM_COLLECTIONS
+
+# 주차별 메인 페이지 요약(week_summaries)과 실제 팀/사용자 데이터를 비교하는 스크립트
+# 사용법: python check_week_summaries.py [--fix]  (--fix: 어긋난 주차의 요약을 다시 만듦)
+
+def normalize(teams):
+    """비교용: 팀 id 순으로 정렬한 팀 목록"""
+    return sorted(teams, key=lambda team: team["id"])
+
+def describe_differences(stored_teams, live_teams):
+    """어긋난 내용을 사람이 읽을 수 있는 문장 목록으로"""
+    stored_by_id = {team["id"]: team for team in stored_teams}
+    live_by_id = {team["id"]: team for team in live_teams}
+    differences = []
+    for team_id in live_by_id.keys() - stored_by_id.keys():
+        differences.append(f"요약에 없는 팀: {live_by_id[team_id]['teamName']}")
+    for team_id in stored_by_id.keys() - live_by_id.keys():
+        differences.append(f"삭제된 팀이 요약에 남아 있음: {stored_by_id[team_id]['teamName']}")
+    for team_id in stored_by_id.keys() & live_by_id.keys():
+        stored, live = stored_by_id[team_id], live_by_id[team_id]
+        for field in ("teamName", "description", "upvote", "member_count", "members"):
+            if stored.get(field) != live.get(field):
+                differences.append(f"{live['teamName']}: {field} 불일치 (요약 {stored.get(field)!r}, 실제 {live.get(field)!r})")
+    return differences
+
+def main():
+    fix = "--fix" in sys.argv[1:]
+
+    print("🔍 주차별 요약 일관성 검사")
+    print("="*50)
+
+    weeks = set(db["week_summaries"].distinct("_id"))
+    for collection_name in TEAM_COLLECTIONS:
+        weeks |= set(db[collection_name].distinct("week", {"deletedAt": None}))
+    mismatched_weeks = []
+    for week in sorted(weeks):
+        stored = db["week_summaries"].find_one({"_id": week})
+        if stored is None:
+            # 요약이 없는 주차는 처음 조회할 때 만들어지므로 불일치가 아님
+            continue
+        differences = describe_differences(normalize(stored["teams"]), normalize(build_week_summary(week)["teams"]))
+        if differences:
+            mismatched_weeks.append(week)
+            print(f"❌ {week}주차")
+            for difference in differences:
+                print(f"   • {difference}")
+            if fix:
+                refresh_week_summary(week)
+                print("   → 요약을 다시 만들었습니다.")
+
+    if mismatched_weeks:
+        print(f"\n{len(mismatched_weeks)}개 주차가 실제 데이터와 다릅니다.")
+    else:
+        print("✅ 모든 주차 요약이 실제 데이터와 일치합니다.")
+    return 1 if mismatched_weeks and not fix else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,7 @@ client = MongoClient("mongodb://localhost:27017/")
 db = client["flask_jwt_auth"]
 users_collection = db["users"]
 teams_collection = db["teams"]
+memberships_collection = db["memberships"]
 
 def clear_existing_data():
     """기존 데이터 삭제 (선택사항)"""
@@ -16,6 +17,8 @@ def clear_existing_data():
     if choice.lower() == 'y':
         users_collection.delete_many({})
         teams_collection.delete_many({})
+        db["teams_archive"].delete_many({})  # 보관된 팀도 find_team/find_teams가 읽으므로 함께 삭제
+        memberships_collection.delete_many({})
         print("기존 데이터가 삭제되었습니다.")
 
 def create_sample_users():
@@ -35,7 +38,9 @@ def create_sample_users():
         }
         users.append(user_data)
     
-    # 사용자 데이터 삽입
+    # 사용자 데이터 삽입 (아이디/닉네임은 앱과 같은 유니크 인덱스로 보장)
+    users_collection.create_index("username", unique=True, name="username_unique")
+    users_collection.create_index("nickname", unique=True, name="nickname_unique")
     result = users_collection.insert_many(users)
     print(f"✅ {len(result.inserted_ids)}명의 사용자가 생성되었습니다.")
     return result.inserted_ids
@@ -45,34 +50,40 @@ def create_sample_teams(user_ids):
     print("팀 생성 중...")
     
     teams = []
+    # 팀 멤버 항목에 같이 저장할 사용자 정보 (닉네임, 프로필 이미지 스냅샷)
+    users_by_id = {user["_id"]: user for user in users_collection.find({"_id": {"$in": list(user_ids)}})}
     
     # 각 주차별로 팀 생성
     for week in range(21):  # week 0 ~ 20
         num_teams_in_week = random.randint(2, 10)
+        # 한 주차에는 한 팀에만 소속될 수 있으므로 이번 주차에 아직 팀이 없는 사용자 중에서 선택
+        available_users = list(user_ids)
         
         for team_idx in range(num_teams_in_week):
+            if len(available_users) < 2:
+                break
+            
             # 팀 이름: 팀_0주차_0 형식
             team_name = f"팀_{week}주차_{team_idx + 1}"
             
             # 팀 비밀번호는 팀명과 동일
             team_password = team_name
             
-            # 팀장 선택
-            master_id = random.choice(user_ids)
-            
-            # 팀 멤버 선택 (팀장 포함 2~6명)
-            member_count = random.randint(2, 6)
-            selected_members = random.sample(user_ids, member_count)
-            
-            # 팀장을 첫 번째로 배치
-            if master_id not in selected_members:
-                selected_members[0] = master_id
+            # 팀 멤버 선택 (팀장 포함 2~6명), 첫 번째 멤버가 팀장
+            member_count = min(random.randint(2, 6), len(available_users))
+            selected_members = random.sample(available_users, member_count)
+            master_id = selected_members[0]
+            for user_id in selected_members:
+                available_users.remove(user_id)
             
             members = []
             for idx, user_id in enumerate(selected_members):
                 role = "master" if user_id == master_id else "member"
                 members.append({
                     "userId": user_id,
+                    "username": users_by_id[user_id]["username"],
+                    "nickname": users_by_id[user_id]["nickname"],
+                    "profile_img": users_by_id[user_id].get("profile_img"),
                     "role": role,
                     "joinedAt": datetime.datetime.utcnow() - datetime.timedelta(days=random.randint(0, 30))
                 })
@@ -94,6 +105,17 @@ def create_sample_teams(user_ids):
     if teams:
         result = teams_collection.insert_many(teams)
         print(f"✅ {len(result.inserted_ids)}개의 팀이 생성되었습니다.")
+        
+        # 사용자별 주차 멤버십 (앱에서 한 주차 한 팀 규칙 확인에 사용)
+        memberships_collection.create_index([("userId", 1), ("week", 1)], unique=True)
+        memberships_collection.insert_many([{
+            "userId": member["userId"],
+            "week": team["week"],
+            "teamId": team["_id"],
+            "teamName": team["teamName"],
+            "role": member["role"],
+            "joinedAt": member["joinedAt"]
+        } for team in teams for member in team["members"]])
     else:
         print("⚠️ 생성된 팀이 없습니다.")
     
@@ -154,6 +176,9 @@ def main():
     # 팀 생성
     create_sample_teams(user_ids)
     
+    # 주차별 메인 페이지 요약은 앱에서 처음 조회할 때 새 데이터로 다시 만들어짐
+    db["week_summaries"].delete_many({})
+    
     # 요약 출력
     print_sample_data()
     
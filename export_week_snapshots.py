@@ -0,0 +1,43 @@
+import os
+import sys
+
+from app import db, SNAPSHOT_FOLDER, current_week_number, export_week_snapshot, write_snapshot_manifest
+
+# 끝난 주차의 팀 목록을 정적 HTML(static/snapshots)로 미리 만드는 스크립트
+# 이후 지난 주차의 팀/추천/멤버 정보가 바뀌면 export_week_snapshot 작업이 해당 주차만 다시 만듦
+# 사용법: python export_week_snapshots.py [--prune] [주차 ...]  (--prune: manifest에 없는 이전 파일 삭제)
+
+def prune_snapshot_files():
+    """manifest에서 더 이상 가리키지 않는 스냅샷 파일 삭제"""
+    current_files = set(db["week_snapshots"].distinct("filename"))
+    removed = 0
+    for filename in os.listdir(SNAPSHOT_FOLDER):
+        if filename.startswith("teams-week-") and filename not in current_files:
+            os.remove(os.path.join(SNAPSHOT_FOLDER, filename))
+            removed += 1
+    return removed
+
+def main():
+    args = sys.argv[1:]
+    prune = "--prune" in args
+    # 메인 페이지에 보이는 주차는 0~20주차
+    weeks = [int(arg) for arg in args if arg != "--prune"] or range(min(current_week_number(), 21))
+
+    print("📦 지난 주차 팀 목록 정적 스냅샷")
+    print("="*50)
+
+    for week in weeks:
+        url = export_week_snapshot(week, write_manifest=False)
+        if url:
+            print(f"{week:2d}주차: {url}")
+        else:
+            print(f"{week:2d}주차: 진행 중인 주차라 건너뜀")
+
+    manifest = write_snapshot_manifest()
+    print(f"\n✅ manifest에 {len(manifest['weeks'])}개 주차를 기록했습니다.")
+
+    if prune:
+        print(f"🧹 이전 스냅샷 파일 {prune_snapshot_files()}개를 삭제했습니다.")
+
+if __name__ == "__main__":
+    main()
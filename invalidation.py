@@ -0,0 +1,157 @@
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+
+from pymongo.errors import PyMongoError
+
+try:
+    import redis
+except ImportError:  # Redis 무효화 버스를 쓰지 않으면 redis 패키지 없이도 동작
+    redis = None
+
+# 여러 앱 프로세스/서버에 걸친 인프로세스 캐시 무효화 버스
+#
+# 캐시는 subscribe(collection, callback)로 관심 있는 컬렉션을 등록하고, 문서가 바뀌면 callback(document_id)이 호출된다.
+# (document_id가 None이면 어떤 문서가 바뀌었는지 모르는 경우라 해당 컬렉션 캐시 전체를 비워야 함)
+# - local: 한 프로세스 안에서만 전달 (개발 서버, 프로세스 하나로 운영할 때)
+# - changestream: MongoDB change stream으로 모든 프로세스가 DB 변경 자체를 받음 (replica set 필요)
+#   쓰는 코드가 publish를 빠뜨려도 변경이 전달되고, 연결이 끊기면 resume token으로 이어서 받음
+# - redis: Redis pub/sub 채널로 publish한 변경을 모든 프로세스가 받음 (단일 MongoDB 서버 환경용)
+# 어느 백엔드든 publish한 프로세스의 캐시는 바로 무효화하므로 쓰기 직후 같은 프로세스에서 읽어도 새 값이 보인다.
+
+RECONNECT_DELAY = 1
+
+def process_id():
+    """서버/프로세스를 구분하는 id (fork 후에도 달라지도록 매번 계산)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class InvalidationBus:
+    """프로세스 안에서만 변경을 전달하는 기본 버스 (다른 백엔드의 부모 클래스)"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.listener_pid = None
+        self.lock = threading.Lock()
+
+    def subscribe(self, collection_name, callback):
+        self.subscribers.setdefault(collection_name, []).append(callback)
+
+    def dispatch(self, collection_name, document_id=None):
+        # 백엔드마다 id 타입이 다르므로(ObjectId, int, JSON 문자열) 문자열로 맞춰서 전달
+        document_id = str(document_id) if document_id is not None else None
+        for callback in self.subscribers.get(collection_name, []):
+            try:
+                callback(document_id)
+            except Exception:
+                traceback.print_exc()
+
+    def dispatch_all(self):
+        """변경을 놓쳤을 수 있을 때 모든 캐시를 비움"""
+        for collection_name in list(self.subscribers):
+            self.dispatch(collection_name)
+
+    def publish(self, collection_name, document_id=None):
+        """문서 변경 알림 - 현재 프로세스에 바로 전달하고, 다른 프로세스로는 백엔드가 전달"""
+        self.dispatch(collection_name, document_id)
+
+    def start(self):
+        """프로세스마다 한 번 수신 스레드 시작 (fork된 프로세스에서도 다시 시작됨)"""
+        with self.lock:
+            if self.listener_pid == os.getpid():
+                return
+            self.listener_pid = os.getpid()
+        thread = threading.Thread(target=self.listen, name="invalidation-listener", daemon=True)
+        thread.start()
+
+    def listen(self):
+        pass
+
+class ChangeStreamInvalidationBus(InvalidationBus):
+    """MongoDB change stream으로 다른 프로세스의 변경을 받는 버스"""
+
+    def __init__(self, db, collection_names):
+        super().__init__()
+        self.db = db
+        self.collection_names = list(collection_names)
+
+    def check_deployment(self):
+        """change stream은 replica set/sharded cluster에서만 열 수 있음 (단일 서버면 RuntimeError)"""
+        while True:
+            try:
+                status = self.db.client.admin.command("ismaster")
+                break
+            except PyMongoError as e:
+                print(f"캐시 무효화 change stream 서버 확인 실패, 다시 시도: {e}")
+                time.sleep(RECONNECT_DELAY)
+        if not status.get("setName") and status.get("msg") != "isdbgrid":
+            raise RuntimeError("INVALIDATION_BACKEND=changestream은 replica set이 필요합니다. "
+                               "단일 MongoDB 서버에서는 redis 백엔드를 사용하세요. (캐시 무효화가 동작하지 않음)")
+
+    def listen(self):
+        self.check_deployment()
+        resume_token = None
+        while True:
+            try:
+                with self.db.watch(
+                    [{"$match": {"ns.coll": {"$in": self.collection_names}}}],
+                    resume_after=resume_token
+                ) as stream:
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        if change["operationType"] in ("drop", "rename", "dropDatabase", "invalidate"):
+                            self.dispatch_all()
+                            continue
+                        self.dispatch(change["ns"]["coll"], change.get("documentKey", {}).get("_id"))
+            except PyMongoError as e:
+                # resume token이 oplog에서 밀려났으면 그 사이 변경을 알 수 없으므로 전부 비우고 새로 구독
+                print(f"캐시 무효화 change stream 재연결: {e}")
+                resume_token = None
+                self.dispatch_all()
+                time.sleep(RECONNECT_DELAY)
+
+class RedisInvalidationBus(InvalidationBus):
+    """Redis pub/sub으로 다른 프로세스에 변경을 전달하는 버스"""
+
+    def __init__(self, url, channel="cache-invalidation"):
+        super().__init__()
+        if redis is None:
+            raise RuntimeError("Redis 캐시 무효화를 사용하려면 redis 패키지가 필요합니다.")
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def publish(self, collection_name, document_id=None):
+        super().publish(collection_name, document_id)
+        message = {"collection": collection_name, "id": str(document_id) if document_id is not None else None,
+                   "sender": process_id()}
+        try:
+            self.client.publish(self.channel, json.dumps(message))
+        except redis.RedisError as e:
+            print(f"캐시 무효화 메시지 전송 실패: {e}")
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # 연결이 끊겨 있던 동안의 메시지는 받을 수 없으므로 (재)구독할 때마다 전부 비움
+                self.dispatch_all()
+                for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    if data.get("sender") == process_id():
+                        continue  # 직접 publish한 변경은 이미 반영함
+                    self.dispatch(data["collection"], data.get("id"))
+            except redis.RedisError as e:
+                print(f"캐시 무효화 Redis 재연결: {e}")
+                time.sleep(RECONNECT_DELAY)
+
+def create_invalidation_bus(config, db, collection_names):
+    """설정(INVALIDATION_BACKEND)에 맞는 무효화 버스 생성"""
+    backend = config.get("INVALIDATION_BACKEND", "local")
+    if backend == "changestream":
+        return ChangeStreamInvalidationBus(db, collection_names)
+    if backend == "redis":
+        return RedisInvalidationBus(config["REDIS_URL"])
+    return InvalidationBus()
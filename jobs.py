@@ -0,0 +1,147 @@
+import datetime
+import os
+import socket
+import time
+import traceback
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# MongoDB 컬렉션 기반 백그라운드 작업 큐
+#
+# 요청은 enqueue로 작업 문서만 넣고 바로 응답하며, worker.py로 띄운 워커 프로세스들이 작업을 가져가 실행한다.
+# - 가져간 작업은 visibility_timeout 동안 다른 워커에게 보이지 않고, 그 안에 끝나지 않으면(워커 종료 등) 다시 실행된다.
+# - 실패한 작업은 지수 백오프로 재시도하고 max_attempts를 넘기면 failed 상태로 남긴다.
+# - 같은 작업이 여러 번 실행될 수 있으므로(at-least-once) 핸들러는 여러 번 실행되어도 안전해야 한다.
+
+def utcnow():
+    return datetime.datetime.utcnow()
+
+class JobQueue:
+    def __init__(self, collection, visibility_timeout=60, max_attempts=5):
+        self.collection = collection
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.handlers = {}
+
+    def ensure_indexes(self):
+        self.collection.create_index([("status", ASCENDING), ("runAt", ASCENDING)])
+        # 같은 dedupeKey로 대기 중인 작업은 하나만 유지
+        self.collection.create_index(
+            "dedupeKey", unique=True,
+            partialFilterExpression={"status": "queued", "dedupeKey": {"$exists": True}}
+        )
+
+    def handler(self, name):
+        """작업 이름에 핸들러 함수를 등록하는 데코레이터"""
+        def register(func):
+            self.handlers[name] = func
+            return func
+        return register
+
+    def enqueue(self, name, payload=None, delay=0, dedupe_key=None):
+        """작업을 큐에 추가. dedupe_key가 같은 작업이 이미 대기 중이면 새로 넣지 않음"""
+        now = utcnow()
+        job = {
+            "name": name,
+            "payload": payload or {},
+            "status": "queued",
+            "attempts": 0,
+            "maxAttempts": self.max_attempts,
+            "runAt": now + datetime.timedelta(seconds=delay),
+            "lockedUntil": None,
+            "createdAt": now
+        }
+        if dedupe_key is None:
+            return self.collection.insert_one(job).inserted_id
+
+        # dedupeKey, status는 upsert 조건에서 채워짐
+        del job["status"]
+        try:
+            result = self.collection.update_one(
+                {"dedupeKey": dedupe_key, "status": "queued"},
+                {"$setOnInsert": job},
+                upsert=True
+            )
+            return result.upserted_id
+        except DuplicateKeyError:
+            return None
+
+    def claim(self, worker_id):
+        """실행할 작업 하나를 가져옴 (다른 워커가 잡고 있다가 제한 시간이 지난 작업 포함)"""
+        now = utcnow()
+        return self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued", "runAt": {"$lte": now}},
+                    {"status": "running", "lockedUntil": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "workerId": worker_id,
+                    "lockedUntil": now + datetime.timedelta(seconds=self.visibility_timeout)
+                },
+                "$unset": {"dedupeKey": ""},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("runAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def complete(self, job):
+        self.collection.delete_one({"_id": job["_id"], "workerId": job["workerId"]})
+
+    def fail(self, job, error):
+        if job["attempts"] >= job.get("maxAttempts", self.max_attempts):
+            update = {"status": "failed", "lastError": error, "failedAt": utcnow()}
+        else:
+            backoff = min(2 ** job["attempts"], 300)
+            update = {
+                "status": "queued",
+                "lastError": error,
+                "lockedUntil": None,
+                "runAt": utcnow() + datetime.timedelta(seconds=backoff)
+            }
+        self.collection.update_one({"_id": job["_id"], "workerId": job["workerId"]}, {"$set": update})
+
+    def run_job(self, job):
+        handler = self.handlers.get(job["name"])
+        try:
+            if handler is None:
+                raise LookupError(f"등록되지 않은 작업입니다: {job['name']}")
+            handler(**job["payload"])
+        except Exception:
+            print(f"작업 실패: {job['name']} ({job['attempts']}회차)\n{traceback.format_exc()}")
+            self.fail(job, traceback.format_exc(limit=3))
+        else:
+            self.complete(job)
+
+    def run_pending(self, worker_id=None, limit=None):
+        """지금 실행 가능한 작업들을 처리하고 처리한 개수를 반환"""
+        worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        processed = 0
+        while limit is None or processed < limit:
+            job = self.claim(worker_id)
+            if job is None:
+                break
+            self.run_job(job)
+            processed += 1
+        return processed
+
+    def work(self, poll_interval=1.0, stop_event=None):
+        """작업이 없으면 poll_interval초 쉬면서 계속 처리 (워커 프로세스/스레드의 메인 루프)"""
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        print(f"작업 워커 시작: {worker_id}")
+        while stop_event is None or not stop_event.is_set():
+            try:
+                if self.run_pending(worker_id) == 0:
+                    time.sleep(poll_interval)
+            except Exception as e:
+                print(f"작업 워커 오류: {e}")
+                time.sleep(poll_interval)
+
+    def depth(self):
+        """대기 중인 작업 수"""
+        return self.collection.count_documents({"status": "queued"})
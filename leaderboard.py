@@ -0,0 +1,158 @@
+import copy
+import datetime
+import time
+
+from pymongo import ASCENDING, DESCENDING
+
+# 전체 기간/인기 급상승 순위 (팀, 글)
+#
+# 추천/좋아요/댓글이 생길 때마다 해당 팀과 글의 순위 문서에 점수를 $inc로 더하기만 하고,
+# 순위 조회는 점수 인덱스를 내림차순으로 앞에서 K개만 읽는다. (모든 팀을 훑어서 다시 계산하지 않음)
+#
+# 인기 급상승 점수는 시간 감쇠를 적용한 점수다. 이벤트마다 weight * 2^((이벤트 시각 - 기준 시각) / 반감기)를 더하면
+# 모든 항목이 같은 기준 시각으로 환산되므로, 저장된 점수를 다시 계산하지 않아도
+# "반감기마다 예전 활동의 가치가 절반이 되는" 순서가 그대로 유지된다.
+# 값은 시간이 지날수록 커지므로 표시할 때는 현재 시각 기준으로 나눠서(decay) 보여준다.
+# 기준 시각은 EPOCH부터 TREND_REBASE_PERIOD마다 앞으로 옮겨서(trendEpoch) 값이 float 범위를 넘지 않게 한다.
+# 기준 시각이 바뀌면 처음 기록/조회하는 프로세스가 이전 기준 시각의 점수에 2^((이전 - 새 기준) / 반감기)를 곱해 환산한다.
+
+EPOCH = datetime.datetime(2025, 8, 1)
+TREND_REBASE_PERIOD = datetime.timedelta(days=30)
+
+# 이벤트 종류별 가중치 (전체 기간 점수와 급상승 점수에 같이 사용)
+EVENT_WEIGHTS = {"upvote": 3, "like": 2, "comment": 1}
+EVENT_METRICS = {"upvote": "upvotes", "like": "likes", "comment": "comments"}
+
+def trend_epoch(timestamp):
+    """timestamp(초) 시점의 급상승 점수 기준 시각 (EPOCH부터 TREND_REBASE_PERIOD 단위로 내림)"""
+    elapsed = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).replace(tzinfo=None) - EPOCH
+    return EPOCH + elapsed // TREND_REBASE_PERIOD * TREND_REBASE_PERIOD
+
+def utc_timestamp(value):
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def team_entry_id(team_id):
+    return f"team:{team_id}"
+
+def post_entry_id(team_id, post):
+    """글 순위 문서 _id (예전 글은 _id가 없어서 제목 사용)"""
+    return f"post:{team_id}:{post.get('_id') or post.get('title', '')}"
+
+class Leaderboard:
+    def __init__(self, collection, half_life_hours=48):
+        self.collection = collection
+        self.primary_collection = collection  # 환산은 read preference와 상관없이 primary에서
+        self.half_life = half_life_hours * 3600
+        # 이 프로세스가 환산을 마친 기준 시각 (with_read_preference로 만든 인스턴스와 공유)
+        self.rebased = {"epoch": None}
+
+    def ensure_indexes(self):
+        self.collection.create_index([("kind", ASCENDING), ("allTimeScore", DESCENDING)])
+        self.collection.create_index([("kind", ASCENDING), ("trendScore", DESCENDING)])
+        self.collection.create_index([("teamId", ASCENDING)])
+        self.collection.create_index([("trendEpoch", ASCENDING)])
+
+    def with_read_preference(self, read_preference):
+        """같은 컬렉션을 다른 read preference로 읽는 인스턴스 (목록 화면의 secondary 읽기용)"""
+        reader = copy.copy(self)
+        reader.collection = self.collection.with_options(read_preference=read_preference)
+        return reader
+
+    def decay_factor(self, timestamp, epoch):
+        """기준 시각 epoch로 환산한 timestamp(초) 시점 이벤트의 급상승 점수 배율"""
+        return 2 ** ((timestamp - utc_timestamp(epoch)) / self.half_life)
+
+    def ensure_epoch(self, timestamp=None):
+        """현재 기준 시각을 반환하고, 이전 기준 시각으로 저장된 급상승 점수가 있으면 새 기준 시각으로 환산
+
+        환산은 기준 시각마다 프로세스당 한 번만 확인하고, 문서마다 trendEpoch를 함께 바꾸므로
+        여러 프로세스가 동시에 환산해도 같은 문서를 두 번 곱하지 않는다.
+        """
+        epoch = trend_epoch(timestamp or time.time())
+        if self.rebased["epoch"] is not None and self.rebased["epoch"] >= epoch:
+            return self.rebased["epoch"]
+
+        # trendEpoch가 없는 문서는 기준 시각을 옮기기 전(EPOCH)에 기록된 것
+        self.primary_collection.update_many(
+            {"trendEpoch": {"$exists": False}},
+            {"$mul": {"trendScore": self.decay_factor(utc_timestamp(EPOCH), epoch)}, "$set": {"trendEpoch": epoch}}
+        )
+        for old_epoch in self.primary_collection.distinct("trendEpoch", {"trendEpoch": {"$lt": epoch}}):
+            self.primary_collection.update_many(
+                {"trendEpoch": old_epoch},
+                {"$mul": {"trendScore": self.decay_factor(utc_timestamp(old_epoch), epoch)}, "$set": {"trendEpoch": epoch}}
+            )
+        self.rebased["epoch"] = epoch
+        return epoch
+
+    def entries_for(self, team, post=None):
+        """이벤트가 반영될 순위 문서들 (팀 문서, 글 이벤트면 글 문서도)"""
+        entries = [(team_entry_id(team["_id"]), {
+            "kind": "team",
+            "teamId": team["_id"],
+            "label": team.get("teamName", ""),
+            "week": team.get("week")
+        })]
+        if post is not None:
+            entries.append((post_entry_id(team["_id"], post), {
+                "kind": "post",
+                "teamId": team["_id"],
+                "postId": post.get("_id"),
+                "label": post.get("title", ""),
+                "teamName": team.get("teamName", ""),
+                "week": team.get("week")
+            }))
+        return entries
+
+    def record(self, event, team, post=None, count=1, timestamp=None):
+        """이벤트(upvote/like/comment)를 팀(과 글) 점수에 반영. count가 음수면 전체 기간 점수만 줄임"""
+        weight = EVENT_WEIGHTS[event] * count
+        increments = {f"metrics.{EVENT_METRICS[event]}": count, "allTimeScore": weight}
+        updates = {}
+        if count > 0:
+            # 지워진 댓글 등은 이미 지난 활동이므로 급상승 점수에서는 빼지 않음
+            epoch = self.ensure_epoch()
+            increments["trendScore"] = weight * self.decay_factor(timestamp or time.time(), epoch)
+            updates["trendEpoch"] = epoch
+
+        for entry_id, fields in self.entries_for(team, post):
+            self.collection.update_one(
+                {"_id": entry_id},
+                {"$inc": increments, "$set": {**fields, **updates}},
+                upsert=count > 0
+            )
+
+    def rename_post(self, team, post, new_title):
+        """글 제목이 바뀌면 순위에 표시되는 이름도 변경
+
+        _id가 없는 예전 글은 제목이 순위 문서 _id에 들어가므로 새 제목의 _id로 문서를 옮긴다.
+        """
+        old_entry_id = post_entry_id(team["_id"], post)
+        new_entry_id = post_entry_id(team["_id"], {**post, "title": new_title})
+        if old_entry_id == new_entry_id:
+            self.collection.update_one({"_id": old_entry_id}, {"$set": {"label": new_title}})
+            return
+        entry = self.collection.find_one({"_id": old_entry_id})
+        if entry is None:
+            return
+        entry.update({"_id": new_entry_id, "label": new_title})
+        self.collection.replace_one({"_id": new_entry_id}, entry, upsert=True)
+        self.collection.delete_one({"_id": old_entry_id})
+
+    def remove_post(self, team_id, post):
+        self.collection.delete_one({"_id": post_entry_id(team_id, post)})
+
+    def remove_team(self, team_id):
+        return self.collection.delete_many({"teamId": team_id}).deleted_count
+
+    def top(self, kind, board="all", limit=10):
+        """점수 높은 순으로 K개 (board: all=전체 기간, trending=인기 급상승)"""
+        score_field = "trendScore" if board == "trending" else "allTimeScore"
+        now = time.time()
+        now_factor = self.decay_factor(now, self.ensure_epoch(now)) if board == "trending" else 1
+        results = []
+        for entry in self.collection.find({"kind": kind, score_field: {"$gt": 0}}).sort(score_field, DESCENDING).limit(limit):
+            # 급상승 점수는 현재 시각 기준 값으로 환산 (방금 받은 추천 1개 = 3점, 반감기 전이면 1.5점)
+            entry["score"] = entry[score_field] / now_factor if board == "trending" else entry[score_field]
+            results.append(entry)
+        return results
@@ -0,0 +1,159 @@
+import bisect
+import threading
+
+from pymongo import monitoring
+
+# Prometheus 텍스트 형식 메트릭 (/metrics)
+#
+# 요청마다 호출되므로 값 갱신은 잠금 하나 아래에서 덧셈만 하고, 문자열 변환은 수집(scrape)할 때만 한다.
+# 큐 길이, 캐시 적중률처럼 그때그때 읽으면 되는 값은 callback으로 등록해서 수집할 때 계산한다.
+# 값은 프로세스마다 따로 쌓이므로 웹 서버 워커를 여러 개 띄우면 워커별로 수집해야 함
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{format_labels(self.labels, key)} {format_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((key, {"buckets": list(series["buckets"]), "sum": series["sum"], "count": series["count"]})
+                           for key, series in self.values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else format_value(float(bound))
+                labels = format_labels(self.labels, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {series['count']}")
+        return lines
+
+class CallbackMetric:
+    """수집할 때 함수를 호출해서 값을 얻는 메트릭 (함수는 {(라벨 값, ...): 값} 또는 숫자 하나를 반환)
+
+    다른 곳에서 이미 세고 있는 누적값(캐시 통계 등)은 metric_type="counter"로 내보냄
+    """
+
+    def __init__(self, name, documentation, labels, read, metric_type="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.read = read
+        self.metric_type = metric_type
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        try:
+            values = self.read()
+        except Exception as e:
+            # 수집에 실패한 메트릭은 값 없이 내보내고 나머지 메트릭은 그대로 보냄
+            print(f"메트릭 수집 실패 ({self.name}): {e}")
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, key)} {format_value(value)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def callback(self, name, documentation, read, labels=(), metric_type="gauge"):
+        return self.register(CallbackMetric(name, documentation, labels, read, metric_type))
+
+    def render(self):
+        """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """모든 MongoDB 명령의 횟수/시간 (요청 밖의 백그라운드 작업 포함)"""
+
+    IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "saslStart", "saslContinue"}
+
+    def __init__(self, registry):
+        self.commands = registry.counter(
+            "mongodb_commands_total", "MongoDB commands by command name and outcome", ("command", "outcome"))
+        self.durations = registry.histogram(
+            "mongodb_command_duration_seconds", "MongoDB command latency", ("command",),
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.record(event, "success")
+
+    def failed(self, event):
+        self.record(event, "failure")
+
+    def record(self, event, outcome):
+        if event.command_name in self.IGNORED_COMMANDS:
+            return
+        self.commands.inc(command=event.command_name, outcome=outcome)
+        self.durations.observe(event.duration_micros / 1000000, command=event.command_name)
@@ -0,0 +1,53 @@
+from pymongo.errors import DuplicateKeyError
+
+from app import db, ensure_membership_indexes, find_teams
+
+# 팀 문서의 members 배열로부터 memberships 컬렉션을 만드는 스크립트
+# 한 사용자가 같은 주차의 여러 팀에 들어가 있는 경우(유니크 인덱스 도입 전 데이터)는 먼저 가입한 팀만 등록하고 목록을 출력
+
+def main():
+    print("👥 멤버십 컬렉션 생성")
+    print("="*50)
+    ensure_membership_indexes()
+
+    # 가입 시각 순으로 넣어서 충돌 시 먼저 가입한 팀이 남도록 함
+    rows = []
+    for team in find_teams({"deletedAt": None}, {"teamName": 1, "week": 1, "members": 1}):
+        for member in team.get("members", []):
+            rows.append((member.get("joinedAt"), team, member))
+    rows.sort(key=lambda row: (row[0] is None, row[0]))
+
+    created = 0
+    conflicts = []
+    for joined_at, team, member in rows:
+        try:
+            db["memberships"].update_one(
+                {"userId": member["userId"], "week": team["week"]},
+                {"$setOnInsert": {
+                    "teamId": team["_id"],
+                    "teamName": team["teamName"],
+                    "role": member["role"],
+                    "joinedAt": joined_at
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+        membership = db["memberships"].find_one({"userId": member["userId"], "week": team["week"]})
+        if membership["teamId"] == team["_id"]:
+            created += 1
+        else:
+            conflicts.append((member["userId"], team["week"], team["teamName"], membership["teamName"]))
+
+    # 삭제되었거나 없어진 팀의 멤버십 정리
+    team_ids = [team["_id"] for team in find_teams({"deletedAt": None}, {"_id": 1})]
+    removed = db["memberships"].delete_many({"teamId": {"$nin": team_ids}}).deleted_count
+
+    print(f"✅ {created}개의 멤버십을 등록했습니다. (정리된 멤버십 {removed}개)")
+    if conflicts:
+        print(f"⚠️ 같은 주차에 여러 팀에 속한 멤버 {len(conflicts)}건 (팀 문서의 members에서 직접 정리 필요):")
+        for user_id, week, team_name, kept_team_name in conflicts:
+            print(f"   • {user_id}: {week}주차 '{team_name}' (등록된 팀: '{kept_team_name}')")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import datetime
+import hashlib
+import os
+import re
+
+from app import (
+    app, db, allowed_file, is_image_variant, image_variant_filename,
+    extract_image_urls_from_content, upload_key, upload_shard, iter_upload_files, TEAM_COLLECTIONS,
+    find_teams
+)
+
+# 업로드 폴더 바로 아래에 있는(샤드 이전) 파일들을 해시 앞 두 글자 하위 폴더로 옮기는 스크립트
+# 게시글 HTML의 이미지 주소도 함께 바꾸므로 서비스를 잠시 멈춘 상태에서 실행하는 것을 권장
+UPLOAD_FOLDER = os.path.join(os.getcwd(), app.config["UPLOAD_FOLDER"])
+UPLOAD_URL_PATTERN = re.compile(r'/static/uploads/[^"\s,]+')
+
+def file_sha256(path):
+    """파일 내용의 SHA-256 해시"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def move_or_dedupe(source, target):
+    """source를 target으로 옮기고, 같은 내용의 target이 이미 있으면 source만 삭제"""
+    if os.path.exists(target):
+        os.remove(source)
+    else:
+        os.replace(source, target)
+
+def migrate_flat_files():
+    """샤드 이전 파일들을 내용 해시 파일명으로 옮기고 {기존 URL: 새 URL} 매핑을 반환"""
+    print("업로드 파일 이동 중...")
+
+    url_mapping = {}
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        flat_files = [entry for entry in entries
+                      if entry.is_file(follow_symlinks=False)
+                      and allowed_file(entry.name) and not is_image_variant(entry.name)]
+
+    for entry in flat_files:
+        digest = file_sha256(entry.path)[:32]
+        ext = os.path.splitext(entry.name)[1].lower()
+        new_filename = f"{upload_shard(digest)}/{digest}{ext}"
+        new_path = os.path.join(UPLOAD_FOLDER, new_filename)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+
+        # 반응형 축소본도 새 파일명 규칙에 맞춰 함께 이동
+        for width in app.config["IMAGE_VARIANT_WIDTHS"]:
+            old_variant = image_variant_filename(entry.path, width)
+            if os.path.exists(old_variant):
+                move_or_dedupe(old_variant, image_variant_filename(new_path, width))
+                url_mapping[f"/static/uploads/{image_variant_filename(entry.name, width)}"] = \
+                    f"/static/uploads/{image_variant_filename(new_filename, width)}"
+
+        move_or_dedupe(entry.path, new_path)
+        url_mapping[f"/static/uploads/{entry.name}"] = f"/static/uploads/{new_filename}"
+
+    print(f"✅ {len(flat_files)}개의 파일을 샤드 폴더로 옮겼습니다.")
+    return url_mapping
+
+def rewrite_post_contents(url_mapping):
+    """게시글 HTML 안의 기존 업로드 주소(src, srcset)를 새 주소로 교체"""
+    print("게시글 이미지 주소 변경 중...")
+
+    if not url_mapping:
+        print("✅ 변경할 주소가 없습니다.")
+        return 0
+
+    updated_posts = 0
+    # 보관된 팀(teams_archive)의 글도 같은 주소를 쓰므로 함께 변경 (각 팀이 있던 컬렉션에 그대로 저장)
+    for collection_name in TEAM_COLLECTIONS:
+        for team in db[collection_name].find({"posts.content": {"$regex": "/static/uploads/"}}, {"posts": 1}):
+            updates = {}
+            for index, post in enumerate(team.get("posts", [])):
+                content = post.get("content", "")
+                new_content = UPLOAD_URL_PATTERN.sub(lambda m: url_mapping.get(m.group(0), m.group(0)), content)
+                if new_content != content:
+                    updates[f"posts.{index}.content"] = new_content
+
+            if updates:
+                db[collection_name].update_one({"_id": team["_id"]}, {"$set": updates})
+                updated_posts += len(updates)
+
+    print(f"✅ {updated_posts}개의 게시글 주소를 변경했습니다.")
+    return updated_posts
+
+def rebuild_upload_references():
+    """게시글 내용을 기준으로 uploads 컬렉션의 참조 카운트를 다시 계산"""
+    print("참조 카운트 재계산 중...")
+
+    ref_counts = {}
+    # 보관된 팀의 글이 쓰는 이미지도 참조로 셈 (빠뜨리면 참조 0으로 보고 정리 작업이 지움)
+    # find_teams는 옮기는 도중 양쪽에 있는 팀을 한 번만 돌려주므로 중복으로 세지 않음
+    for team in find_teams({}, {"posts.content": 1}):
+        for post in team.get("posts", []):
+            for url in set(extract_image_urls_from_content(post.get("content", ""))):
+                if url.startswith("/static/uploads/"):
+                    ref_counts[upload_key(url)] = ref_counts.get(upload_key(url), 0) + 1
+
+    existing_keys = set()
+    for url, entry in iter_upload_files(UPLOAD_FOLDER):
+        key = upload_key(url)
+        existing_keys.add(key)
+        db["uploads"].update_one(
+            {"_id": key},
+            {
+                "$set": {"refCount": ref_counts.get(key, 0), "size": entry.stat().st_size},
+                "$setOnInsert": {"createdAt": datetime.datetime.fromtimestamp(entry.stat().st_ctime)}
+            },
+            upsert=True
+        )
+
+    # 파일이 없어진(이동된) 키의 문서 정리
+    result = db["uploads"].delete_many({"_id": {"$nin": list(existing_keys)}})
+    print(f"✅ {len(existing_keys)}개 파일의 참조 카운트를 갱신했습니다. (정리된 문서 {result.deleted_count}개)")
+
+def main():
+    print("🚚 업로드 폴더 샤드 마이그레이션")
+    print("="*50)
+    print("서비스를 멈춘 상태에서 실행하는 것을 권장합니다. 계속하시겠습니까? (y/n): ", end="")
+    if input().lower() != 'y':
+        print("취소되었습니다.")
+        return
+
+    url_mapping = migrate_flat_files()
+    rewrite_post_contents(url_mapping)
+    rebuild_upload_references()
+
+    print("\n✅ 마이그레이션이 완료되었습니다!")
+
+if __name__ == "__main__":
+    main()
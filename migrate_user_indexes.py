@@ -0,0 +1,47 @@
+import sys
+
+from app import users_collection, ensure_user_indexes, USER_UNIQUE_FIELDS
+
+# users.username / users.nickname 유니크 인덱스를 만드는 스크립트
+# 이미 중복된 값이 있으면 인덱스 생성이 실패하므로, 먼저 중복 목록을 출력하고 인덱스는 만들지 않음
+# 중복을 정리한 뒤 다시 실행하면 인덱스가 생성됨
+# 사용법: python migrate_user_indexes.py [--check]  (--check: 중복 확인만)
+
+def find_duplicates(field):
+    """field 값이 같은 사용자 목록: [(값, [사용자 문서, ...]), ...]"""
+    duplicates = users_collection.aggregate([
+        {"$match": {field: {"$exists": True}}},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}, "users": {"$push": {"_id": "$_id", "username": "$username", "nickname": "$nickname"}}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"_id": 1}}
+    ], allowDiskUse=True)
+    return [(duplicate["_id"], duplicate["users"]) for duplicate in duplicates]
+
+def main():
+    check_only = "--check" in sys.argv[1:]
+
+    print("🔑 사용자 아이디/닉네임 유니크 인덱스")
+    print("="*50)
+
+    has_duplicates = False
+    for field in USER_UNIQUE_FIELDS:
+        duplicates = find_duplicates(field)
+        if not duplicates:
+            print(f"✅ {field}: 중복 없음")
+            continue
+        has_duplicates = True
+        print(f"⚠️ {field}: {len(duplicates)}개 값이 중복되어 있습니다.")
+        for value, users in duplicates:
+            print(f"   • {value!r}: " + ", ".join(f"{user['_id']} ({user.get('username')}/{user.get('nickname')})" for user in users))
+
+    if has_duplicates:
+        print("\n❌ 중복을 정리한 뒤 다시 실행해주세요. 인덱스를 만들지 않았습니다.")
+        sys.exit(1)
+    if check_only:
+        return
+
+    ensure_user_indexes()
+    print("\n✅ 유니크 인덱스를 만들었습니다.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import html
+import json
+import threading
+import time
+
+from pymongo import monitoring
+
+# 요청별 MongoDB 명령 프로파일러
+#
+# pymongo CommandListener는 명령을 보낸 스레드에서 호출되므로, 요청을 처리하는 스레드에 현재 요청의 기록을 두고
+# 명령 수, 걸린 시간, 같은 모양의 쿼리가 반복된 횟수(N+1 의심)를 모은다.
+# 쿼리 모양은 명령 이름 + 컬렉션 + 조건의 필드 구조(값은 ?로 바꿈)라서
+# 멤버마다 find_one({"_id": ...})을 부르는 반복문은 같은 모양이 여러 번 기록된다.
+# 요청 밖(백그라운드 작업, 캐시 갱신 스레드 등)에서 보낸 명령은 기록하지 않는다.
+
+# 기록하지 않는 내부 명령
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions",
+                    "buildInfo", "getMore", "killCursors"}
+# 명령별 조건 필드
+FILTER_FIELDS = {"find": "filter", "count": "query", "distinct": "query", "findAndModify": "query"}
+
+def normalize_shape(value):
+    """값은 ?로 바꾸고 필드 구조만 남김"""
+    if isinstance(value, dict):
+        return {key: normalize_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in 목록처럼 길이만 다른 배열은 같은 모양으로 봄
+        shapes = []
+        for item in value:
+            shape = normalize_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+def query_shape(command_name, command):
+    """명령의 쿼리 모양 문자열 (예: find users {"_id": "?"})"""
+    collection = command.get(command_name)
+    if command_name in FILTER_FIELDS:
+        condition = command.get(FILTER_FIELDS[command_name], {})
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes", [])
+        condition = statements[0].get("q", {}) if statements else {}
+    elif command_name == "aggregate":
+        condition = [{stage: normalize_shape(body) if stage == "$match" else "..."}
+                     for pipeline_stage in command.get("pipeline", []) for stage, body in pipeline_stage.items()]
+    else:
+        condition = {}
+    return f"{command_name} {collection} {json.dumps(normalize_shape(condition), sort_keys=True, ensure_ascii=False)}"
+
+class RequestProfile:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.commands = []
+        self.pending = {}
+
+    @property
+    def query_count(self):
+        return len(self.commands)
+
+    @property
+    def query_seconds(self):
+        return sum(command["seconds"] for command in self.commands)
+
+    def repeated_shapes(self, threshold):
+        """threshold번 이상 반복된 쿼리 모양과 횟수 (많은 순)"""
+        counts = {}
+        for command in self.commands:
+            counts[command["shape"]] = counts.get(command["shape"], 0) + 1
+        return sorted(((shape, count) for shape, count in counts.items() if count >= threshold),
+                      key=lambda item: item[1], reverse=True)
+
+class QueryProfiler(monitoring.CommandListener):
+    def __init__(self):
+        self.local = threading.local()
+
+    # --- 요청 시작/끝 ---
+    def begin(self, label):
+        self.local.profile = RequestProfile(label)
+
+    def end(self):
+        profile = getattr(self.local, "profile", None)
+        self.local.profile = None
+        return profile
+
+    # --- pymongo CommandListener ---
+    def started(self, event):
+        profile = getattr(self.local, "profile", None)
+        if profile is None or event.command_name in IGNORED_COMMANDS:
+            return
+        profile.pending[event.request_id] = query_shape(event.command_name, event.command)
+
+    def succeeded(self, event):
+        self.record(event, failed=False)
+
+    def failed(self, event):
+        self.record(event, failed=True)
+
+    def record(self, event, failed):
+        profile = getattr(self.local, "profile", None)
+        if profile is None:
+            return
+        shape = profile.pending.pop(event.request_id, None)
+        if shape is None:
+            return
+        profile.commands.append({
+            "command": event.command_name,
+            "shape": shape,
+            "seconds": event.duration_micros / 1000000,
+            "failed": failed
+        })
+
+def render_toolbar(profile, budget, repeat_threshold):
+    """HTML 응답 아래에 붙이는 디버그 패널"""
+    repeated = dict(profile.repeated_shapes(repeat_threshold))
+    rows = "".join(
+        f'<tr style="{"color:#c0392b;" if command["shape"] in repeated else ""}">'
+        f'<td>{index}</td><td>{command["seconds"] * 1000:.1f}ms</td><td><code>{html.escape(command["shape"])}</code></td></tr>'
+        for index, command in enumerate(profile.commands, start=1)
+    )
+    over_budget = profile.query_count > budget
+    return (
+        '<div id="query-profiler" style="position:fixed;bottom:0;left:0;right:0;max-height:40vh;overflow:auto;'
+        'background:#fff;border-top:2px solid #333;font:12px monospace;z-index:9999;padding:6px;">'
+        f'<b>MongoDB {profile.query_count}개 쿼리 / {profile.query_seconds * 1000:.1f}ms</b>'
+        + (f' <span style="color:#c0392b;">(예산 {budget}개 초과)</span>' if over_budget else "")
+        + (f' <span style="color:#c0392b;">반복 쿼리 {len(repeated)}종 (N+1 의심)</span>' if repeated else "")
+        + f'<table style="width:100%;">{rows}</table></div>'
+    )
@@ -0,0 +1,47 @@
+from pymongo import UpdateOne
+
+from app import db, users_collection, TEAM_COLLECTIONS
+
+# 사용자별 활동 통계(users.stats)를 팀 데이터로부터 다시 계산하는 스크립트
+# (처음 도입할 때 한 번, 또는 통계가 어긋났을 때 실행. 이후에는 각 라우트가 바로 증감함)
+
+def main():
+    print("📊 사용자 통계 다시 계산")
+    print("="*50)
+
+    # 진행 중인 팀(teams)과 보관된 지난 주차 팀(teams_archive)을 합산
+    stats = {}
+    for collection_name in TEAM_COLLECTIONS:
+        for row in db[collection_name].aggregate([
+            {"$match": {"deletedAt": None}},
+            {"$unwind": "$members"},
+            {"$group": {"_id": "$members.userId", "teams": {"$sum": 1}}}
+        ]):
+            user_stats = stats.setdefault(row["_id"], {})
+            user_stats["teamsJoined"] = user_stats.get("teamsJoined", 0) + row["teams"]
+
+        for row in db[collection_name].aggregate([
+            {"$match": {"deletedAt": None}},
+            {"$unwind": "$posts"},
+            {"$group": {
+                "_id": "$posts.authorId",
+                "posts": {"$sum": 1},
+                "likes": {"$sum": {"$ifNull": ["$posts.likes", 0]}}
+            }}
+        ]):
+            user_stats = stats.setdefault(row["_id"], {})
+            user_stats["postsWritten"] = user_stats.get("postsWritten", 0) + row["posts"]
+            user_stats["likesReceived"] = user_stats.get("likesReceived", 0) + row["likes"]
+
+    requests = [UpdateOne({"_id": user["_id"]}, {"$set": {"stats": {
+        "teamsJoined": stats.get(user["_id"], {}).get("teamsJoined", 0),
+        "postsWritten": stats.get(user["_id"], {}).get("postsWritten", 0),
+        "likesReceived": stats.get(user["_id"], {}).get("likesReceived", 0)
+    }}}) for user in users_collection.find({}, {"_id": 1})]
+    if requests:
+        users_collection.bulk_write(requests, ordered=False)
+
+    print(f"✅ {len(requests)}명의 통계를 갱신했습니다.")
+
+if __name__ == "__main__":
+    main()
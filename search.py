@@ -0,0 +1,238 @@
+import copy
+import html
+import re
+
+from pymongo import ASCENDING, DESCENDING, TEXT
+
+# 글 제목/본문/댓글 검색 인덱스
+#
+# MongoDB 텍스트 인덱스는 한국어 형태소 분석을 하지 않아 "리액트를"로 저장된 글이 "리액트"로 검색되지 않는다.
+# 그래서 한글은 두 글자씩 끊은 바이그램("리액", "액트", "트를"), 영문/숫자는 단어 단위로 토큰을 만들어
+# 공백으로 이어 붙인 문자열을 텍스트 인덱스(default_language="none")에 넣고, 검색어도 같은 방식으로 토큰화한다.
+# 검색어의 토큰은 모두 포함해야 하고(AND), 순위는 텍스트 점수(제목 > 본문 > 댓글 가중치)로 매긴다.
+
+TOKEN_PATTERN = re.compile(r'[가-힣]+|[a-z0-9]+')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 검색 결과 미리보기에 쓰려고 저장하는 본문 길이
+STORED_BODY_LENGTH = 5000
+SNIPPET_LENGTH = 120
+
+def strip_html(content):
+    """HTML 태그를 제거한 본문 텍스트"""
+    text = html.unescape(TAG_PATTERN.sub(" ", content or ""))
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+def tokenize(text):
+    """한글은 바이그램(한 글자 단어는 그대로), 영문/숫자는 단어 단위 토큰 목록"""
+    tokens = []
+    for word in TOKEN_PATTERN.findall((text or "").lower()):
+        if word[0] >= "가" and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+def search_terms(text):
+    """텍스트 인덱스에 넣을 토큰 문자열"""
+    return " ".join(tokenize(text))
+
+def post_search_key(team_id, post):
+    """글 하나를 가리키는 검색 문서 _id (예전 글은 _id가 없어서 제목 사용)"""
+    return f"{team_id}:{post.get('_id') or post.get('title', '')}"
+
+def make_snippet(body, query):
+    """본문에서 검색어가 처음 나오는 부분 주변을 잘라낸 미리보기"""
+    lowered = body.lower()
+    positions = [position for position in (lowered.find(word) for word in TOKEN_PATTERN.findall((query or "").lower()))
+                 if position >= 0]
+    start = max(min(positions) - SNIPPET_LENGTH // 4, 0) if positions else 0
+    snippet = body[start:start + SNIPPET_LENGTH]
+    return ("..." if start > 0 else "") + snippet + ("..." if start + SNIPPET_LENGTH < len(body) else "")
+
+class SearchIndex:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index(
+            [("titleTerms", TEXT), ("bodyTerms", TEXT), ("commentTerms", TEXT)],
+            weights={"titleTerms": 10, "bodyTerms": 3, "commentTerms": 1},
+            default_language="none",
+            language_override="searchLanguage",
+            name="post_search"
+        )
+        self.collection.create_index([("teamId", ASCENDING)])
+
+    def with_read_preference(self, read_preference):
+        """같은 컬렉션을 다른 read preference로 읽는 인스턴스 (목록 화면의 secondary 읽기용)"""
+        reader = copy.copy(self)
+        reader.collection = self.collection.with_options(read_preference=read_preference)
+        return reader
+
+    def build_document(self, team, post):
+        body = strip_html(post.get("content", ""))
+        comments = " ".join(comment.get("content", "") for comment in post.get("comments", []))
+        return {
+            "_id": post_search_key(team["_id"], post),
+            "teamId": team["_id"],
+            "teamName": team.get("teamName", ""),
+            "week": team.get("week"),
+            "postId": post.get("_id"),
+            "title": post.get("title", ""),
+            "author": post.get("author", ""),
+            "createdAt": post.get("createdAt"),
+            "body": body[:STORED_BODY_LENGTH],
+            "commentCount": len(post.get("comments", [])),
+            "titleTerms": search_terms(post.get("title", "")),
+            "bodyTerms": search_terms(body),
+            "commentTerms": search_terms(comments)
+        }
+
+    def index_team(self, team):
+        """팀의 모든 글을 다시 색인하고 없어진 글의 검색 문서 삭제 (여러 번 실행되어도 결과가 같음)"""
+        documents = [self.build_document(team, post) for post in team.get("posts", [])]
+        for document in documents:
+            self.collection.replace_one({"_id": document["_id"]}, document, upsert=True)
+        self.collection.delete_many({
+            "teamId": team["_id"],
+            "_id": {"$nin": [document["_id"] for document in documents]}
+        })
+        return len(documents)
+
+    def index_post(self, team, post):
+        """글 하나의 검색 문서 갱신"""
+        document = self.build_document(team, post)
+        self.collection.replace_one({"_id": document["_id"]}, document, upsert=True)
+
+    def remove_post(self, team_id, post):
+        self.collection.delete_one({"_id": post_search_key(team_id, post)})
+
+    def remove_team(self, team_id):
+        return self.collection.delete_many({"teamId": team_id}).deleted_count
+
+    def search(self, query, page=1, per_page=20):
+        """검색어 토큰을 모두 포함한 글을 점수순으로 반환: (결과 목록, 전체 개수)"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return [], 0
+
+        # 따옴표로 감싼 토큰은 모두 포함되어야 함 (AND)
+        condition = {"$text": {"$search": " ".join(f'"{token}"' for token in tokens)}}
+        total = self.collection.count_documents(condition)
+        cursor = self.collection.find(
+            condition,
+            {"score": {"$meta": "textScore"}, "titleTerms": 0, "bodyTerms": 0, "commentTerms": 0}
+        ).sort([("score", {"$meta": "textScore"}), ("createdAt", DESCENDING)]).skip((page - 1) * per_page).limit(per_page)
+
+        results = []
+        for document in cursor:
+            document["snippet"] = make_snippet(document.pop("body", ""), query)
+            results.append(document)
+        return results, total
+
+# 자동완성 (사용자 아이디/닉네임, 팀 이름)
+#
+# 이름을 소문자로 바꾼 key에 일반 B-tree 인덱스를 걸고 [prefix, prefix + "\uffff") 범위로 조회한다.
+# 범위 조회는 인덱스에서 앞부분 몇 개만 읽고 끝나므로 문서 수가 늘어나도 키 입력마다 호출할 수 있다.
+# 한글은 입력 중인 글자가 아직 조합 중일 수 있으므로("리ㅇ", "릭" -> "리그") 마지막 글자를 범위로 넓혀서 찾는다.
+
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+JUNGSEONG_COUNT = 21
+JONGSEONG_COUNT = 28
+# 호환용 자음(ㄱ~ㅎ) -> 초성 번호
+CHOSEONG_JAMO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+# 받침 번호 -> 다음 글자의 초성 번호 (겹받침은 제외)
+JONGSEONG_TO_CHOSEONG = {1: 0, 2: 1, 4: 2, 7: 3, 8: 5, 16: 6, 17: 7, 19: 9, 20: 10,
+                         21: 11, 22: 12, 23: 14, 24: 15, 25: 16, 26: 17, 27: 18}
+
+def normalize_name(name):
+    return (name or "").strip().lower()
+
+def choseong_range(choseong):
+    """초성이 같은 완성형 글자 전체 범위 (첫 글자, 마지막 글자)"""
+    first = HANGUL_BASE + choseong * JUNGSEONG_COUNT * JONGSEONG_COUNT
+    return chr(first), chr(first + JUNGSEONG_COUNT * JONGSEONG_COUNT - 1)
+
+def prefix_ranges(prefix):
+    """prefix로 시작하는 key의 [low, high) 범위 목록 (입력 중인 한글을 고려해 여러 개일 수 있음)"""
+    ranges = [(prefix, prefix + "\uffff")]
+    if not prefix:
+        return ranges
+
+    head, last = prefix[:-1], prefix[-1]
+    if last in CHOSEONG_JAMO:
+        # "리ㅇ" -> "리" 뒤에 ㅇ으로 시작하는 글자
+        low, high = choseong_range(CHOSEONG_JAMO.index(last))
+        ranges.append((head + low, head + high + "\uffff"))
+    elif HANGUL_BASE <= ord(last) <= HANGUL_LAST:
+        offset = ord(last) - HANGUL_BASE
+        jongseong = offset % JONGSEONG_COUNT
+        if jongseong in JONGSEONG_TO_CHOSEONG:
+            # "릭" -> "리" 뒤에 ㄱ으로 시작하는 글자 ("리그", "리기" 등)
+            without_final = head + chr(ord(last) - jongseong)
+            low, high = choseong_range(JONGSEONG_TO_CHOSEONG[jongseong])
+            ranges.append((without_final + low, without_final + high + "\uffff"))
+    return ranges
+
+class AutocompleteIndex:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([("key", ASCENDING)])
+        self.collection.create_index([("refId", ASCENDING)])
+
+    def with_read_preference(self, read_preference):
+        """같은 컬렉션을 다른 read preference로 읽는 인스턴스 (목록 화면의 secondary 읽기용)"""
+        reader = copy.copy(self)
+        reader.collection = self.collection.with_options(read_preference=read_preference)
+        return reader
+
+    def put_user(self, user):
+        """사용자 아이디와 닉네임을 각각 자동완성 항목으로 저장"""
+        for field in ("username", "nickname"):
+            self.collection.replace_one(
+                {"_id": f"user:{user['_id']}:{field}"},
+                {
+                    "key": normalize_name(user.get(field)),
+                    "kind": "user",
+                    "refId": user["_id"],
+                    "label": user.get("nickname", ""),
+                    "username": user.get("username", "")
+                },
+                upsert=True
+            )
+
+    def put_team(self, team):
+        self.collection.replace_one(
+            {"_id": f"team:{team['_id']}"},
+            {
+                "key": normalize_name(team.get("teamName")),
+                "kind": "team",
+                "refId": team["_id"],
+                "label": team.get("teamName", ""),
+                "week": team.get("week")
+            },
+            upsert=True
+        )
+
+    def remove(self, ref_id):
+        return self.collection.delete_many({"refId": ref_id}).deleted_count
+
+    def suggest(self, prefix, limit=10):
+        """prefix로 시작하는 이름 목록 (같은 사용자/팀은 한 번만)"""
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+
+        ranges = prefix_ranges(prefix)
+        condition = {"$or": [{"key": {"$gte": low, "$lt": high}} for low, high in ranges]} \
+            if len(ranges) > 1 else {"key": {"$gte": ranges[0][0], "$lt": ranges[0][1]}}
+        # 아이디와 닉네임이 둘 다 걸릴 수 있으므로 여유 있게 가져와서 중복 제거
+        suggestions = {}
+        for entry in self.collection.find(condition, {"_id": 0}).sort("key", ASCENDING).limit(limit * 2):
+            suggestions.setdefault((entry["kind"], entry["refId"]), entry)
+        return list(suggestions.values())[:limit]
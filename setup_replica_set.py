@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from pymongo.read_preferences import SecondaryPreferred
+
+# 로컬 3대 replica set을 구성하고 목록 읽기가 secondary로 가는지 확인하는 스크립트 (개발/테스트용)
+#
+# 먼저 mongod 세 개를 띄움:
+#   mkdir -p /tmp/rs0-0 /tmp/rs0-1 /tmp/rs0-2
+#   mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0-0 --bind_ip localhost --fork --logpath /tmp/rs0-0.log
+#   mongod --replSet rs0 --port 27018 --dbpath /tmp/rs0-1 --bind_ip localhost --fork --logpath /tmp/rs0-1.log
+#   mongod --replSet rs0 --port 27019 --dbpath /tmp/rs0-2 --bind_ip localhost --fork --logpath /tmp/rs0-2.log
+# 그 다음 이 스크립트를 실행하고, 출력된 MONGO_URI로 앱과 worker.py를 실행
+# 사용법: python setup_replica_set.py [replica set 이름 (기본: rs0)]
+
+PORTS = (27017, 27018, 27019)
+
+def initiate(replica_set):
+    """replica set이 아직 구성되지 않았으면 세 멤버로 구성"""
+    admin = MongoClient(f"mongodb://localhost:{PORTS[0]}/", directConnection=True).admin
+    try:
+        status = admin.command("replSetGetStatus")
+        print(f"이미 구성된 replica set입니다: {status['set']}")
+        return
+    except OperationFailure:
+        pass
+
+    admin.command("replSetInitiate", {
+        "_id": replica_set,
+        "members": [{"_id": index, "host": f"localhost:{port}"} for index, port in enumerate(PORTS)]
+    })
+    print(f"replica set '{replica_set}'을 구성했습니다.")
+
+def wait_for_members(client, timeout=60):
+    """primary 하나와 secondary 둘이 준비될 때까지 대기하고 멤버 상태 목록을 반환"""
+    deadline = time.time() + timeout
+    members = []
+    while time.time() < deadline:
+        members = client.admin.command("replSetGetStatus")["members"]
+        states = [member["stateStr"] for member in members]
+        if states.count("PRIMARY") == 1 and states.count("SECONDARY") == len(PORTS) - 1:
+            return members
+        time.sleep(1)
+    states = ", ".join(f"{member['name']} {member['stateStr']}" for member in members)
+    raise TimeoutError(f"replica set 멤버가 준비되지 않았습니다: {states or '상태 없음'}")
+
+def check_listing_reads(client, max_staleness):
+    """목록 읽기 설정(secondaryPreferred + maxStaleness)으로 읽었을 때 응답한 서버 확인"""
+    collection = client["flask_jwt_auth"]["week_summaries"].with_options(
+        read_preference=SecondaryPreferred(max_staleness=max_staleness))
+    cursor = collection.find({}).limit(1)
+    list(cursor)
+    primary = client.primary
+    print(f"primary: {primary[0]}:{primary[1]}")
+    print(f"목록 읽기 응답 서버: {cursor.address[0]}:{cursor.address[1]}" +
+          (" (secondary ✅)" if cursor.address != primary else " (primary ⚠️)"))
+
+def main():
+    replica_set = sys.argv[1] if len(sys.argv) > 1 else "rs0"
+    uri = f"mongodb://{','.join(f'localhost:{port}' for port in PORTS)}/?replicaSet={replica_set}"
+
+    print("🗂  로컬 replica set 구성")
+    print("="*50)
+    initiate(replica_set)
+
+    client = MongoClient(uri)
+    members = wait_for_members(client)
+    print("멤버 상태: " + ", ".join(f"{member['name']} {member['stateStr']}" for member in members))
+    check_listing_reads(client, int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", 90)))
+
+    print(f"\n✅ 다음 설정으로 앱을 실행하세요:\n   export MONGO_URI=\"{uri}\"")
+
+if __name__ == "__main__":
+    main()
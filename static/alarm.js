@@ -4,6 +4,9 @@
  */
 
 let notificationsOpen = false;
+let notificationItems = [];      // 현재 표시 중인 알림 목록
+let notificationCursor = null;   // 마지막으로 받은 알림 커서 (since 파라미터)
+let notificationEtag = null;     // 마지막 응답의 ETag (변경 없으면 서버가 304 반환)
 
 // 페이지 로드 시 알림 불러오기
 document.addEventListener('DOMContentLoaded', function() {
@@ -41,11 +44,33 @@ document.addEventListener('click', function(event) {
 // 알림 불러오기
 async function loadNotifications() {
   try {
-    const response = await fetch('/api/notifications');
+    const url = notificationCursor
+      ? `/api/notifications?since=${encodeURIComponent(notificationCursor)}`
+      : '/api/notifications';
+    const headers = notificationEtag ? { 'If-None-Match': notificationEtag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    
+    // 마지막 폴링 이후 바뀐 알림 없음
+    if (response.status === 304) {
+      return;
+    }
+    
     const data = await response.json();
     
     if (data.notifications) {
-      displayNotifications(data.notifications);
+      // delta 응답이면 새로 생기거나 묶인 알림을 앞에 붙이고(같은 묶음의 이전 항목은 제거), 아니면 목록 전체를 교체
+      if (data.delta) {
+        const changedIds = new Set(data.notifications.map(notification => notification._id));
+        notificationItems = data.notifications
+          .concat(notificationItems.filter(notification => !changedIds.has(notification._id)))
+          .slice(0, 20);
+      } else {
+        notificationItems = data.notifications;
+      }
+      notificationCursor = data.cursor;
+      notificationEtag = response.headers.get('ETag');
+      
+      displayNotifications(notificationItems);
       updateNotificationBadge(data.unread_count);
     }
   } catch (error) {
@@ -98,6 +98,33 @@ function initializeCarousel(currentWeek = 0) {
     render();
 }
 
+// 지난 주차 팀 목록 정적 스냅샷 목록 (주차 -> 파일 URL), 처음 필요할 때 한 번만 받아옴
+let weekSnapshots = null;
+
+async function loadWeekSnapshots() {
+    if (weekSnapshots === null) {
+        try {
+            const response = await fetch('/static/snapshots/manifest.json', { cache: 'no-cache' });
+            weekSnapshots = response.ok ? (await response.json()).weeks : {};
+        } catch (error) {
+            weekSnapshots = {};
+        }
+    }
+    return weekSnapshots;
+}
+
+// 끝난 주차는 정적 스냅샷을, 없거나 받지 못하면 서버에서 렌더링한 HTML을 가져옴
+async function fetchTeamSection(week) {
+    if (typeof window.currentWeek !== 'undefined' && week < window.currentWeek) {
+        const snapshots = await loadWeekSnapshots();
+        if (snapshots[week]) {
+            const response = await fetch(snapshots[week]);
+            if (response.ok) return response;
+        }
+    }
+    return fetch(`/teams_partial/${week}`);
+}
+
 // 팀 섹션만 부분적으로 업데이트하는 함수
 async function updateTeamSection(week) {
     const teamSection = document.getElementById('team-section');
@@ -106,7 +133,7 @@ async function updateTeamSection(week) {
     
     try {
         // 서버사이드 렌더링된 HTML 부분을 가져오기
-        const response = await fetch(`/teams_partial/${week}`);
+        const response = await fetchTeamSection(week);
         const html = await response.text();
         
         // 팀 섹션 전체를 새로운 HTML로 교체
@@ -0,0 +1,139 @@
+import os
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # S3 백엔드를 쓰지 않으면 boto3 없이도 동작
+    boto3 = None
+    ClientError = Exception
+
+# 업로드/프로필 이미지 저장소 백엔드
+#
+# 이미지 처리(해시 계산, 축소본/썸네일 생성)는 항상 로컬 스테이징 폴더에서 한 뒤 put_file로 저장소에 올린다.
+# 게시글 HTML과 템플릿은 계속 /static/uploads/<key>, /static/profile_imgs/<key> 주소를 쓰므로
+# S3 백엔드를 쓸 때는 리버스 프록시(또는 CDN)에서 두 경로를 버킷의 같은 접두사로 연결한다.
+#
+# 로컬 MinIO로 S3 백엔드 확인하기:
+#   docker run -p 9000:9000 minio/minio server /data
+#   STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=jungle-media \
+#   S3_ACCESS_KEY=minioadmin S3_SECRET_KEY=minioadmin python app.py
+
+def iter_local_files(root):
+    """root 아래 모든 파일을 (root 기준 상대 키, os.DirEntry)로 순회 (DirEntry의 stat 캐시 활용)"""
+    if not os.path.exists(root):
+        return
+
+    pending = [("", root)]
+    while pending:
+        prefix, folder = pending.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                # .staging(업로드 처리 중인 파일), .DS_Store 등 숨김 항목은 제외
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((f"{prefix}{entry.name}/", entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield f"{prefix}{entry.name}", entry
+
+class LocalStorage:
+    """로컬 디스크 저장소 (put_file은 스테이징 파일을 저장 위치로 옮기기만 함)"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def put_file(self, key, local_path, content_type=None):
+        target = self.path(key)
+        if os.path.abspath(local_path) != os.path.abspath(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(local_path, target)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def delete_many(self, keys):
+        deleted = []
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+                deleted.append(key)
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def list_files(self):
+        """(키, 생성 시각 timestamp) 순회"""
+        for key, entry in iter_local_files(self.root):
+            yield key, entry.stat().st_ctime
+
+class S3Storage:
+    """S3 호환 저장소 (AWS S3, MinIO 등). 여러 앱 서버가 같은 이미지를 공유할 때 사용"""
+
+    # DeleteObjects 한 번에 보낼 수 있는 최대 키 수
+    MAX_DELETE_BATCH = 1000
+
+    def __init__(self, bucket, prefix, endpoint_url=None, access_key=None, secret_key=None, region=None):
+        if boto3 is None:
+            raise RuntimeError("S3 저장소를 사용하려면 boto3 패키지가 필요합니다.")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/"
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region
+        )
+
+    def object_key(self, key):
+        return self.prefix + key
+
+    def put_file(self, key, local_path, content_type=None):
+        # 키가 내용 해시이므로 객체는 바뀌지 않음 -> 장기 캐시 허용
+        extra_args = {"CacheControl": "public, max-age=31536000, immutable"}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        self.client.upload_file(local_path, self.bucket, self.object_key(key), ExtraArgs=extra_args)
+        os.remove(local_path)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except ClientError:
+            return False
+
+    def delete_many(self, keys):
+        deleted = []
+        for start in range(0, len(keys), self.MAX_DELETE_BATCH):
+            batch = keys[start:start + self.MAX_DELETE_BATCH]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self.object_key(key)} for key in batch], "Quiet": True}
+            )
+            failed = {error["Key"] for error in response.get("Errors", [])}
+            deleted.extend(key for key in batch if self.object_key(key) not in failed)
+        return deleted
+
+    def list_files(self):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):], obj["LastModified"].timestamp()
+
+def create_storage(config, local_root, prefix):
+    """설정(STORAGE_BACKEND)에 맞는 저장소 생성"""
+    if config.get("STORAGE_BACKEND") == "s3":
+        return S3Storage(
+            bucket=config["S3_BUCKET"],
+            prefix=prefix,
+            endpoint_url=config.get("S3_ENDPOINT_URL"),
+            access_key=config.get("S3_ACCESS_KEY"),
+            secret_key=config.get("S3_SECRET_KEY"),
+            region=config.get("S3_REGION")
+        )
+    return LocalStorage(local_root)
@@ -0,0 +1,36 @@
+import multiprocessing
+import sys
+
+# 백그라운드 작업 워커 실행 스크립트
+# 사용법: python worker.py [프로세스 수 (기본 2)]
+# 워커 수를 늘리면 알림 생성, 이미지 정리 같은 부수 작업 처리량이 함께 늘어남
+
+def run_worker():
+    # 프로세스마다 app을 새로 import해서 각자의 MongoClient를 사용 (pymongo 클라이언트는 fork 후 공유 불가)
+    from app import job_queue
+    job_queue.work()
+
+def main():
+    process_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+
+    from app import app, job_queue, ensure_all_indexes
+    ensure_all_indexes()
+    if app.config["INVALIDATION_BACKEND"] == "local":
+        print("⚠️  INVALIDATION_BACKEND=local: 워커가 바꾼 데이터가 웹 프로세스의 캐시에 반영되지 않습니다. "
+              "changestream 또는 redis를 설정하세요.")
+    print(f"🛠  작업 워커 {process_count}개 시작 (대기 중인 작업: {job_queue.depth()}개)")
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, name=f"job-worker-{i}") for i in range(process_count)]
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()